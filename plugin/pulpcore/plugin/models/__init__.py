@@ -19,7 +19,8 @@ from pulpcore.app.models import (  # noqa
     Repository,
     RemoteArtifact,
     RepositoryContent,
-    RepositoryVersion
+    RepositoryVersion,
+    touch
 )
 
 from .publisher import Publisher  # noqa
@@ -1,7 +1,7 @@
-from .api import create_pipeline, EndStage, Stage  # noqa
+from .api import BatchSizeTuner, create_pipeline, create_process_pool, EndStage, Stage  # noqa
 from .artifact_stages import ArtifactDownloader, ArtifactSaver, QueryExistingArtifacts  # noqa
 from .association_stages import ContentUnitAssociation, ContentUnitUnassociation  # noqa
 from .content_unit_stages import ContentUnitSaver, QueryExistingContentUnits  # noqa
 from .declarative_version import DeclarativeVersion  # noqa
-from .models import DeclarativeArtifact, DeclarativeContent  # noqa
-from .profiler import ProfilingQueue, create_profile_db_and_connection  # noqa
+from .models import DeclarativeArtifact, DeclarativeContent, pack_content  # noqa
+from .profiler import ProfilingQueue, create_profile_db_and_connection, write_profile  # noqa
@@ -1,9 +1,22 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from gettext import gettext as _
+import multiprocessing
+import time
 
+import django
 from django.conf import settings
+from django.db import connections
 
-from .profiler import ProfilingQueue
+from .models import DeclarativeContent
+from .profiler import ProfilingQueue, write_profile
+
+
+#: The arguments to :meth:`Stage.batches` of stages which query the db once per batch: batches of
+#: up to 500 items, waiting up to 0.1 seconds for a batch to reach the size tuned to the db. The
+#: stages pass :meth:`Stage.busy_time` as `timer`, so the size is tuned to their db work only.
+DB_BATCHES = {'maxsize': 500, 'max_wait': 0.1, 'autotune': True}
 
 
 class Stage:
@@ -11,8 +24,19 @@ class Stage:
     The base class for all Stages API stages.
 
     To make a stage, inherit from this class and implement :meth:`__call__` on the subclass.
+
+    Stages doing db work run it with :meth:`run_in_thread`, so the other stages keep running
+    meanwhile.
     """
 
+    #: (:class:`multiprocessing.pool.Pool`): The processes :meth:`parse_in_processes` runs
+    #: functions in, see :func:`create_process_pool`. It is set on the first stage by
+    #: :class:`~pulpcore.plugin.stages.DeclarativeVersion` when syncing with several processes.
+    process_pool = None
+
+    _executor = None
+    _busy_time = 0.0
+
     async def __call__(self, in_q, out_q):
         """
         The coroutine that is run as part of this stage.
@@ -27,23 +51,184 @@ class Stage:
         """
         raise NotImplementedError(_('A plugin writer must implement this method'))
 
+    async def run_in_thread(self, func, *args):
+        """
+        Run a function in the thread of this stage, without blocking the event loop.
+
+        The Django ORM is synchronous, so db work done in a coroutine blocks every stage of the
+        pipeline, downloads included, until it is done. Db work run with this method is done in a
+        thread of the stage while the event loop runs the other stages.
+
+        The time spent running functions is added up in :meth:`busy_time`.
+
+        Each stage has one thread, started on first use. Django db connections are per thread, so
+        the stage uses a connection of its own, and a transaction must start and end within
+        `func`. The thread runs one function at a time, in the order they were submitted. The
+        thread is stopped by :meth:`stop_thread`, which :func:`create_pipeline` calls once the
+        pipeline is done.
+
+        Args:
+            func (callable): The function to run. It must not use the event loop or the queues.
+            args: The positional arguments to call `func` with.
+
+        Returns:
+            The value returned by `func`.
+
+        Examples:
+            Used in stages to save a batch while the previous stages keep going::
+
+                class MyStage(Stage):
+                    async def __call__(self, in_q, out_q):
+                        async for batch in self.batches(in_q):
+                            await self.run_in_thread(self.save, batch)
+                            for declarative_content in batch:
+                                await out_q.put(declarative_content)
+                        await out_q.put(None)
+
+                    def save(self, batch):
+                        with transaction.atomic():
+                            for declarative_content in batch:
+                                declarative_content.content.save()
+
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1,
+                                                thread_name_prefix=type(self).__name__)
+        return await asyncio.get_event_loop().run_in_executor(self._executor, self._timed, func,
+                                                              *args)
+
+    def _timed(self, func, *args):
+        """
+        Call a function, adding the time it takes to :meth:`busy_time`.
+        """
+        started = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            self._busy_time += time.monotonic() - started
+
+    def busy_time(self):
+        """
+        Returns:
+            float: The number of seconds spent running the functions passed to
+                :meth:`run_in_thread` so far.
+        """
+        return self._busy_time
+
+    async def parse_in_processes(self, func, arguments, remote):
+        """
+        Asynchronous iterator running a function parsing metadata, once for each item of
+        `arguments`, in the processes of :attr:`process_pool`.
+
+        Parsing large metadata keeps a core busy. Done in the event loop, it slows down the whole
+        pipeline, downloads included. This runs it in other processes, on other cores, in parallel
+        when the metadata is parsed in several calls, e.g. one for each metadata file.
+
+        The content units are sent back packed, see :func:`~pulpcore.plugin.stages.pack_content`.
+        Without :attr:`process_pool`, the function runs in the event loop, so a first stage works
+        the same way either way.
+
+        Args:
+            func (callable): A module level function returning a list of content units packed with
+                :func:`~pulpcore.plugin.stages.pack_content`. It must not use the db.
+            arguments (iterable): The tuples of arguments to call `func` with, one for each call.
+            remote (:class:`~pulpcore.plugin.models.Remote`): The remote to fetch the Artifacts of
+                the content units with.
+
+        Yields:
+            A list of :class:`~pulpcore.plugin.stages.DeclarativeContent` instances for each call,
+            in the order the calls complete.
+
+        Examples:
+            Used in first stages to parse each metadata file in a process::
+
+                def parse(path):
+                    return [pack_content(MyContent(...), [(Artifact(...), url, relative_path)])
+                            for entry in read_entries(path)]
+
+                class MyFirstStage(Stage):
+                    async def __call__(self, in_q, out_q):
+                        paths = await self.download_metadata()
+                        arguments = [(path,) for path in paths]
+                        async for batch in self.parse_in_processes(parse, arguments, self.remote):
+                            for declarative_content in batch:
+                                await out_q.put(declarative_content)
+                        await out_q.put(None)
+
+        """
+        if self.process_pool is None:
+            for args in arguments:
+                yield [DeclarativeContent.unpack(packed, remote) for packed in func(*args)]
+            return
+
+        loop = asyncio.get_event_loop()
+        futures = []
+        for args in arguments:
+            future = loop.create_future()
+            self.process_pool.apply_async(
+                func, args,
+                callback=partial(loop.call_soon_threadsafe, _set_result, future),
+                error_callback=partial(loop.call_soon_threadsafe, _set_exception, future))
+            futures.append(future)
+        try:
+            for future in asyncio.as_completed(futures):
+                yield [DeclarativeContent.unpack(packed, remote) for packed in await future]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def stop_thread(self):
+        """
+        Stop the thread started by :meth:`run_in_thread`, if any, and close its db connection.
+
+        This waits for the function running in the thread, if any, to return.
+        """
+        if self._executor is None:
+            return
+        # Closes the connections of the thread the function runs in
+        self._executor.submit(connections.close_all)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
     @staticmethod
-    async def batches(in_q, minsize=1):
+    async def batches(in_q, minsize=1, maxsize=None, max_wait=None, autotune=False, timer=None):
         """
         Asynchronous iterator yielding batches of :class:`DeclarativeContent` from `in_q`.
 
         The iterator will try to get as many instances of
         :class:`DeclarativeContent` as possible without blocking, but
-        at least `minsize` instances.
+        at least `minsize` instances, and at most `maxsize` instances.
+
+        With `max_wait`, `minsize` is a target rather than a minimum: a batch smaller than the
+        target is yielded once `max_wait` seconds have passed since its first instance arrived.
+        This gives stages doing one query per batch larger batches when their previous stage is
+        slow, without holding instances back indefinitely.
+
+        With `autotune`, the target is adjusted after each batch from the time the stage spent
+        handling the previous batches, see :class:`BatchSizeTuner`. It starts at `minsize` and
+        stays between `minsize` and `maxsize`. The time is measured with `timer`, which should
+        only count the work done on the batches: by default, it also counts the time the stage is
+        blocked putting items into its output queue, e.g. while a later stage is slow.
 
         Args:
             in_q (:class:`asyncio.Queue`): The queue to receive
                 :class:`~pulpcore.plugin.stages.DeclarativeContent` objects from.
-            minsize (int): The minimum batch size to yield (unless it is the final batch)
+            minsize (int): The minimum batch size to yield (unless it is the final batch), or the
+                target batch size if `max_wait` is set.
+            maxsize (int): The maximum batch size to yield. Optional, and unlimited by default.
+            max_wait (float): The number of seconds to wait for a batch to reach its target size.
+                Optional, and unlimited by default.
+            autotune (bool): Whether to adjust the target batch size to the time spent handling
+                batches. Requires `maxsize`.
+            timer (callable): Returns the number of seconds the stage spent handling batches so
+                far, e.g. :meth:`busy_time`. Optional, and the time of the event loop by default.
 
         Yields:
             A list of :class:`DeclarativeContent` instances
 
+        Raises:
+            ValueError: If `autotune` is set without `maxsize`, or the sizes are inconsistent.
+
         Examples:
             Used in stages to get large chunks of declarative_content instances from
             `in_q`::
@@ -56,8 +241,24 @@ class Stage:
                                 await out_q.put(declarative_content)
                         await out_q.put(None)
 
+            Stages querying the db once per batch wait a little for batches to fill up::
+
+                async for batch in self.batches(in_q, maxsize=500, max_wait=0.1, autotune=True,
+                                                timer=self.busy_time):
+                    await self.run_in_thread(self.save, batch)
+                    ...
+
         """
+        if maxsize is not None and maxsize < minsize:
+            raise ValueError(_('maxsize must not be smaller than minsize'))
+        if autotune and maxsize is None:
+            raise ValueError(_('autotune requires maxsize'))
+
+        loop = asyncio.get_event_loop()
+        tuner = BatchSizeTuner(minsize, maxsize) if autotune else None
+        timer = timer or loop.time
         batch = []
+        deadline = None
         shutdown = False
 
         def add_to_batch(batch, content):
@@ -66,19 +267,127 @@ class Stage:
             batch.append(content)
             return False
 
+        def full(batch):
+            return maxsize is not None and len(batch) >= maxsize
+
         while not shutdown:
-            content = await in_q.get()
-            shutdown = add_to_batch(batch, content)
-            while not shutdown:
-                try:
-                    content = in_q.get_nowait()
-                except asyncio.QueueEmpty:
-                    break
+            try:
+                if deadline is None:
+                    content = await in_q.get()
                 else:
-                    shutdown = add_to_batch(batch, content)
-            if batch and (len(batch) >= minsize or shutdown):
+                    content = await asyncio.wait_for(in_q.get(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                pass
+            else:
+                shutdown = add_to_batch(batch, content)
+                while not shutdown and not full(batch):
+                    try:
+                        content = in_q.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    else:
+                        shutdown = add_to_batch(batch, content)
+            if not batch:
+                continue
+            if max_wait is not None and deadline is None:
+                deadline = loop.time() + max_wait
+            target = tuner.size if tuner else minsize
+            expired = deadline is not None and loop.time() >= deadline
+            if len(batch) >= target or full(batch) or expired or shutdown:
+                started = timer()
                 yield batch
+                if tuner:
+                    tuner.observe(len(batch), timer() - started)
                 batch = []
+                deadline = None
+
+
+class BatchSizeTuner:
+    """
+    Find the batch size at which a stage handles its batches efficiently.
+
+    Handling a batch is modelled as taking a fixed time per batch, e.g. the round trip of a query,
+    plus a time per item. The two are estimated with a least squares fit over the recent batches,
+    recent ones weighing more. The size is the one at which the fixed time is `overhead` of the
+    time spent on a batch: larger batches would barely be faster per item, but would wait longer
+    to fill up and use more memory.
+
+    Args:
+        minsize (int): The smallest size to choose.
+        maxsize (int): The largest size to choose.
+        overhead (float): The share of the time handling a batch which may be fixed time.
+        decay (float): The weight kept by previous batches when a batch is observed.
+    """
+
+    def __init__(self, minsize, maxsize, overhead=0.1, decay=0.8):
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.overhead = overhead
+        self.decay = decay
+        self.size = minsize
+        # Weighted sums of the observed sizes and durations
+        self._weight = self._sizes = self._durations = self._squares = self._products = 0.0
+
+    def observe(self, size, duration):
+        """
+        Record the time spent handling a batch and update :attr:`size`.
+
+        Args:
+            size (int): The size of the batch.
+            duration (float): The number of seconds the batch was handled in.
+        """
+        self._weight = self.decay * self._weight + 1
+        self._sizes = self.decay * self._sizes + size
+        self._durations = self.decay * self._durations + duration
+        self._squares = self.decay * self._squares + size * size
+        self._products = self.decay * self._products + size * duration
+
+        variance = self._weight * self._squares - self._sizes ** 2
+        if variance <= 1e-9 * self._weight * self._squares:
+            # All sizes were the same, so the times cannot be told apart: try a larger size
+            self.size = min(max(2 * size, self.size), self.maxsize)
+            return
+        per_item = (self._weight * self._products - self._sizes * self._durations) / variance
+        per_batch = (self._durations - per_item * self._sizes) / self._weight
+        if per_item <= 0:
+            size = self.maxsize
+        elif per_batch <= 0:
+            size = self.minsize
+        else:
+            size = per_batch * (1 - self.overhead) / (self.overhead * per_item)
+        self.size = int(min(max(size, self.minsize), self.maxsize))
+
+
+def create_process_pool(processes):
+    """
+    Create the processes :meth:`Stage.parse_in_processes` runs functions in.
+
+    The processes are not forked from the worker, which runs other threads by then, e.g. the ones
+    of :meth:`Stage.run_in_thread`: a forked child could hang on a lock held by one of them. They
+    are forked from a server process started afresh instead, and set up Django before running any
+    function.
+
+    Args:
+        processes (int): The number of processes.
+
+    Returns:
+        :class:`multiprocessing.pool.Pool`: The pool of processes, which should be used as a context
+            manager so its processes are terminated once the pipeline is done.
+    """
+    context = multiprocessing.get_context('forkserver')
+    return context.Pool(processes, initializer=django.setup)
+
+
+def _set_result(future, result):
+    """Set the result of a future, unless it was cancelled meanwhile."""
+    if not future.cancelled():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    """Set the exception of a future, unless it was cancelled meanwhile."""
+    if not future.cancelled():
+        future.set_exception(exception)
 
 
 async def create_pipeline(stages, maxsize=100):
@@ -97,32 +406,60 @@ async def create_pipeline(stages, maxsize=100):
     >>>         await out_q.put(item)
     >>>     await out_q.put(None)  # this stage is shutdown so send 'None'
 
+    A stage which is the bottleneck of the pipeline, see :ref:`stages-api-profiling-docs`, can be
+    run as several instances in parallel by passing a list of instances in place of the stage. The
+    instances share their input and output queues. Each of them gets the `None` sent by the
+    previous stage, and the next stage only gets a `None` once all of them have sent one.
+
+    >>> stages = [first_stage, [ContentUnitSaver(), ContentUnitSaver()], EndStage()]
+
+    Once the pipeline is done, the threads its stages ran db work in are stopped, see
+    :meth:`Stage.run_in_thread`.
+
     Args:
-        stages (list of coroutines): A list of Stages API compatible coroutines.
-        maxsize (int): The maximum amount of items a queue between two stages should hold. Optional
-            and defaults to 100.
+        stages (list of coroutines): A list of Stages API compatible coroutines, or of lists of
+            instances of a stage to run in parallel.
+        maxsize (int or list): The maximum amount of items a queue between two stages should hold,
+            or a list with the maximum amount of each queue, from the queue between the first two
+            stages to the one between the last two. Optional and defaults to 100.
 
     Returns:
         A single coroutine that can be used to run, wait, or cancel the entire pipeline with.
+
+    Raises:
+        ValueError: If `maxsize` is a list without one amount for each queue between two stages.
     """
+    groups = [stage if isinstance(stage, list) else [stage] for stage in stages]
+    if isinstance(maxsize, int):
+        sizes = [maxsize] * len(groups)
+    elif len(maxsize) == len(groups) - 1:
+        # The queue after the last stage only fills up if the last stage is not an EndStage
+        sizes = list(maxsize) + [maxsize[-1] if maxsize else 0]
+    else:
+        raise ValueError(_('maxsize must have one amount for each queue between two stages'))
+
     futures = []
     if settings.PROFILE_STAGES_API:
-        in_q = ProfilingQueue.make_and_record_queue(stages[0], 0, maxsize)
-        for i, stage in enumerate(stages):
-            next_stage_num = i + 1
-            if next_stage_num == len(stages):
-                out_q = None
-            else:
-                next_stage = stages[next_stage_num]
-                out_q = ProfilingQueue.make_and_record_queue(next_stage, next_stage_num, maxsize)
-            futures.append(asyncio.ensure_future(stage(in_q, out_q)))
-            in_q = out_q
+        in_q = ProfilingQueue.make_and_record_queue(groups[0][0], 0, sizes[0])
     else:
         in_q = None
-        for stage in stages:
-            out_q = asyncio.Queue(maxsize=maxsize)
-            futures.append(asyncio.ensure_future(stage(in_q, out_q)))
-            in_q = out_q
+    for i, group in enumerate(groups):
+        next_stage_num = i + 1
+        if not settings.PROFILE_STAGES_API:
+            out_q = asyncio.Queue(maxsize=sizes[i])
+        elif next_stage_num == len(groups):
+            out_q = None
+        else:
+            next_stage = groups[next_stage_num][0]
+            out_q = ProfilingQueue.make_and_record_queue(next_stage, next_stage_num, sizes[i])
+        if len(group) == 1:
+            futures.append(asyncio.ensure_future(group[0](in_q, out_q)))
+        else:
+            shared_out_q = None if out_q is None else _SharedOutQueue(out_q, len(group))
+            for stage in group:
+                shared_in_q = None if in_q is None else _SharedInQueue(in_q)
+                futures.append(asyncio.ensure_future(stage(shared_in_q, shared_out_q)))
+        in_q = out_q
 
     try:
         await asyncio.gather(*futures)
@@ -137,6 +474,95 @@ async def create_pipeline(stages, maxsize=100):
         if pending:
             await asyncio.wait(pending, timeout=60)
         raise
+    finally:
+        for group in groups:
+            for stage in group:
+                if isinstance(stage, Stage):
+                    stage.stop_thread()
+        if settings.PROFILE_STAGES_API:
+            write_profile()
+
+
+class _SharedInQueue:
+    """
+    The input queue of an instance of a stage run in parallel, see :func:`create_pipeline`.
+
+    The instances get items from the same queue. The `None` sent by the previous stage is put back
+    by each instance getting it, so every instance gets it. Any other attribute is the one of the
+    queue.
+
+    Args:
+        queue (:class:`asyncio.Queue`): The queue shared by the instances.
+    """
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    def __getattr__(self, name):
+        return getattr(self._queue, name)
+
+    async def get(self):
+        """
+        Remove and return an item from the queue, waiting for one if the queue is empty.
+        """
+        return self._pass_on_shutdown(await self._queue.get())
+
+    def get_nowait(self):
+        """
+        Remove and return an item from the queue.
+
+        Raises:
+            asyncio.QueueEmpty: If the queue is empty.
+        """
+        return self._pass_on_shutdown(self._queue.get_nowait())
+
+    def _pass_on_shutdown(self, item):
+        if item is None:
+            # Nothing follows the None, so there is room for it
+            self._queue.put_nowait(None)
+        return item
+
+
+class _SharedOutQueue:
+    """
+    The output queue of the instances of a stage run in parallel, see :func:`create_pipeline`.
+
+    The instances put items into the same queue. Only the `None` of the last instance to shutdown
+    is put, so the next stage shuts down once all instances have. Any other attribute is the one of
+    the queue.
+
+    Args:
+        queue (:class:`asyncio.Queue`): The queue shared by the instances.
+        instances (int): The number of instances.
+    """
+
+    def __init__(self, queue, instances):
+        self._queue = queue
+        self._running = instances
+
+    def __getattr__(self, name):
+        return getattr(self._queue, name)
+
+    async def put(self, item):
+        """
+        Put an item into the queue, waiting for a free slot if the queue is full.
+        """
+        if item is not None or self._shutdown():
+            await self._queue.put(item)
+
+    def put_nowait(self, item):
+        """
+        Put an item into the queue.
+
+        Raises:
+            asyncio.QueueFull: If the queue is full.
+        """
+        if item is not None or self._shutdown():
+            self._queue.put_nowait(item)
+
+    def _shutdown(self):
+        self._running -= 1
+        return self._running == 0
 
 
 class EndStage(Stage):
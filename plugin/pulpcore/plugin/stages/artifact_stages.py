@@ -3,9 +3,9 @@ import logging
 
 from django.db.models import Q
 
-from pulpcore.plugin.models import Artifact, ProgressBar
+from pulpcore.plugin.models import Artifact, ProgressBar, touch
 
-from .api import Stage
+from .api import DB_BATCHES, Stage
 
 log = logging.getLogger(__name__)
 
@@ -24,13 +24,16 @@ class QueryExistingArtifacts(Stage):
     using their metadata for existing saved :class:`~pulpcore.plugin.models.Artifact` objects inside
     Pulp with the same digest value(s). Any existing :class:`~pulpcore.plugin.models.Artifact`
     objects found will replace their unsaved counterpart in the
-    :class:`~pulpcore.plugin.stages.DeclarativeArtifact` object.
+    :class:`~pulpcore.plugin.stages.DeclarativeArtifact` object. The existing
+    :class:`~pulpcore.plugin.models.Artifact` objects are touched, so orphan cleanup running
+    meanwhile does not remove them.
 
     Each :class:`~pulpcore.plugin.stages.DeclarativeContent` is sent to `out_q` after all of its
     :class:`~pulpcore.plugin.stages.DeclarativeArtifact` objects have been handled.
 
     This stage drains all available items from `in_q` and batches everything into one large call to
-    the db for efficiency.
+    the db for efficiency. Batches are given a little time to fill up, and their size is tuned to
+    the time the db takes to handle them, see :data:`~pulpcore.plugin.stages.api.DB_BATCHES`.
     """
 
     async def __call__(self, in_q, out_q):
@@ -46,31 +49,46 @@ class QueryExistingArtifacts(Stage):
         Returns:
             The coroutine for this stage.
         """
-        async for batch in self.batches(in_q):
-            all_artifacts_q = Q(pk=None)
-            for content in batch:
-                for declarative_artifact in content.d_artifacts:
-                    one_artifact_q = Q()
-                    for digest_name in declarative_artifact.artifact.DIGEST_FIELDS:
-                        digest_value = getattr(declarative_artifact.artifact, digest_name)
-                        if digest_value:
-                            key = {digest_name: digest_value}
-                            one_artifact_q &= Q(**key)
-                    if one_artifact_q:
-                        all_artifacts_q |= one_artifact_q
-
-            for artifact in Artifact.objects.filter(all_artifacts_q):
-                for content in batch:
-                    for declarative_artifact in content.d_artifacts:
-                        for digest_name in artifact.DIGEST_FIELDS:
-                            digest_value = getattr(declarative_artifact.artifact, digest_name)
-                            if digest_value and digest_value == getattr(artifact, digest_name):
-                                declarative_artifact.artifact = artifact
-                                break
+        async for batch in self.batches(in_q, timer=self.busy_time, **DB_BATCHES):
+            await self.run_in_thread(self._replace_existing, batch)
             for content in batch:
                 await out_q.put(content)
         await out_q.put(None)
 
+    def _replace_existing(self, batch):
+        """
+        Replace the unsaved Artifacts of a batch with the saved ones having the same digests.
+
+        This runs in the thread of the stage, see
+        :meth:`~pulpcore.plugin.stages.Stage.run_in_thread`.
+
+        Args:
+            batch (list of :class:`~pulpcore.plugin.stages.DeclarativeContent`): The batch of
+                :class:`~pulpcore.plugin.stages.DeclarativeContent` objects to handle.
+        """
+        all_artifacts_q = Q(pk=None)
+        for content in batch:
+            for declarative_artifact in content.d_artifacts:
+                one_artifact_q = Q()
+                for digest_name in declarative_artifact.artifact.DIGEST_FIELDS:
+                    digest_value = getattr(declarative_artifact.artifact, digest_name)
+                    if digest_value:
+                        key = {digest_name: digest_value}
+                        one_artifact_q &= Q(**key)
+                if one_artifact_q:
+                    all_artifacts_q |= one_artifact_q
+
+        # Touch the existing Artifacts first, so orphan cleanup does not remove them
+        touch(Artifact.objects.filter(all_artifacts_q))
+        for artifact in Artifact.objects.filter(all_artifacts_q):
+            for content in batch:
+                for declarative_artifact in content.d_artifacts:
+                    for digest_name in artifact.DIGEST_FIELDS:
+                        digest_value = getattr(declarative_artifact.artifact, digest_name)
+                        if digest_value and digest_value == getattr(artifact, digest_name):
+                            declarative_artifact.artifact = artifact
+                            break
+
 
 class ArtifactDownloaderRunner():
     """
@@ -132,8 +150,7 @@ class ArtifactDownloaderRunner():
                                 self._add_to_pending(self._handle_content_unit(content))
                         else:
                             download_count = task.result()
-                            pb.done += download_count
-                            pb.save()
+                            pb.increase_by(download_count)
 
                     if not self.shutdown:
                         if not self.saturated and self._content_get_task not in self._pending:
@@ -277,7 +294,8 @@ class ArtifactSaver(Stage):
     :class:`~pulpcore.plugin.stages.DeclarativeArtifact` objects have been handled.
 
     This stage drains all available items from `in_q` and batches everything into one large call to
-    the db for efficiency.
+    the db for efficiency. Batches are given a little time to fill up, and their size is tuned to
+    the time the db takes to handle them, see :data:`~pulpcore.plugin.stages.api.DB_BATCHES`.
     """
 
     async def __call__(self, in_q, out_q):
@@ -293,7 +311,7 @@ class ArtifactSaver(Stage):
         Returns:
             The coroutine for this stage.
         """
-        async for batch in self.batches(in_q):
+        async for batch in self.batches(in_q, timer=self.busy_time, **DB_BATCHES):
             artifacts_to_save = []
             for declarative_content in batch:
                 for declarative_artifact in declarative_content.d_artifacts:
@@ -302,7 +320,7 @@ class ArtifactSaver(Stage):
                         artifacts_to_save.append(declarative_artifact.artifact)
 
             if artifacts_to_save:
-                Artifact.objects.bulk_create(artifacts_to_save)
+                await self.run_in_thread(Artifact.objects.bulk_create, artifacts_to_save)
 
             for declarative_content in batch:
                 await out_q.put(declarative_content)
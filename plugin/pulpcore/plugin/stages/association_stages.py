@@ -65,9 +65,7 @@ class ContentUnitAssociation(Stage):
 
                 for model_type, q_object in content_q_by_type.items():
                     queryset = model_type.objects.filter(q_object)
-                    self.new_version.add_content(queryset)
-                    pb.done = pb.done + queryset.count()
-                    pb.save()
+                    pb.increase_by(await self.run_in_thread(self._add_content, queryset))
 
             for unit_type, ids in self.unit_keys_by_type.items():
                 if ids:
@@ -80,6 +78,19 @@ class ContentUnitAssociation(Stage):
                     await out_q.put(unit_type.objects.filter(units_to_unassociate))
             await out_q.put(None)
 
+    def _add_content(self, queryset):
+        """
+        Associate content units with `new_version`, in the thread of the stage.
+
+        Args:
+            queryset (:class:`django.db.models.query.QuerySet`): The content units to associate.
+
+        Returns:
+            int: The number of content units.
+        """
+        self.new_version.add_content(queryset)
+        return queryset.count()
+
 
 class ContentUnitUnassociation(Stage):
     """
@@ -125,9 +136,21 @@ class ContentUnitUnassociation(Stage):
                     if queryset_to_unassociate is None:
                         break
 
-                    self.new_version.remove_content(queryset_to_unassociate)
-                    pb.done = pb.done + queryset_to_unassociate.count()
-                    pb.save()
+                    pb.increase_by(await self.run_in_thread(self._remove_content,
+                                                            queryset_to_unassociate))
 
                     await out_q.put(queryset_to_unassociate)
                 await out_q.put(None)
+
+    def _remove_content(self, queryset):
+        """
+        Unassociate content units from `new_version`, in the thread of the stage.
+
+        Args:
+            queryset (:class:`django.db.models.query.QuerySet`): The content units to unassociate.
+
+        Returns:
+            int: The number of content units.
+        """
+        self.new_version.remove_content(queryset)
+        return queryset.count()
@@ -1,11 +1,12 @@
+import asyncio
 from collections import defaultdict
 
 from django.db import transaction
 from django.db.models import Q
 
-from pulpcore.plugin.models import ContentArtifact, RemoteArtifact
+from pulpcore.plugin.models import ContentArtifact, RemoteArtifact, touch
 
-from .api import Stage
+from .api import DB_BATCHES, Stage
 
 
 class QueryExistingContentUnits(Stage):
@@ -21,13 +22,15 @@ class QueryExistingContentUnits(Stage):
 
     This stage inspects any "unsaved" Content unit objects and searches for existing saved Content
     units inside Pulp with the same unit key. Any existing Content objects found, replace their
-    "unsaved" counterpart in the :class:`~pulpcore.plugin.stages.DeclarativeContent` object.
+    "unsaved" counterpart in the :class:`~pulpcore.plugin.stages.DeclarativeContent` object. The
+    existing Content objects are touched, so orphan cleanup running meanwhile does not remove them.
 
     Each :class:`~pulpcore.plugin.stages.DeclarativeContent` is sent to `out_q` after it has been
     handled.
 
     This stage drains all available items from `in_q` and batches everything into one large call to
-    the db for efficiency.
+    the db for efficiency. Batches are given a little time to fill up, and their size is tuned to
+    the time the db takes to handle them, see :data:`~pulpcore.plugin.stages.api.DB_BATCHES`.
     """
 
     async def __call__(self, in_q, out_q):
@@ -43,29 +46,44 @@ class QueryExistingContentUnits(Stage):
         Returns:
             The coroutine for this stage.
         """
-        async for batch in self.batches(in_q):
-            content_q_by_type = defaultdict(lambda: Q(pk=None))
-            for declarative_content in batch:
-                model_type = type(declarative_content.content)
-                unit_key = declarative_content.content.natural_key_dict()
-                content_q_by_type[model_type] = content_q_by_type[model_type] | Q(**unit_key)
-
-            for model_type in content_q_by_type.keys():
-                for result in model_type.objects.filter(content_q_by_type[model_type]):
-                    for declarative_content in batch:
-                        not_same_unit = False
-                        for field in result.natural_key_fields():
-                            in_memory_digest_value = getattr(declarative_content.content, field)
-                            if in_memory_digest_value != getattr(result, field):
-                                not_same_unit = True
-                                break
-                        if not_same_unit:
-                            continue
-                        declarative_content.content = result
+        async for batch in self.batches(in_q, timer=self.busy_time, **DB_BATCHES):
+            await self.run_in_thread(self._replace_existing, batch)
             for declarative_content in batch:
                 await out_q.put(declarative_content)
         await out_q.put(None)
 
+    def _replace_existing(self, batch):
+        """
+        Replace the unsaved Content units of a batch with the saved ones having the same unit key.
+
+        This runs in the thread of the stage, see
+        :meth:`~pulpcore.plugin.stages.Stage.run_in_thread`.
+
+        Args:
+            batch (list of :class:`~pulpcore.plugin.stages.DeclarativeContent`): The batch of
+                :class:`~pulpcore.plugin.stages.DeclarativeContent` objects to handle.
+        """
+        content_q_by_type = defaultdict(lambda: Q(pk=None))
+        for declarative_content in batch:
+            model_type = type(declarative_content.content)
+            unit_key = declarative_content.content.natural_key_dict()
+            content_q_by_type[model_type] = content_q_by_type[model_type] | Q(**unit_key)
+
+        for model_type in content_q_by_type.keys():
+            # Touch the existing units first, so orphan cleanup does not remove them
+            touch(model_type.objects.filter(content_q_by_type[model_type]))
+            for result in model_type.objects.filter(content_q_by_type[model_type]):
+                for declarative_content in batch:
+                    not_same_unit = False
+                    for field in result.natural_key_fields():
+                        in_memory_digest_value = getattr(declarative_content.content, field)
+                        if in_memory_digest_value != getattr(result, field):
+                            not_same_unit = True
+                            break
+                    if not_same_unit:
+                        continue
+                    declarative_content.content = result
+
 
 class ContentUnitSaver(Stage):
     """
@@ -85,7 +103,8 @@ class ContentUnitSaver(Stage):
     Each :class:`~pulpcore.plugin.stages.DeclarativeContent` is sent to after it has been handled.
 
     This stage drains all available items from `in_q` and batches everything into one large call to
-    the db for efficiency.
+    the db for efficiency. Batches are given a little time to fill up, and their size is tuned to
+    the time the db takes to handle them, see :data:`~pulpcore.plugin.stages.api.DB_BATCHES`.
     """
 
     async def __call__(self, in_q, out_q):
@@ -101,59 +120,91 @@ class ContentUnitSaver(Stage):
         Returns:
             The coroutine for this stage.
         """
-        async for batch in self.batches(in_q):
-            content_artifact_bulk = []
-            remote_artifact_bulk = []
-            remote_artifact_map = {}
-
-            with transaction.atomic():
-                await self._pre_save(batch)
-                for declarative_content in batch:
-                    if declarative_content.content.pk is None:
-                            declarative_content.content.save()
-                            for declarative_artifact in declarative_content.d_artifacts:
-                                content_artifact = ContentArtifact(
-                                    content=declarative_content.content,
-                                    artifact=declarative_artifact.artifact,
-                                    relative_path=declarative_artifact.relative_path
-                                )
-                                content_artifact_bulk.append(content_artifact)
-                                remote_artifact_data = {
-                                    'url': declarative_artifact.url,
-                                    'size': declarative_artifact.artifact.size,
-                                    'md5': declarative_artifact.artifact.md5,
-                                    'sha1': declarative_artifact.artifact.sha1,
-                                    'sha224': declarative_artifact.artifact.sha224,
-                                    'sha256': declarative_artifact.artifact.sha256,
-                                    'sha384': declarative_artifact.artifact.sha384,
-                                    'sha512': declarative_artifact.artifact.sha512,
-                                    'remote': declarative_artifact.remote,
-                                }
-                                rel_path = declarative_artifact.relative_path
-                                content_key = str(content_artifact.content.pk) + rel_path
-                                remote_artifact_map[content_key] = remote_artifact_data
-
-                for content_artifact in ContentArtifact.objects.bulk_create(content_artifact_bulk):
-                    rel_path = content_artifact.relative_path
-                    content_key = str(content_artifact.content.pk) + rel_path
-                    remote_artifact_data = remote_artifact_map.pop(content_key)
-                    new_remote_artifact = RemoteArtifact(
-                        content_artifact=content_artifact, **remote_artifact_data
-                    )
-                    remote_artifact_bulk.append(new_remote_artifact)
-
-                RemoteArtifact.objects.bulk_create(remote_artifact_bulk)
-                await self._post_save(batch)
-
+        async for batch in self.batches(in_q, timer=self.busy_time, **DB_BATCHES):
+            await self.run_in_thread(self._save, batch)
             for declarative_content in batch:
                 await out_q.put(declarative_content)
         await out_q.put(None)
 
+    def _save(self, batch):
+        """
+        Save the unsaved Content units of a batch, with their ContentArtifacts and RemoteArtifacts.
+
+        This runs in the thread of the stage, see
+        :meth:`~pulpcore.plugin.stages.Stage.run_in_thread`.
+
+        Args:
+            batch (list of :class:`~pulpcore.plugin.stages.DeclarativeContent`): The batch of
+                :class:`~pulpcore.plugin.stages.DeclarativeContent` objects to be saved.
+        """
+        content_artifact_bulk = []
+        remote_artifact_bulk = []
+        remote_artifact_map = {}
+
+        with transaction.atomic():
+            self._run_hook(self._pre_save(batch))
+            for declarative_content in batch:
+                if declarative_content.content.pk is None:
+                        declarative_content.content.save()
+                        for declarative_artifact in declarative_content.d_artifacts:
+                            content_artifact = ContentArtifact(
+                                content=declarative_content.content,
+                                artifact=declarative_artifact.artifact,
+                                relative_path=declarative_artifact.relative_path
+                            )
+                            content_artifact_bulk.append(content_artifact)
+                            remote_artifact_data = {
+                                'url': declarative_artifact.url,
+                                'size': declarative_artifact.artifact.size,
+                                'md5': declarative_artifact.artifact.md5,
+                                'sha1': declarative_artifact.artifact.sha1,
+                                'sha224': declarative_artifact.artifact.sha224,
+                                'sha256': declarative_artifact.artifact.sha256,
+                                'sha384': declarative_artifact.artifact.sha384,
+                                'sha512': declarative_artifact.artifact.sha512,
+                                'remote': declarative_artifact.remote,
+                            }
+                            rel_path = declarative_artifact.relative_path
+                            content_key = str(content_artifact.content.pk) + rel_path
+                            remote_artifact_map[content_key] = remote_artifact_data
+
+            for content_artifact in ContentArtifact.objects.bulk_create(content_artifact_bulk):
+                rel_path = content_artifact.relative_path
+                content_key = str(content_artifact.content.pk) + rel_path
+                remote_artifact_data = remote_artifact_map.pop(content_key)
+                new_remote_artifact = RemoteArtifact(
+                    content_artifact=content_artifact, **remote_artifact_data
+                )
+                remote_artifact_bulk.append(new_remote_artifact)
+
+            RemoteArtifact.objects.bulk_create(remote_artifact_bulk)
+            self._run_hook(self._post_save(batch))
+
+    @staticmethod
+    def _run_hook(coroutine):
+        """
+        Run a hook coroutine to completion in the thread of the stage.
+
+        The hooks run within the transaction of :meth:`_save`, so they run in the same thread, on
+        an event loop of their own.
+
+        Args:
+            coroutine: The coroutine of the hook.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(coroutine)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
     async def _pre_save(self, batch):
         """
         A hook plugin-writers can override to save related objects prior to content unit saving.
 
-        This is run within the same transaction as the content unit saving.
+        This is run within the same transaction as the content unit saving, in the thread of the
+        stage. It must not use the event loop of the pipeline.
 
         Args:
             batch (list of :class:`~pulpcore.plugin.stages.DeclarativeContent`): The batch of
@@ -166,7 +217,8 @@ class ContentUnitSaver(Stage):
         """
         A hook plugin-writers can override to save related objects after content unit saving.
 
-        This is run within the same transaction as the content unit saving.
+        This is run within the same transaction as the content unit saving, in the thread of the
+        stage. It must not use the event loop of the pipeline.
 
         Args:
             batch (list of :class:`~pulpcore.plugin.stages.DeclarativeContent`): The batch of
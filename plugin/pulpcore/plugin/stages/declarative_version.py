@@ -3,7 +3,7 @@ import asyncio
 from pulpcore.plugin.models import RepositoryVersion
 from pulpcore.plugin.tasking import WorkingDirectory
 
-from .api import create_pipeline, EndStage
+from .api import create_pipeline, create_process_pool, EndStage
 from .artifact_stages import ArtifactDownloader, ArtifactSaver, QueryExistingArtifacts
 from .association_stages import ContentUnitAssociation, ContentUnitUnassociation
 from .content_unit_stages import ContentUnitSaver, QueryExistingContentUnits
@@ -11,7 +11,7 @@ from .content_unit_stages import ContentUnitSaver, QueryExistingContentUnits
 
 class DeclarativeVersion:
 
-    def __init__(self, first_stage, repository, mirror=True):
+    def __init__(self, first_stage, repository, mirror=True, processes=0):
         """
         A pipeline that creates a new :class:`~pulpcore.plugin.models.RepositoryVersion` from a
         stream of :class:`~pulpcore.plugin.stages.DeclarativeContent` objects.
@@ -69,6 +69,12 @@ class DeclarativeVersion:
         >>> first_stage = MyFirstStage(remote)
         >>> DeclarativeVersion(first_stage, repository).create()
 
+        A first stage parsing large metadata can parse it in other processes, so the sync uses
+        several cores, see :meth:`~pulpcore.plugin.stages.Stage.parse_in_processes`. The number of
+        processes is given with `processes`:
+
+        >>> DeclarativeVersion(first_stage, repository, processes=4).create()
+
         Args:
              first_stage (:class:`~pulpcore.plugin.stages.Stage`): The first stage to receive
                  :class:`~pulpcore.plugin.stages.DeclarativeContent` from.
@@ -81,10 +87,14 @@ class DeclarativeVersion:
                  :class:`~pulpcore.plugin.stages.DeclarativeVersion stream`, and does not remove any
                  pre-existing units in the :class:`~pulpcore.plugin.models.RepositoryVersion`.
                  'True' is the default.
+             processes (int): The number of processes the first stage parses metadata in, see
+                 :meth:`~pulpcore.plugin.stages.Stage.parse_in_processes`. 0, the default, parses
+                 it in the event loop.
         """
         self.first_stage = first_stage
         self.repository = repository
         self.mirror = mirror
+        self.processes = processes
 
     def pipeline_stages(self, new_version):
         """
@@ -122,4 +132,12 @@ class DeclarativeVersion:
                     stages.append(ContentUnitUnassociation(new_version))
                 stages.append(EndStage())
                 pipeline = create_pipeline(stages)
-                loop.run_until_complete(pipeline)
+                if self.processes:
+                    with create_process_pool(self.processes) as process_pool:
+                        self.first_stage.process_pool = process_pool
+                        try:
+                            loop.run_until_complete(pipeline)
+                        finally:
+                            self.first_stage.process_pool = None
+                else:
+                    loop.run_until_complete(pipeline)
@@ -1,5 +1,10 @@
 from gettext import gettext as _
 
+from django.apps import apps
+from django.db.models.fields.files import FieldFile
+
+from pulpcore.plugin.models import Artifact
+
 
 class DeclarativeArtifact:
     """
@@ -74,3 +79,96 @@ class DeclarativeContent:
         self.content = content
         self.d_artifacts = d_artifacts or []
         self.extra_data = extra_data or {}
+
+    def pack(self):
+        """
+        Pack this object into a compact tuple of plain values, to send it to another process.
+
+        This is the same as :func:`~pulpcore.plugin.stages.pack_content`, which packs content
+        without building this object. Functions run in other processes use the latter, as they have
+        no remote to make the :class:`~pulpcore.plugin.stages.DeclarativeArtifact` objects with.
+
+        Returns:
+            tuple: The packed :class:`~pulpcore.plugin.stages.DeclarativeContent`.
+        """
+        artifacts = ((d_artifact.artifact, d_artifact.url, d_artifact.relative_path,
+                      d_artifact.extra_data) for d_artifact in self.d_artifacts)
+        return pack_content(self.content, artifacts, self.extra_data)
+
+    @classmethod
+    def unpack(cls, packed, remote):
+        """
+        Make a :class:`~pulpcore.plugin.stages.DeclarativeContent` from the tuple made by
+        :func:`~pulpcore.plugin.stages.pack_content` or :meth:`pack`.
+
+        Args:
+            packed (tuple): The packed :class:`~pulpcore.plugin.stages.DeclarativeContent`.
+            remote (:class:`~pulpcore.plugin.models.Remote`): The remote to fetch the Artifacts
+                with.
+
+        Returns:
+            :class:`~pulpcore.plugin.stages.DeclarativeContent`: The unsaved content unit and
+                Artifacts.
+        """
+        label, content_values, d_artifacts, extra_data = packed
+        d_artifacts = [
+            DeclarativeArtifact(artifact=Artifact(**artifact_values), url=url,
+                                relative_path=relative_path, remote=remote,
+                                extra_data=d_artifact_extra_data)
+            for artifact_values, url, relative_path, d_artifact_extra_data in d_artifacts
+        ]
+        content = apps.get_model(label)(**content_values)
+        return cls(content=content, d_artifacts=d_artifacts, extra_data=extra_data)
+
+
+def pack_content(content, artifacts=(), extra_data=None):
+    """
+    Pack a content unit and its Artifacts into a compact tuple of plain values, to send them to
+    another process.
+
+    The content unit and the Artifacts are packed as the label of their model and the values of
+    their fields which are set, instead of pickling the model instances. No remote is needed, the
+    one to fetch the Artifacts with is given to
+    :meth:`~pulpcore.plugin.stages.DeclarativeContent.unpack`.
+
+    Args:
+        content (subclass of :class:`~pulpcore.plugin.models.Content`): An unsaved content unit.
+        artifacts (iterable): A tuple for each Artifact of the content unit: the unsaved
+            :class:`~pulpcore.plugin.models.Artifact`, the url to fetch it from and its
+            relative_path, optionally followed by a dict of extra data.
+        extra_data (dict): Additional data stored with the content unit.
+
+    Returns:
+        tuple: The packed :class:`~pulpcore.plugin.stages.DeclarativeContent`.
+
+    Examples:
+        Used in a function parsing metadata in another process::
+
+            def parse(path):
+                return [pack_content(MyContent(name=entry.name),
+                                     [(Artifact(sha256=entry.sha256), entry.url, entry.path)])
+                        for entry in read_entries(path)]
+    """
+    packed_artifacts = []
+    for artifact, url, relative_path, *artifact_extra_data in artifacts:
+        packed_artifacts.append((_field_values(artifact), url, relative_path,
+                                 artifact_extra_data[0] if artifact_extra_data else {}))
+    return (content._meta.label, _field_values(content), tuple(packed_artifacts),
+            extra_data or {})
+
+
+def _field_values(instance):
+    """
+    Returns:
+        dict: The values of the fields of an unsaved model instance which are set, by field name.
+    """
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        value = getattr(instance, field.attname)
+        if isinstance(value, FieldFile):
+            value = value.name
+        if value is not None and value != '':
+            values[field.attname] = value
+    return values
@@ -1,3 +1,4 @@
+from array import array
 from asyncio import Queue
 import pathlib
 import time
@@ -10,6 +11,12 @@ from pulpcore.tasking import connection
 
 CONN = None
 
+# The (uuid, name, num) of the stages recorded since the profile was last written
+_STAGES = []
+
+# The queues created since the profile was last written
+_QUEUES = []
+
 
 class ProfilingQueue(Queue):
     """
@@ -26,8 +33,10 @@ class ProfilingQueue(Queue):
         * queue_length - The number of waiting items in the queue, measured before each new arrival.
         * interarrival_time - The number of seconds since the previous arrival to this Queue.
 
-    See the :meth:`create_profile_db_and_connection()` docs for more info on the database tables and
-    layout.
+    The statistics are kept in memory, in arrays of the queue, so recording them barely slows down
+    the pipeline. They are written to sqlite3 once the pipeline is done, see
+    :func:`write_profile`, and the :meth:`create_profile_db_and_connection()` docs for more info
+    on the database tables and layout.
 
     Args:
          stage_uuid (uuid.UUID): The uuid of the stage this ProfilingQueue delivers work into.
@@ -36,8 +45,12 @@ class ProfilingQueue(Queue):
     """
 
     def __init__(self, stage_uuid, *args, **kwargs):
-        self.last_arrival_time = time.time()
+        self.last_arrival_time = time.perf_counter()
         self.stage_uuid = stage_uuid
+        self.waiting_times = array('d')
+        self.service_times = array('d')
+        self.lengths = array('l')
+        self.interarrival_times = array('d')
         return super().__init__(*args, **kwargs)
 
     def get_nowait(self):
@@ -45,21 +58,21 @@ class ProfilingQueue(Queue):
         Thinly wrap `asyncio.get_nowait` and record when get_nowait() operations happen.
         """
         item = super().get_nowait()
-        if item:
-            now = time.time()
+        if item is not None:
+            now = time.perf_counter()
             item.extra_data['last_waiting_time'] = now - item.extra_data['last_put_time']
             item.extra_data['last_get_time'] = now
         return item
 
     def put_nowait(self, item):
         """
-        Thinly wrap `asyncio.put_nowait` happens and write statistics about them to the sqlite3 DB.
+        Thinly wrap `asyncio.put_nowait` and record statistics about the item in memory.
 
-        This method computes and writes the following statistics: waiting time, service time, queue
-        length, and interarrival time.
+        This method computes and records the following statistics: waiting time, service time,
+        queue length, and interarrival time.
         """
-        if item:
-            now = time.time()
+        if item is not None:
+            now = time.perf_counter()
             if not hasattr(item, 'extra_data'):
                 # track stages that use QuerySet items too
                 item.extra_data = {}
@@ -68,22 +81,11 @@ class ProfilingQueue(Queue):
             except KeyError:
                 pass
             else:
-                service_time = now - item.extra_data['last_get_time']
-                sql = "INSERT INTO traffic (uuid, waiting_time, service_time) VALUES (" \
-                      "'{uuid}','{waiting_time}','{service_time}')"
-                formatted_sql = sql.format(
-                    uuid=self.stage_uuid, waiting_time=last_waiting_time, service_time=service_time
-                )
-                CONN.cursor().execute(formatted_sql)
-
-            interarrival_time = now - self.last_arrival_time
-            sql = "INSERT INTO system (uuid, length, interarrival_time) VALUES (" \
-                  "'{uuid}','{length}','{interarrival}')"
-            formatted_sql = sql.format(
-                uuid=self.stage_uuid, length=super().qsize(), interarrival=interarrival_time
-            )
-            CONN.cursor().execute(formatted_sql)
-            CONN.commit()
+                self.waiting_times.append(last_waiting_time)
+                self.service_times.append(now - item.extra_data['last_get_time'])
+
+            self.lengths.append(super().qsize())
+            self.interarrival_times.append(now - self.last_arrival_time)
 
             item.extra_data['last_put_time'] = now
             self.last_arrival_time = now
@@ -92,7 +94,7 @@ class ProfilingQueue(Queue):
     @staticmethod
     def make_and_record_queue(stage, num, maxsize):
         """
-        Create a ProfileQueue that is associated with the stage it feeds and record it in sqlite3.
+        Create a ProfileQueue that is associated with the stage it feeds and record it.
 
         Args:
             stage (uuid.UUID): The uuid of this stage for correlation with other table data.
@@ -100,22 +102,46 @@ class ProfilingQueue(Queue):
             maxsize: The `maxsize` parameter being used to configure the ProfilingQueue with.
 
         Returns:
-            ProfilingQueue: The configured ProfilingQueue that was also recorded in the db.
+            ProfilingQueue: The configured ProfilingQueue that was also recorded.
         """
-        if CONN is None:
-            create_profile_db_and_connection()
         stage_id = uuid.uuid4()
         stage_name = '.'.join([stage.__class__.__module__, stage.__class__.__name__])
-        sql = "INSERT INTO stages (uuid, name, num) VALUES (" \
-              "'{uuid}','{stage}','{num}')"
-        formatted_sql = sql.format(
-            uuid=stage_id, stage=stage_name, num=num)
-        CONN.cursor().execute(formatted_sql)
+        _STAGES.append((str(stage_id), stage_name, num))
         in_q = ProfilingQueue(stage_id, maxsize=maxsize)
-        CONN.commit()
+        _QUEUES.append(in_q)
         return in_q
 
 
+def write_profile():
+    """
+    Write the statistics recorded since they were last written to the sqlite3 db of the task.
+
+    All rows are inserted with one statement per table and committed once. This is called by
+    :func:`~pulpcore.plugin.stages.create_pipeline` once the pipeline is done.
+    """
+    if not _STAGES:
+        return
+    if CONN is None:
+        create_profile_db_and_connection()
+    c = CONN.cursor()
+    c.executemany("INSERT INTO stages (uuid, name, num) VALUES (?, ?, ?)", _STAGES)
+    for queue in _QUEUES:
+        stage_id = str(queue.stage_uuid)
+        c.executemany(
+            "INSERT INTO traffic (uuid, waiting_time, service_time) VALUES (?, ?, ?)",
+            ((stage_id, waiting_time, service_time)
+             for waiting_time, service_time in zip(queue.waiting_times, queue.service_times))
+        )
+        c.executemany(
+            "INSERT INTO system (uuid, length, interarrival_time) VALUES (?, ?, ?)",
+            ((stage_id, length, interarrival_time)
+             for length, interarrival_time in zip(queue.lengths, queue.interarrival_times))
+        )
+    CONN.commit()
+    del _STAGES[:]
+    del _QUEUES[:]
+
+
 def create_profile_db_and_connection():
     """
     Create a profile db from this tasks UUID and a sqlite3 connection to that databases.
@@ -144,7 +170,7 @@ def create_profile_db_and_connection():
     if current_job:
         db_path = debug_data_dir + current_job.id
     else:
-        db_path = debug_data_dir + uuid.uuid4()
+        db_path = debug_data_dir + str(uuid.uuid4())
 
     import sqlite3
     global CONN
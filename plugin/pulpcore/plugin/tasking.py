@@ -4,7 +4,7 @@ from pulpcore.app import models
 from pulpcore.exceptions import exception_to_dict
 
 # Support plugins dispatching tasks
-from pulpcore.tasking.tasks import enqueue_with_reservation  # noqa
+from pulpcore.tasking.tasks import bulk_enqueue_with_reservation, enqueue_with_reservation  # noqa
 
 # Support plugins working with the working directory.
 from pulpcore.tasking.services.storage import WorkingDirectory  # noqa
@@ -0,0 +1,57 @@
+import pickle
+
+from django.test import TestCase
+
+from pulpcore.plugin.models import Artifact, Content
+from pulpcore.plugin.stages import DeclarativeArtifact, DeclarativeContent, pack_content
+
+
+class TestDeclarativeContentPacking(TestCase):
+
+    def test_pack_and_unpack(self):
+        remote = object()
+        artifact = Artifact(sha256='0' * 64, size=42)
+        d_artifact = DeclarativeArtifact(artifact=artifact, url='http://example.com/a',
+                                         relative_path='a', remote=remote,
+                                         extra_data={'key': 'value'})
+        packed = DeclarativeContent(content=Content(), d_artifacts=[d_artifact]).pack()
+
+        unpacked = DeclarativeContent.unpack(pickle.loads(pickle.dumps(packed)), remote)
+        self.assertIsInstance(unpacked.content, Content)
+        self.assertIsNone(unpacked.content.pk)
+        d_artifact = unpacked.d_artifacts[0]
+        self.assertEqual(('0' * 64, 42), (d_artifact.artifact.sha256, d_artifact.artifact.size))
+        self.assertEqual(('http://example.com/a', 'a'), (d_artifact.url, d_artifact.relative_path))
+        self.assertIs(remote, d_artifact.remote)
+        self.assertEqual({'key': 'value'}, d_artifact.extra_data)
+
+    def test_pack_is_plain(self):
+        artifact = Artifact(sha256='0' * 64)
+        d_artifact = DeclarativeArtifact(artifact=artifact, url='http://example.com/a',
+                                         relative_path='a', remote=object())
+        label, content_values, d_artifacts, extra_data = DeclarativeContent(
+            content=Content(), d_artifacts=[d_artifact]).pack()
+        self.assertEqual(Content._meta.label, label)
+        self.assertEqual({'sha256': '0' * 64}, d_artifacts[0][0])
+
+    def test_pack_content(self):
+        remote = object()
+        packed = pack_content(Content(), [(Artifact(sha256='0' * 64), 'http://example.com/a', 'a'),
+                                          (Artifact(sha256='1' * 64), 'http://example.com/b', 'b',
+                                           {'key': 'value'})],
+                              {'content': 'data'})
+
+        unpacked = DeclarativeContent.unpack(pickle.loads(pickle.dumps(packed)), remote)
+        self.assertIsInstance(unpacked.content, Content)
+        self.assertEqual({'content': 'data'}, unpacked.extra_data)
+        self.assertEqual([('0' * 64, 'a', {}), ('1' * 64, 'b', {'key': 'value'})],
+                         [(d_artifact.artifact.sha256, d_artifact.relative_path,
+                           d_artifact.extra_data) for d_artifact in unpacked.d_artifacts])
+        self.assertTrue(all(d_artifact.remote is remote for d_artifact in unpacked.d_artifacts))
+
+    def test_pack_content_without_artifacts(self):
+        packed = pack_content(Content())
+
+        unpacked = DeclarativeContent.unpack(packed, object())
+        self.assertIsInstance(unpacked.content, Content)
+        self.assertEqual([], unpacked.d_artifacts)
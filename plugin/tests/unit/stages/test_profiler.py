@@ -0,0 +1,32 @@
+import uuid
+
+import asynctest
+
+from pulpcore.plugin.stages import ProfilingQueue
+
+
+class Item:
+    pass
+
+
+class TestProfilingQueue(asynctest.TestCase):
+
+    async def test_records_in_memory(self):
+        first_q = ProfilingQueue(uuid.uuid4())
+        second_q = ProfilingQueue(uuid.uuid4())
+        for i in range(3):
+            await first_q.put(Item())
+        await first_q.put(None)
+
+        while True:
+            item = await first_q.get()
+            if item is None:
+                break
+            await second_q.put(item)
+
+        self.assertEqual([0, 1, 2], list(first_q.lengths))
+        self.assertEqual(3, len(first_q.interarrival_times))
+        self.assertEqual(0, len(first_q.service_times))
+        self.assertEqual(3, len(second_q.waiting_times))
+        self.assertEqual(3, len(second_q.service_times))
+        self.assertTrue(all(time >= 0 for time in second_q.service_times))
@@ -1,8 +1,25 @@
 import asyncio
+import threading
+import time
 
 import asynctest
 
-from pulpcore.plugin.stages import Stage
+from pulpcore.plugin.models import Artifact, Content
+from pulpcore.plugin.stages import (
+    BatchSizeTuner,
+    create_pipeline,
+    create_process_pool,
+    pack_content,
+    Stage,
+)
+
+
+def parse(name, count):
+    """Parse metadata made of `count` content units, in a process of the pool in some tests."""
+    if count < 0:
+        raise ValueError(name)
+    return [pack_content(Content(), [(Artifact(size=i), 'http://example.com/' + name, name)])
+            for i in range(count)]
 
 
 class TestStage(asynctest.TestCase):
@@ -47,6 +64,48 @@ class TestStage(asynctest.TestCase):
         with self.assertRaises(StopAsyncIteration):
             await batch_it.__anext__()
 
+    async def test_maxsize(self):
+        in_q = asyncio.Queue()
+        for i in range(5):
+            in_q.put_nowait(i)
+        in_q.put_nowait(None)
+        batches = [batch async for batch in Stage.batches(in_q, maxsize=2)]
+        self.assertEqual([[0, 1], [2, 3], [4]], batches)
+
+    async def test_max_wait(self):
+        in_q = asyncio.Queue()
+        in_q.put_nowait(1)
+        batch_it = Stage.batches(in_q, minsize=10, max_wait=0.01)
+        self.assertEqual([1], await batch_it.__anext__())
+        in_q.put_nowait(None)
+        with self.assertRaises(StopAsyncIteration):
+            await batch_it.__anext__()
+
+    async def test_autotune_requires_maxsize(self):
+        with self.assertRaises(ValueError):
+            await Stage.batches(asyncio.Queue(), autotune=True).__anext__()
+
+    @asynctest.patch.object(BatchSizeTuner, 'observe')
+    async def test_autotune_timer(self, observe):
+        """The batches are timed with the timer, not counting the time blocked on the out_q."""
+        stage = Stage()
+        in_q = asyncio.Queue()
+        out_q = asyncio.Queue(maxsize=1)
+        for i in range(3):
+            in_q.put_nowait(i)
+        in_q.put_nowait(None)
+        async for batch in stage.batches(in_q, maxsize=2, autotune=True, timer=stage.busy_time):
+            await stage.run_in_thread(time.sleep, 0.01)
+            for item in batch:
+                try:
+                    await asyncio.wait_for(out_q.put(item), 0.05)
+                except asyncio.TimeoutError:
+                    pass
+        self.assertEqual([call[0][0] for call in observe.call_args_list], [2, 1])
+        for call in observe.call_args_list:
+            self.assertGreaterEqual(call[0][1], 0.01)
+            self.assertLess(call[0][1], 0.05)
+
     async def first_stage(self, out_q, num, minsize):
         for i in range(num):
             await asyncio.sleep(0)  # Force reschedule
@@ -80,3 +139,118 @@ class TestStage(asynctest.TestCase):
                     await asyncio.gather(self.last_stage(q2, num, minsize),
                                          self.middle_stage(q1, q2, num, minsize),
                                          self.first_stage(q1, num, minsize))
+
+
+class TestBatchSizeTuner(asynctest.TestCase):
+
+    def test_grows_until_sizes_differ(self):
+        tuner = BatchSizeTuner(1, 100)
+        tuner.observe(1, 0.01)
+        self.assertEqual(2, tuner.size)
+
+    def test_fixed_time_amortized(self):
+        tuner = BatchSizeTuner(1, 1000)
+        for size in (1, 10, 100):
+            # 10ms per batch and 0.1ms per item
+            tuner.observe(size, 0.01 + 0.0001 * size)
+        self.assertAlmostEqual(900, tuner.size, delta=1)
+
+    def test_bounds(self):
+        tuner = BatchSizeTuner(5, 50)
+        for size in (5, 10, 20):
+            tuner.observe(size, 1)
+        self.assertEqual(50, tuner.size)
+        tuner = BatchSizeTuner(5, 50)
+        for size in (5, 10, 20):
+            tuner.observe(size, size)
+        self.assertEqual(5, tuner.size)
+
+
+class TestRunInThread(asynctest.TestCase):
+
+    async def test_run_in_thread(self):
+        stage = Stage()
+        ident = await stage.run_in_thread(threading.get_ident)
+        self.assertNotEqual(threading.get_ident(), ident)
+        self.assertEqual(ident, await stage.run_in_thread(threading.get_ident))
+        self.assertEqual(3, await stage.run_in_thread(max, 1, 3))
+
+    async def test_busy_time(self):
+        stage = Stage()
+        self.assertEqual(0, stage.busy_time())
+        await stage.run_in_thread(time.sleep, 0.01)
+        self.assertGreaterEqual(stage.busy_time(), 0.01)
+        with self.assertRaises(ZeroDivisionError):
+            await stage.run_in_thread(divmod, 1, 0)
+        self.assertGreaterEqual(stage.busy_time(), 0.01)
+
+    async def test_stop_thread(self):
+        stage = Stage()
+        stage.stop_thread()
+        await stage.run_in_thread(threading.get_ident)
+        stage.stop_thread()
+        self.assertIsNone(stage._executor)
+
+
+class TestParallelStages(asynctest.TestCase):
+
+    async def first_stage(self, in_q, out_q):
+        for i in range(20):
+            await out_q.put(i)
+        await out_q.put(None)
+
+    async def middle_stage(self, in_q, out_q):
+        while True:
+            item = await in_q.get()
+            if item is None:
+                break
+            await asyncio.sleep(0)  # Force reschedule
+            await out_q.put(item)
+        await out_q.put(None)
+
+    async def test_parallel_instances(self):
+        received = []
+
+        async def last_stage(in_q, out_q):
+            while True:
+                item = await in_q.get()
+                if item is None:
+                    break
+                received.append(item)
+            self.assertTrue(in_q.empty())
+
+        middle_stages = [self.middle_stage, self.middle_stage, self.middle_stage]
+        await create_pipeline([self.first_stage, middle_stages, last_stage], maxsize=[2, 5])
+        self.assertEqual(list(range(20)), sorted(received))
+
+    async def test_maxsize_per_queue(self):
+        with self.assertRaises(ValueError):
+            await create_pipeline([self.first_stage, self.middle_stage], maxsize=[1, 2])
+
+
+class TestParseInProcesses(asynctest.TestCase):
+
+    async def parse(self, stage, arguments):
+        return [[(d_content.d_artifacts[0].relative_path, d_content.d_artifacts[0].artifact.size,
+                  d_content.d_artifacts[0].remote) for d_content in batch]
+                async for batch in stage.parse_in_processes(parse, arguments, 'remote')]
+
+    async def test_without_pool(self):
+        batches = await self.parse(Stage(), [('a', 2), ('b', 1), ('c', 0)])
+        self.assertEqual([[('a', 0, 'remote'), ('a', 1, 'remote')], [('b', 0, 'remote')], []],
+                         batches)
+
+    async def test_with_pool(self):
+        stage = Stage()
+        with create_process_pool(2) as process_pool:
+            stage.process_pool = process_pool
+            batches = await self.parse(stage, [('a', 2), ('b', 1), ('c', 0)])
+        self.assertEqual([[], [('a', 0, 'remote'), ('a', 1, 'remote')], [('b', 0, 'remote')]],
+                         sorted(batches))
+
+    async def test_with_pool_error(self):
+        stage = Stage()
+        with create_process_pool(1) as process_pool:
+            stage.process_pool = process_pool
+            with self.assertRaisesRegex(ValueError, 'b'):
+                await self.parse(stage, [('a', 1), ('b', -1)])
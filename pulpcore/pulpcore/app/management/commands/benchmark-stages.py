@@ -0,0 +1,177 @@
+from gettext import gettext as _
+import asyncio
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.core.management import BaseCommand
+from rq import Queue
+
+
+class Command(BaseCommand):
+    """
+    Django management command for measuring how long the Stages API takes to sync Artifacts.
+    """
+    help = _('Measure the time the Stages API takes to sync Artifacts from a local HTTP server, '
+             'with the db work of the stages run in the event loop and in threads of the stages')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--artifacts', type=int, default=1000,
+                            help=_('The number of Artifacts to sync in each mode.'))
+        parser.add_argument('--size', type=int, default=4096,
+                            help=_('The size of each Artifact, in bytes.'))
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help=_('The number of seconds the server waits before each response.'))
+
+    def handle(self, *args, **options):
+        from pulpcore.app.models import Task, Worker
+        from pulpcore.constants import TASK_STATES
+        from pulpcore.tasking.connection import get_redis_connection
+        from pulpcore.tasking.services.storage import WorkerDirectory
+        from pulpcore.tasking.worker import PulpWorker
+
+        redis_conn = get_redis_connection()
+        # Not named after the WORKER_PREFIX, so the resource manager never routes tasks to it
+        name = 'benchmark-{uuid}'.format(uuid=uuid.uuid4())
+        queue = Queue(name, connection=redis_conn)
+        # Progress reports belong to a task, so the syncs run in one
+        task = Task.objects.create(state=TASK_STATES.WAITING)
+        job = queue.enqueue_call(sync_fixture, job_id=str(task.pk), timeout=24 * 60 * 60,
+                                 args=(options['artifacts'], options['size'], options['latency']))
+        try:
+            worker = PulpWorker([queue], name=name, connection=redis_conn)
+            worker.work(burst=True, logging_level='WARNING')
+            task.refresh_from_db()
+            if task.state != TASK_STATES.COMPLETED:
+                self.stderr.write(_('The benchmark failed: {error}').format(error=task.error))
+                return
+            for line in job.result:
+                self.stdout.write(line)
+        finally:
+            task.delete()
+            queue.delete(delete_jobs=True)
+            Worker.objects.filter(name=name).delete()
+            WorkerDirectory(name).delete()
+
+
+def sync_fixture(artifacts, size, latency):
+    """
+    Sync Artifacts served by a local HTTP server, once in each mode, and report the time it took.
+
+    The server runs in a thread with an event loop of its own, so it is not slowed down by the db
+    work of the stages, as a remote server would not be.
+
+    Args:
+        artifacts (int): The number of Artifacts to sync in each mode.
+        size (int): The size of each Artifact, in bytes.
+        latency (float): The number of seconds the server waits before each response.
+
+    Returns:
+        list: A line reporting the time taken for each mode, written out by the command.
+    """
+    from aiohttp import web
+
+    from pulpcore.app.models import Artifact
+    from pulpcore.tasking.services.storage import WorkingDirectory
+
+    files = {}
+
+    async def handle(request):
+        await asyncio.sleep(latency)
+        return web.Response(body=files[request.match_info['name']])
+
+    app = web.Application()
+    app.router.add_get('/{name}', handle)
+    server_loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    server_loop.run_until_complete(runner.setup())
+    server_loop.run_until_complete(web.SockSite(runner, sock).start())
+    server = threading.Thread(target=server_loop.run_forever, daemon=True)
+    server.start()
+    base_url = 'http://127.0.0.1:{port}/'.format(port=sock.getsockname()[1])
+
+    lines = []
+    try:
+        with WorkingDirectory():
+            for in_threads in (False, True):
+                files.clear()
+                for i in range(artifacts):
+                    files['{mode}-{i}'.format(mode=int(in_threads), i=i)] = os.urandom(size)
+                start = time.time()
+                _sync(base_url, files, in_threads)
+                elapsed = time.time() - start
+
+                saved = Artifact.objects.filter(
+                    sha256__in=[hashlib.sha256(data).hexdigest() for data in files.values()])
+                for artifact in saved:
+                    artifact.file.delete(save=False)
+                saved.delete()
+
+                msg = _('db work {mode}: {artifacts} Artifacts in {elapsed:.3f}s, '
+                        '{per_second:.1f} Artifacts per second')
+                lines.append(msg.format(
+                    mode=_('in threads') if in_threads else _('in the event loop'),
+                    artifacts=artifacts, elapsed=elapsed, per_second=artifacts / elapsed))
+    finally:
+        server_loop.call_soon_threadsafe(server_loop.stop)
+        server.join()
+        server_loop.run_until_complete(runner.cleanup())
+        server_loop.close()
+    return lines
+
+
+def _sync(base_url, files, in_threads):
+    """
+    Run a pipeline syncing the files served at `base_url` as Artifacts.
+
+    Pulpcore has no Content type of its own, so the pipeline ends once the Artifacts are saved.
+
+    Args:
+        base_url (str): The url the files are served at.
+        files (dict): The content of the files, by name.
+        in_threads (bool): Whether the stages run their db work in their threads, or in the loop.
+    """
+    from pulpcore.app.models import Artifact, Content, Remote
+    from pulpcore.plugin.download import DownloaderFactory
+    from pulpcore.plugin.stages import (
+        ArtifactDownloader,
+        ArtifactSaver,
+        create_pipeline,
+        DeclarativeArtifact,
+        DeclarativeContent,
+        EndStage,
+        QueryExistingArtifacts,
+    )
+
+    class FixtureRemote:
+        def __init__(self):
+            self.download_factory = DownloaderFactory(Remote(name='benchmark', url=base_url))
+
+        def get_downloader(self, url, **kwargs):
+            return self.download_factory.build(url, **kwargs)
+
+    class InLoop:
+        async def run_in_thread(self, func, *args):
+            return self._timed(func, *args)
+
+    async def first_stage(in_q, out_q):
+        remote = FixtureRemote()
+        for name, data in files.items():
+            artifact = Artifact(sha256=hashlib.sha256(data).hexdigest(), size=len(data))
+            d_artifact = DeclarativeArtifact(artifact=artifact, url=base_url + name,
+                                             relative_path=name, remote=remote)
+            await out_q.put(DeclarativeContent(content=Content(), d_artifacts=[d_artifact]))
+        await out_q.put(None)
+
+    stages = [first_stage]
+    for stage_class in (QueryExistingArtifacts, ArtifactDownloader, ArtifactSaver):
+        if not in_threads:
+            stage_class = type(stage_class.__name__, (InLoop, stage_class), {})
+        stages.append(stage_class())
+    stages.append(EndStage())
+    asyncio.get_event_loop().run_until_complete(create_pipeline(stages))
@@ -0,0 +1,49 @@
+from gettext import gettext as _
+import time
+import uuid
+
+from django.core.management import BaseCommand
+from django.test.utils import override_settings
+from rq import Queue
+
+
+class Command(BaseCommand):
+    """
+    Django management command for measuring the overhead a worker adds to each task.
+    """
+    help = _('Measure the per-task overhead of a worker, forking a work horse per task and using '
+             'the pooled work horse')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=200,
+                            help=_('The number of no-op jobs to run in each mode.'))
+
+    def handle(self, *args, **options):
+        from pulpcore.app.models import Worker
+        from pulpcore.tasking.connection import get_redis_connection
+        from pulpcore.tasking.services.storage import WorkerDirectory
+        from pulpcore.tasking.worker import PulpWorker
+
+        redis_conn = get_redis_connection()
+        for enabled in (False, True):
+            # Not named after the WORKER_PREFIX, so the resource manager never routes tasks to it
+            name = 'benchmark-{uuid}'.format(uuid=uuid.uuid4())
+            queue = Queue(name, connection=redis_conn)
+            for i in range(options['jobs']):
+                queue.enqueue(time.sleep, args=(0,))
+
+            pool = {'ENABLED': enabled, 'MAX_JOBS': options['jobs'] + 1}
+            with override_settings(WORK_HORSE_POOL=pool):
+                worker = PulpWorker([queue], name=name, connection=redis_conn)
+                start = time.time()
+                worker.work(burst=True, logging_level='WARNING')
+                elapsed = time.time() - start
+
+            queue.delete(delete_jobs=True)
+            Worker.objects.filter(name=name).delete()
+            WorkerDirectory(name).delete()
+
+            msg = _('{mode}: {jobs} jobs in {elapsed:.3f}s, {per_job:.2f}ms per job')
+            self.stdout.write(msg.format(
+                mode=_('pooled work horse') if enabled else _('work horse per job'),
+                jobs=options['jobs'], elapsed=elapsed, per_job=1000 * elapsed / options['jobs']))
@@ -0,0 +1,71 @@
+from gettext import gettext as _
+import random
+import uuid
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    """
+    Django management command for simulating the database load of worker heartbeats.
+    """
+    help = _('Print the number of database queries per minute caused by worker heartbeats and '
+             'liveness checks for fleets of workers')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[10, 100, 1000],
+                            help=_('The numbers of workers to simulate.'))
+        parser.add_argument('--beat-interval', type=float, default=5,
+                            help=_('The number of seconds between two rq heartbeats of a worker. '
+                                   'rq beats every 5 seconds while a job runs, every 15 seconds '
+                                   'while idle.'))
+
+    def handle(self, *args, **options):
+        from pulpcore.tasking.constants import TASKING_CONSTANTS
+        from pulpcore.tasking.services.worker_watcher import (
+            check_worker_processes,
+            handle_worker_heartbeat,
+        )
+
+        # Measure the queries of a heartbeat and of a liveness check, and roll them back
+        with transaction.atomic():
+            name = 'simulation-{uuid}'.format(uuid=uuid.uuid4())
+            handle_worker_heartbeat(name)
+            with CaptureQueriesContext(connection) as heartbeat_queries:
+                handle_worker_heartbeat(name)
+            with CaptureQueriesContext(connection) as check_queries:
+                check_worker_processes()
+            transaction.set_rollback(True)
+        self.stdout.write(_('{heartbeat} queries per heartbeat, {check} queries per liveness '
+                            'check').format(heartbeat=len(heartbeat_queries),
+                                            check=len(check_queries)))
+
+        # Play one minute of heartbeats, the workers starting at random times
+        beat_interval = options['beat_interval']
+        for worker_count in options['workers']:
+            beats = []
+            for worker in range(worker_count):
+                t = random.uniform(0, beat_interval)
+                while t < 60:
+                    beats.append((t, worker))
+                    t += beat_interval
+            beats.sort()
+
+            last_heartbeats = [float('-inf')] * worker_count
+            lease_expires = float('-inf')
+            heartbeats = checks = 0
+            for t, worker in beats:
+                if t - last_heartbeats[worker] >= TASKING_CONSTANTS.HEARTBEAT_INTERVAL:
+                    last_heartbeats[worker] = t
+                    heartbeats += 1
+                if t >= lease_expires:
+                    lease_expires = t + TASKING_CONSTANTS.LIVENESS_CHECK_INTERVAL
+                    checks += 1
+
+            msg = _('{workers} workers: {queries} queries per minute ({heartbeats} heartbeats, '
+                    '{checks} liveness checks)')
+            self.stdout.write(msg.format(
+                workers=worker_count, heartbeats=heartbeats, checks=checks,
+                queries=heartbeats * len(heartbeat_queries) + checks * len(check_queries)))
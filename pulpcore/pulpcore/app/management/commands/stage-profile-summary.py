@@ -1,8 +1,13 @@
+from collections import defaultdict
 from gettext import gettext as _
 
 from django.core.management import BaseCommand
 
 
+# The percentiles printed for each statistic
+PERCENTILES = (50, 95, 99)
+
+
 class Command(BaseCommand):
     """
     Django management command for printing a summary report of a Stages API pipeline run.
@@ -19,47 +24,54 @@ class Command(BaseCommand):
         c = CONN.cursor()
 
         c.execute("SELECT uuid, name, num FROM stages ORDER BY num ASC")
+        stages = c.fetchall()
 
-        stages = []
-        stages_map = {}
-        for row in c.fetchall():
-            new_dict = {'uuid': row[0], 'name': row[1], 'waiting_time_sum': 0.0,
-                        'service_time_sum': 0.0, 'length_sum': 0, 'interarrival_time_sum': 0.0}
-            stages.append(new_dict)
-            stages_map[row[0]] = new_dict
-
+        waiting_times = defaultdict(list)
+        service_times = defaultdict(list)
         c.execute("SELECT uuid, waiting_time, service_time FROM traffic")
+        for stage_uuid, waiting_time, service_time in c.fetchall():
+            waiting_times[stage_uuid].append(waiting_time)
+            service_times[stage_uuid].append(service_time)
 
-        in_queue_count = 0
-        for row in c.fetchall():
-            in_queue_count = in_queue_count + 1
-            stages_map[row[0]]['waiting_time_sum'] += row[1]
-            stages_map[row[0]]['service_time_sum'] += row[2]
-
+        lengths = defaultdict(list)
+        interarrival_times = defaultdict(list)
         c.execute("SELECT uuid, length, interarrival_time FROM system")
+        for stage_uuid, length, interarrival_time in c.fetchall():
+            lengths[stage_uuid].append(length)
+            interarrival_times[stage_uuid].append(interarrival_time)
 
-        arrival_count = 0
-        for row in c.fetchall():
-            arrival_count = arrival_count + 1
-            stages_map[row[0]]['length_sum'] += row[1]
-            stages_map[row[0]]['interarrival_time_sum'] += row[2]
-
-        for stage in stages:
-            msg = _('{name}\n\tservice time average: {srv_avg:4f}\n')
-            if in_queue_count == 0:
-                # This is the first queue that gets no put() calls, so avoid DivisionByZero errors
-                waiting_avg = srv_avg = length_avg = interarrival_avg = 0
-            else:
-                waiting_avg = stage['waiting_time_sum'] / in_queue_count
-                srv_avg = stage['service_time_sum'] / in_queue_count
-                length_avg = stage['length_sum'] / arrival_count
-                interarrival_avg = stage['interarrival_time_sum'] / arrival_count
-
+        for stage_uuid, name, num in stages:
+            # The first queue gets no put() calls, so it has no statistics
             print(u'\n'
                   u'    |\n'
-                  u'    |waiting time average: {wt:4f}\n'
-                  u'    |queue length average: {ln:4f}\n'
-                  u'    |interarrival average: {inter:4f}\n'
+                  u'    |waiting time {wt}\n'
+                  u'    |queue length {ln}\n'
+                  u'    |interarrival {inter}\n'
                   u'    |\n'
-                  u'    \u030C\n'.format(wt=waiting_avg, ln=length_avg, inter=interarrival_avg))
-            print(msg.format(name=stage['name'], srv_avg=srv_avg))
+                  u'    \u030C\n'.format(wt=summarize(waiting_times[stage_uuid]),
+                                         ln=summarize(lengths[stage_uuid]),
+                                         inter=summarize(interarrival_times[stage_uuid])))
+            print(_('{name}\n\tservice time {srv}\n').format(
+                name=name, srv=summarize(service_times[stage_uuid])))
+
+
+def summarize(values):
+    """
+    Summarize the values of a statistic.
+
+    Args:
+        values (list): The values recorded.
+
+    Returns:
+        str: The average and the percentiles of the values.
+    """
+    if not values:
+        values = [0]
+    values = sorted(values)
+    summary = [_('average: {avg:4f}').format(avg=sum(values) / len(values))]
+    for percentile in PERCENTILES:
+        # The nearest-rank percentile
+        rank = max(0, -(-percentile * len(values) // 100) - 1)
+        summary.append('p{percentile}: {value:4f}'.format(percentile=percentile,
+                                                          value=values[rank]))
+    return ', '.join(summary)
@@ -10,7 +10,14 @@ from .generic import (  # noqa
     Notes
 )
 
-from .content import Artifact, Content, ContentArtifact, ContentGuard, RemoteArtifact  # noqa
+from .content import (  # noqa
+    Artifact,
+    Content,
+    ContentArtifact,
+    ContentGuard,
+    RemoteArtifact,
+    touch
+)
 from .publication import (  # noqa
     BaseDistribution,
     Distribution,
@@ -29,5 +36,7 @@ from .repository import (  # noqa
 
 from .task import CreatedResource, ReservedResource, Task, TaskReservedResource, Worker  # noqa
 
+from .upload import Upload, UploadChunk  # noqa
+
 # Moved here to avoid a circular import with Task
 from .progress import ProgressBar, ProgressReport, ProgressSpinner  # noqa
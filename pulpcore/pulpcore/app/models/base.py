@@ -1,4 +1,6 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import connections, models, router, transaction
 from django.db.models import options
 
 
@@ -104,6 +106,97 @@ class MasterModel(Model):
             # one in this instance's master/detail ancestry, so return here.
             return self
 
+    @classmethod
+    def cast_all(cls, instances):
+        """Return the "Detail" model instances of many instances of this master-detail pair.
+
+        Casting each instance with :meth:`cast` queries the Detail tables one by one. This looks
+        up the Detail model of each instance by its ``type`` instead, and fetches the instances
+        of each Detail model with one query.
+
+        Args:
+            instances (iterable): Instances of this model, or of its Detail models.
+
+        Returns:
+            list: The Detail model instances, in the order of ``instances``. Instances which are
+                already cast, or whose Detail row does not exist, are returned as they are.
+        """
+        instances = list(instances)
+
+        # Walk down the master/detail ancestry the way cast() does, so the most detailed model
+        # of a TYPE wins.
+        detail_models = {}
+        models_to_visit = [cls]
+        while models_to_visit:
+            model = models_to_visit.pop()
+            for rel in model._meta.related_objects:
+                if rel.one_to_one and issubclass(rel.related_model, model):
+                    detail_models[rel.related_model.TYPE] = rel.related_model
+                    models_to_visit.append(rel.related_model)
+
+        pks = defaultdict(list)
+        for instance in instances:
+            detail_model = detail_models.get(instance.type)
+            if detail_model is not None and not isinstance(instance, detail_model):
+                pks[detail_model].append(instance.pk)
+
+        details = {}
+        for detail_model, detail_pks in pks.items():
+            details.update(detail_model.objects.in_bulk(detail_pks))
+        return [details.get(instance.pk, instance) for instance in instances]
+
+    @classmethod
+    def bulk_create_details(cls, instances):
+        """Save many new instances of this Detail model, with one insert per table.
+
+        Django's ``bulk_create()`` refuses models with multi-table inheritance. The rows of the
+        Master table are bulk created instead, and the rows of each table down to this Detail model
+        are then inserted with the primary keys of the Master rows.
+
+        Args:
+            instances (iterable): Unsaved instances of this model.
+
+        Returns:
+            list: The saved instances.
+        """
+        instances = list(instances)
+        for instance in instances:
+            if not instance.type:
+                instance.type = instance.TYPE
+
+        master_model = cls._meta.master_model
+        if master_model is None:
+            return cls.objects.bulk_create(instances)
+
+        using = router.db_for_write(cls)
+        master_fields = master_model._meta.concrete_fields
+        masters = [master_model(**{field.attname: getattr(instance, field.attname)
+                                   for field in master_fields}) for instance in instances]
+        with transaction.atomic(using=using, savepoint=False):
+            if connections[using].features.can_return_ids_from_bulk_insert:
+                master_model._base_manager.using(using).bulk_create(masters)
+            else:
+                for master in masters:
+                    master.save(using=using)
+
+            for instance, master in zip(instances, masters):
+                for field in master_fields:
+                    setattr(instance, field.attname, getattr(master, field.attname))
+
+            # The tables below the Master one, from the most generic to this Detail model
+            for model in list(reversed(cls._meta.get_parent_list()))[1:] + [cls]:
+                for instance, master in zip(instances, masters):
+                    for link in model._meta.parents.values():
+                        setattr(instance, link.attname, master.pk)
+                # bulk_create() without its check for multi-table inheritance
+                model._base_manager.using(using)._batched_insert(
+                    instances, model._meta.local_concrete_fields, None)
+
+        for instance in instances:
+            instance._state.adding = False
+            instance._state.db = using
+        return instances
+
     @property
     def master(self):
         """The "Master" model instance of this master-detail pair
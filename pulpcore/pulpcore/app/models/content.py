@@ -4,13 +4,37 @@ Content related Django models.
 import hashlib
 
 from django.core import validators
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from itertools import chain
 
 from pulpcore.app.models import Model, MasterModel, Notes, GenericKeyValueRelation, storage, fields
 from pulpcore.exceptions import DigestValidationError, SizeValidationError
 
 
+def touch(queryset):
+    """
+    Update the ``timestamp_of_interest`` on all records of a query set.
+
+    Records about to be deleted by orphan cleanup are waited for, so they are neither touched
+    nor returned by queries made after the touch. The records are locked in primary key order,
+    which avoids deadlocks between concurrent touches.
+
+    This works with the query sets of any manager, so Content types declaring their own
+    ``objects`` can be touched as well.
+
+    Args:
+        queryset (django.db.models.query.QuerySet): The Artifacts or Content to touch.
+
+    Returns:
+        int: The number of records touched.
+    """
+    with transaction.atomic():
+        locked = queryset.order_by('pk').select_for_update().values('pk')
+        return queryset.model._base_manager.filter(pk__in=locked).update(
+            timestamp_of_interest=timezone.now())
+
+
 class Artifact(Model):
     """
     A file associated with a piece of content.
@@ -25,13 +49,15 @@ class Artifact(Model):
 
         file (models.FileField): The stored file. This field should be set using an absolute path to
             a temporary file. It also accepts `class:django.core.files.File`.
-        size (models.IntegerField): The size of the file in bytes.
+        size (models.BigIntegerField): The size of the file in bytes.
         md5 (models.CharField): The MD5 checksum of the file.
         sha1 (models.CharField): The SHA-1 checksum of the file.
         sha224 (models.CharField): The SHA-224 checksum of the file.
         sha256 (models.CharField): The SHA-256 checksum of the file.
         sha384 (models.CharField): The SHA-384 checksum of the file.
         sha512 (models.CharField): The SHA-512 checksum of the file.
+        timestamp_of_interest (models.DateTimeField): The last time the Artifact was created or
+            found to be used. Orphan cleanup only removes Artifacts with an older timestamp.
     """
 
     def storage_path(self, name):
@@ -45,13 +71,14 @@ class Artifact(Model):
         return storage.get_artifact_path(self.sha256)
 
     file = fields.ArtifactFileField(null=False, upload_to=storage_path, max_length=255)
-    size = models.IntegerField(null=False)
+    size = models.BigIntegerField(null=False)
     md5 = models.CharField(max_length=32, null=False, unique=False, db_index=True)
     sha1 = models.CharField(max_length=40, null=False, unique=False, db_index=True)
     sha224 = models.CharField(max_length=56, null=False, unique=False, db_index=True)
     sha256 = models.CharField(max_length=64, null=False, unique=True, db_index=True)
     sha384 = models.CharField(max_length=96, null=False, unique=True, db_index=True)
     sha512 = models.CharField(max_length=128, null=False, unique=True, db_index=True)
+    timestamp_of_interest = models.DateTimeField(auto_now=True)
 
     # All digest fields ordered by algorithm strength.
     DIGEST_FIELDS = (
@@ -170,6 +197,11 @@ class Content(MasterModel):
     """
     A piece of managed content.
 
+    Fields:
+
+        timestamp_of_interest (models.DateTimeField): The last time the Content was created or
+            found to be used. Orphan cleanup only removes Content with an older timestamp.
+
     Relations:
 
         notes (GenericKeyValueRelation): Arbitrary information stored with the content.
@@ -177,6 +209,8 @@ class Content(MasterModel):
     """
     TYPE = 'content'
 
+    timestamp_of_interest = models.DateTimeField(auto_now=True)
+
     notes = GenericKeyValueRelation(Notes)
     artifacts = models.ManyToManyField(Artifact, through='ContentArtifact')
 
@@ -237,7 +271,7 @@ class RemoteArtifact(Model):
     Fields:
 
         url (models.TextField): The URL where the artifact can be retrieved.
-        size (models.IntegerField): The expected size of the file in bytes.
+        size (models.BigIntegerField): The expected size of the file in bytes.
         md5 (models.CharField): The expected MD5 checksum of the file.
         sha1 (models.CharField): The expected SHA-1 checksum of the file.
         sha224 (models.CharField): The expected SHA-224 checksum of the file.
@@ -253,7 +287,7 @@ class RemoteArtifact(Model):
             RemoteArtifact.
     """
     url = models.TextField(validators=[validators.URLValidator])
-    size = models.IntegerField(null=True)
+    size = models.BigIntegerField(null=True)
     md5 = models.CharField(max_length=32, null=True)
     sha1 = models.CharField(max_length=40, null=True)
     sha224 = models.CharField(max_length=56, null=True)
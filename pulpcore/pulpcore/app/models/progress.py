@@ -5,20 +5,103 @@ from gettext import gettext as _
 
 from asyncio import CancelledError
 import logging
-import datetime
+import threading
+import time
 
-from django.db import models
+from django.db import connection, models
 from django.utils import timezone
 
 from pulpcore.app.models import Model, Task
-from pulpcore.constants import TASK_STATES, TASK_CHOICES
+from pulpcore.constants import TASK_FINAL_STATES, TASK_STATES, TASK_CHOICES
+from pulpcore.tasking import events
 
 _logger = logging.getLogger(__name__)
 
-# number of ms between save() calls when _using_context_manager is set
+# number of ms between two writes of a progress report changed in memory
 BATCH_INTERVAL = 500
 
 
+class ProgressFlusher:
+    """
+    Writes the progress reports changed in memory to the database on a timer.
+
+    A single background thread per process, and so per task, writes each changed progress report
+    at most once every ``BATCH_INTERVAL`` milliseconds, however often it changes. The thread exits
+    once no change is left to write, and is started again by the next change.
+
+    The thread only writes a progress report which has not reached a final state in the database
+    and whose done count would not decrease, so a late write never overwrites a final save.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = {}
+        self._thread = None
+
+    def add(self, report):
+        """
+        Schedule the write of a changed progress report.
+
+        Args:
+            report (ProgressReport): A saved progress report.
+        """
+        with self._lock:
+            self._changed[report.pk] = report
+            # A thread is not alive in a forked process either
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def discard(self, report):
+        """
+        Cancel the scheduled write of a progress report, once it is saved.
+
+        Args:
+            report (ProgressReport): A progress report.
+        """
+        with self._lock:
+            self._changed.pop(report.pk, None)
+
+    def flush(self):
+        """
+        Write all changed progress reports now.
+
+        Returns:
+            bool: True if any progress report was written.
+        """
+        with self._lock:
+            reports = list(self._changed.values())
+            self._changed.clear()
+        for report in reports:
+            ProgressReport.objects.filter(pk=report.pk, done__lte=report.done).exclude(
+                state__in=TASK_FINAL_STATES).update(
+                message=report.message, state=report.state, total=report.total,
+                done=report.done, suffix=report.suffix, last_updated=timezone.now())
+        events.publish_progress(reports)
+        return bool(reports)
+
+    def _run(self):
+        """
+        The background thread, which flushes until no change is left.
+        """
+        try:
+            while True:
+                time.sleep(BATCH_INTERVAL / 1000)
+                self.flush()
+                with self._lock:
+                    if not self._changed:
+                        self._thread = None
+                        return
+        except Exception:
+            _logger.exception(_('Writing progress reports failed'))
+        finally:
+            # The thread has its own database connection
+            connection.close()
+
+
+_flusher = ProgressFlusher()
+
+
 class ProgressReport(Model):
     """
     A base model for all progress reporting.
@@ -58,7 +141,6 @@ class ProgressReport(Model):
     suffix = models.TextField(default='')
 
     _using_context_manager = False
-    _last_save_time = None
 
     def save(self, *args, **kwargs):
         """
@@ -67,18 +149,46 @@ class ProgressReport(Model):
         If the task_id is already set it will not be updated. If it is unset and this is running
         inside of a task it will be auto-set prior to saving.
 
+        When used as a context manager, the progress report is written to the database at most
+        every ``BATCH_INTERVAL`` milliseconds, see :class:`ProgressFlusher`.
+
         args (list): positional arguments to be passed on to the real save
         kwargs (dict): keyword arguments to be passed on to the real save
         """
-        now = timezone.now()
-
-        if self._using_context_manager and self._last_save_time:
-            if now - self._last_save_time >= datetime.timedelta(milliseconds=BATCH_INTERVAL):
-                super().save(*args, **kwargs)
-                self._last_save_time = now
+        if self._using_context_manager and self.pk is not None and not args and not kwargs:
+            _flusher.add(self)
         else:
+            _flusher.discard(self)
             super().save(*args, **kwargs)
-            self._last_save_time = now
+            events.publish_progress([self])
+
+    def increase_by(self, count):
+        """
+        Increase the done count by count.
+
+        The change is written to the database within ``BATCH_INTERVAL`` milliseconds, and right
+        away if the progress report was never saved.
+
+        Args:
+            count (int): The number of items processed.
+        """
+        self.done += count
+        if self.total:
+            if self.done > self.total:
+                _logger.warning(_('Too many items processed for ProgressBar %s') % self.message)
+        if self.pk is None:
+            self.save()
+        else:
+            _flusher.add(self)
+
+    @staticmethod
+    def flush_all():
+        """
+        Write the progress reports of the current process changed in memory to the database.
+
+        This is called when a task finishes, so its progress reports are up to date.
+        """
+        _flusher.flush()
 
     def __enter__(self):
         """
@@ -100,7 +210,8 @@ class ProgressReport(Model):
         - FAILED otherwise.
 
         The exception is not suppressed. If the context manager exited without
-        exception the progress report state is saved as COMPLETED.
+        exception the progress report state is saved as COMPLETED, unless it was changed from
+        RUNNING within the block.
 
         See the context manager documentation for more info on __exit__ parameters
         """
@@ -108,7 +219,8 @@ class ProgressReport(Model):
         if self.total is None and self.done != 0:
             self.total = self.done
         if type is None:
-            self.state = TASK_STATES.COMPLETED
+            if self.state == TASK_STATES.RUNNING:
+                self.state = TASK_STATES.COMPLETED
         elif type is CancelledError:
             self.state = TASK_STATES.CANCELED
         else:
@@ -177,9 +289,9 @@ class ProgressBar(ProgressReport):
         >>> progress_bar.save()
 
     The ProgressBar() is a context manager that provides automatic state transitions and saving for
-    the RUNNING CANCELED COMPLETED and FAILED states. The increment() method can be called in the
-    loop as work is completed. When ProgressBar() is used as a context manager progress reporting
-    is rate limited to every 500 milliseconds.
+    the RUNNING CANCELED COMPLETED and FAILED states. The increment() and increase_by() methods can
+    be called in the loop as work is completed. Progress reporting is rate limited to every 500
+    milliseconds, and the final state is saved when the context manager exits.
     Use it as follows:
 
         >>> progress_bar = ProgressBar(message='Publishing files', total=len(files_iterator))
@@ -188,7 +300,7 @@ class ProgressBar(ProgressReport):
         >>>     # progress_bar saved as 'running'
         >>>     for file in files_iterator:
         >>>         handle(file)
-        >>>         progress_bar.increment()  # increments and saves
+        >>>         progress_bar.increment()  # increments, saved within 500 milliseconds
         >>> # progress_bar is saved as 'completed' if no exception or 'failed' otherwise
 
     A convenience method called iter() allows you to avoid calling increment() directly:
@@ -222,13 +334,10 @@ class ProgressBar(ProgressReport):
         Increment done count and save the progress bar.
 
         This will increment and save the self.done attribute which is useful to put into a loop
-        processing items.
+        processing items. The progress bar is written at most every ``BATCH_INTERVAL``
+        milliseconds, see :meth:`~ProgressReport.increase_by`.
         """
-        self.done += 1
-        if self.total:
-            if self.done > self.total:
-                _logger.warning(_('Too many items processed for ProgressBar %s') % self.message)
-        self.save()
+        self.increase_by(1)
 
     def iter(self, iter):
         """
@@ -317,19 +317,52 @@ class RepositoryVersion(Model):
             model = repository.versions.exclude(complete=False).latest()
             return model
 
-    def added(self):
+    def added(self, base_version=None):
         """
+        Args:
+            base_version (pulpcore.app.models.RepositoryVersion): The version to compare with, of
+                any repository. The previous version when not specified.
+
         Returns:
             QuerySet: The Content objects that were added by this version.
         """
-        return Content.objects.filter(version_memberships__version_added=self)
+        if base_version is None:
+            return Content.objects.filter(version_memberships__version_added=self)
+        return self.content.exclude(pk__in=base_version.content)
 
-    def removed(self):
+    def removed(self, base_version=None):
         """
+        Args:
+            base_version (pulpcore.app.models.RepositoryVersion): The version to compare with, of
+                any repository. The previous version when not specified.
+
         Returns:
             QuerySet: The Content objects that were removed by this version.
         """
-        return Content.objects.filter(version_memberships__version_removed=self)
+        if base_version is None:
+            return Content.objects.filter(version_memberships__version_removed=self)
+        return base_version.content.exclude(pk__in=self.content)
+
+    def diff(self, base_version):
+        """
+        The summary of the content added and removed since another version.
+
+        The content of both versions is compared in the database, with the ranges of versions
+        their RepositoryContent is in, so neither content set is fetched.
+
+        Args:
+            base_version (pulpcore.app.models.RepositoryVersion): The version to compare with, of
+                any repository.
+
+        Returns:
+            dict: of {'added': {<type>: <count>}, 'removed': {<type>: <count>}}
+        """
+        summary = {}
+        for key, content in (('added', self.added(base_version)),
+                             ('removed', self.removed(base_version))):
+            annotated = content.values('type').annotate(count=models.Count('type'))
+            summary[key] = {c['type']: c['count'] for c in annotated}
+        return summary
 
     def next(self):
         """
@@ -7,7 +7,7 @@ import logging
 import traceback
 import uuid
 
-from django.db import models, transaction
+from django.db import IntegrityError, connection, models, transaction
 from django.utils import timezone
 from rq.job import get_current_job
 
@@ -15,6 +15,7 @@ from pulpcore.app.models import Model, GenericRelationModel
 from pulpcore.app.fields import JSONField
 from pulpcore.constants import TASK_FINAL_STATES, TASK_CHOICES, TASK_STATES
 from pulpcore.exceptions import exception_to_dict
+from pulpcore.tasking import events
 from pulpcore.tasking.constants import TASKING_CONSTANTS
 
 
@@ -143,6 +144,47 @@ class WorkerManager(models.Manager):
         return self.filter(last_heartbeat__lt=age_threshold,
                            cleaned_up=False, gracefully_stopped=False)
 
+    def save_heartbeat(self, name):
+        """
+        Record a heartbeat of the worker with the given name with a single ``INSERT ... ON
+        CONFLICT`` statement.
+
+        The worker is created if it does not exist yet. A worker which was not considered 'online'
+        is marked as neither gracefully stopped nor cleaned up anymore.
+
+        Args:
+            name (str): The name of the worker
+
+        Returns:
+            tuple: A (created, back_online) tuple of booleans, telling whether the worker is new
+                and whether it was not 'online' before this heartbeat.
+        """
+        now = timezone.now()
+        age_threshold = now - timedelta(seconds=TASKING_CONSTANTS.WORKER_TTL)
+        with connection.cursor() as cursor:
+            # The data-modifying statement runs even though its result is not selected, while
+            # "previous" sees the row as it was before it
+            cursor.execute(
+                "WITH previous AS ("
+                "    SELECT last_heartbeat, gracefully_stopped FROM {table} WHERE name = %s"
+                "), upsert AS ("
+                "    INSERT INTO {table} "
+                "    (created, last_updated, name, last_heartbeat, gracefully_stopped, cleaned_up) "
+                "    VALUES (%s, %s, %s, %s, false, false) "
+                "    ON CONFLICT (name) DO UPDATE SET last_updated = EXCLUDED.last_updated, "
+                "    last_heartbeat = EXCLUDED.last_heartbeat, gracefully_stopped = false, "
+                "    cleaned_up = false"
+                ") SELECT last_heartbeat, gracefully_stopped FROM previous".format(
+                    table=self.model._meta.db_table),
+                [name, now, now, name, now]
+            )
+            previous = cursor.fetchone()
+
+        if previous is None:
+            return True, False
+        last_heartbeat, gracefully_stopped = previous
+        return False, gracefully_stopped or last_heartbeat < age_threshold
+
     def with_reservations(self, resources):
         """
         Returns a worker with ANY of the reservations for resources specified by resource urls. This
@@ -232,20 +274,44 @@ class Worker(Model):
         """
         Attempt to lock all resources by their urls. Must be atomic to prevent deadlocks.
 
+        All reservations are acquired with a single ``INSERT ... ON CONFLICT`` statement which
+        creates the missing reservations and matches the ones already held by this worker. A
+        reservation held by another worker is not returned by the statement, in which case the
+        whole transaction is rolled back.
+
         Arguments:
             task (pulpcore.app.models.Task): task to lock the resource for
             resource_urls (List): a list of resource urls to be locked
 
         Raises:
-            django.db.IntegrityError: If the reservation already exists
+            django.db.IntegrityError: If a reservation is already held by another worker
         """
+        # Sorting gives concurrent callers the same row locking order
+        resource_urls = sorted(set(resource_urls))
+        if not resource_urls:
+            return
+
+        now = timezone.now()
         with transaction.atomic():
-            for resource in resource_urls:
-                if self.reservations.filter(resource=resource).exists():
-                    reservation = self.reservations.get(resource=resource)
-                else:
-                    reservation = ReservedResource.objects.create(worker=self, resource=resource)
-                TaskReservedResource.objects.create(resource=reservation, task=task)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO {table} (created, last_updated, resource, worker_id) "
+                    "SELECT %s, %s, resource, %s FROM unnest(%s::text[]) AS resource "
+                    "ON CONFLICT (resource) DO UPDATE SET last_updated = EXCLUDED.last_updated "
+                    "WHERE {table}.worker_id = EXCLUDED.worker_id "
+                    "RETURNING id".format(table=ReservedResource._meta.db_table),
+                    [now, now, self.pk, resource_urls]
+                )
+                reservation_ids = [row[0] for row in cursor.fetchall()]
+
+            if len(reservation_ids) != len(resource_urls):
+                raise IntegrityError(_('Resources are reserved by another worker: {urls}').format(
+                    urls=', '.join(resource_urls)))
+
+            TaskReservedResource.objects.bulk_create(
+                TaskReservedResource(resource_id=reservation_id, task=task)
+                for reservation_id in reservation_ids
+            )
 
 
 class Task(Model):
@@ -265,6 +331,8 @@ class Task(Model):
 
         parent (models.ForeignKey): Task that spawned this task (if any)
         worker (models.ForeignKey): The worker that this task is in
+        dependencies (models.ManyToManyField): Tasks which must complete before this task is
+            dispatched
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     state = models.TextField(choices=TASK_CHOICES)
@@ -279,6 +347,10 @@ class Task(Model):
                                on_delete=models.SET_NULL)
     worker = models.ForeignKey("Worker", null=True, related_name="tasks",
                                on_delete=models.SET_NULL)
+    dependencies = models.ManyToManyField("Task", symmetrical=False, related_name="dependents")
+
+    class Meta:
+        indexes = [models.Index(fields=['created'])]
 
     @staticmethod
     def current():
@@ -305,6 +377,7 @@ class Task(Model):
         self.state = TASK_STATES.RUNNING
         self.started_at = timezone.now()
         self.save()
+        events.publish_state([self.pk], self.state)
 
     def set_completed(self):
         """
@@ -324,6 +397,7 @@ class Task(Model):
             _logger.warning(msg % self.id)
 
         self.save()
+        events.publish_state([self.pk], self.state)
 
     def set_failed(self, exc, tb):
         """
@@ -341,16 +415,29 @@ class Task(Model):
         tb_str = ''.join(traceback.format_tb(tb))
         self.error = exception_to_dict(exc, tb_str)
         self.save()
+        events.publish_state([self.pk], self.state)
 
     def release_resources(self):
         """
         Release the reserved resources that are reserved by this task. If a reserved resource no
         longer has any tasks reserving it, delete it.
+
+        Both steps are done by one statement: the task's associations are deleted in a
+        ``DELETE ... RETURNING`` and the reservations they pointed to are deleted unless another
+        task still holds them.
         """
-        for reservation in self.reserved_resources.all():
-            TaskReservedResource.objects.filter(task=self.id).delete()
-            if not reservation.tasks.exists():
-                reservation.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "WITH released AS ("
+                "DELETE FROM {association} WHERE task_id = %s RETURNING resource_id) "
+                "DELETE FROM {reservation} WHERE id IN (SELECT resource_id FROM released) "
+                "AND NOT EXISTS (SELECT 1 FROM {association} "
+                "WHERE {association}.resource_id = {reservation}.id "
+                "AND {association}.task_id <> %s)".format(
+                    association=TaskReservedResource._meta.db_table,
+                    reservation=ReservedResource._meta.db_table),
+                [self.pk, self.pk]
+            )
 
 
 class CreatedResource(GenericRelationModel):
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from gettext import gettext as _
+import os
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from .base import Model
+
+
+class Upload(Model):
+    """
+    A file uploaded in chunks, which becomes an Artifact once all its bytes were received.
+
+    The file is preallocated to its size when the upload is created. The chunks can then be
+    uploaded in any order and in parallel, each of them being written in place at its offset.
+
+    ``last_updated`` is the time the last chunk was received. Uploads which received no chunk for
+    ``UPLOAD['EXPIRATION']`` seconds are deleted by orphan cleanup, see :meth:`expired`.
+
+    Fields:
+
+        file (models.FileField): The file the chunks are written into.
+        size (models.BigIntegerField): The size of the file in bytes.
+
+    Relations:
+
+        chunks (UploadChunk): The chunks received so far.
+    """
+    file = models.FileField(null=False, max_length=255)
+    size = models.BigIntegerField()
+
+    # The number of bytes read from a chunk at a time
+    COPY_BUFFER_SIZE = 1048576  # 1 megabyte
+
+    @classmethod
+    def create(cls, size):
+        """
+        Create an Upload, along with its file preallocated to `size` bytes.
+
+        Args:
+            size (int): The size of the file in bytes.
+
+        Returns:
+            pulpcore.app.models.Upload: The created Upload.
+        """
+        name = os.path.join('upload', str(uuid4()))
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            if size:
+                try:
+                    os.posix_fallocate(file.fileno(), 0, size)
+                except (AttributeError, OSError):
+                    # Not supported by the platform or the filesystem, leave the file sparse
+                    file.truncate(size)
+        return cls.objects.create(file=name, size=size)
+
+    def write_chunk(self, offset, size, stream):
+        """
+        Write a chunk of the file at its offset, and record it.
+
+        Args:
+            offset (int): The offset of the chunk in the file.
+            size (int): The size of the chunk in bytes.
+            stream (file): The stream to read the chunk from.
+
+        Returns:
+            pulpcore.app.models.UploadChunk: The chunk recorded.
+
+        Raises:
+            ValueError: When the chunk does not fit in the file, or the stream ends before
+                `size` bytes were read.
+        """
+        if offset < 0 or size <= 0 or offset + size > self.size:
+            raise ValueError(_('The chunk of {size} bytes at offset {offset} does not fit in the '
+                               'file of {total} bytes.').format(size=size, offset=offset,
+                                                                total=self.size))
+        remaining = size
+        with open(self.file.path, 'r+b') as file:
+            file.seek(offset)
+            while remaining:
+                data = stream.read(min(remaining, self.COPY_BUFFER_SIZE))
+                if not data:
+                    raise ValueError(_('The chunk ended after {read} of its {size} bytes.').format(
+                        read=size - remaining, size=size))
+                file.write(data)
+                remaining -= len(data)
+        chunk = UploadChunk.objects.create(upload=self, offset=offset, size=size)
+        Upload.objects.filter(pk=self.pk).update(last_updated=chunk.created)
+        return chunk
+
+    @staticmethod
+    def expired():
+        """
+        Returns:
+            django.db.models.query.QuerySet: The Uploads which received no chunk for
+                ``UPLOAD['EXPIRATION']`` seconds.
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD['EXPIRATION'])
+        return Upload.objects.filter(last_updated__lt=cutoff)
+
+    def missing_ranges(self):
+        """
+        Returns:
+            list: The (offset, size) of each range of the file no chunk was received for.
+        """
+        missing = []
+        end = 0
+        for offset, size in self.chunks.order_by('offset').values_list('offset', 'size'):
+            if offset > end:
+                missing.append((end, offset - end))
+            end = max(end, offset + size)
+        if end < self.size:
+            missing.append((end, self.size - end))
+        return missing
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes Upload model and its file, if it was not moved to Artifact storage.
+
+        Args:
+            args (list): list of positional arguments for Model.delete()
+            kwargs (dict): dictionary of keyword arguments to pass to Model.delete()
+        """
+        super().delete(*args, **kwargs)
+        self.file.delete(save=False)
+
+
+class UploadChunk(Model):
+    """
+    A chunk of an Upload, written to its file.
+
+    Fields:
+
+        offset (models.BigIntegerField): The offset of the chunk in the file.
+        size (models.BigIntegerField): The size of the chunk in bytes.
+
+    Relations:
+
+        upload (models.ForeignKey): The Upload the chunk belongs to.
+    """
+    upload = models.ForeignKey(Upload, on_delete=models.CASCADE, related_name='chunks')
+    offset = models.BigIntegerField()
+    size = models.BigIntegerField()
@@ -1,4 +1,9 @@
+from collections import OrderedDict
+from gettext import gettext as _
+
 from rest_framework import pagination
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.response import Response
 
 
 class IDPagination(pagination.PageNumberPagination):
@@ -28,3 +33,79 @@ class NamePagination(pagination.PageNumberPagination):
     ordering = 'name'
     page_size_query_param = 'page_size'
     max_page_size = 5000
+
+
+class CountedCursorPagination(pagination.CursorPagination):
+    """
+    Paginate an API view with a cursor, based on the position of the last object of the page.
+
+    Unlike the page number paginators, the next page is fetched with a `WHERE` on the ordering
+    field instead of an `OFFSET`, so every page costs the same however deep into the collection
+    it is. The ordering field should be indexed and unique, or nearly unique.
+
+    The response carries the total `count` of objects like the other paginators, unless the
+    client opts out of it with `count=false`, as counting a large collection takes longer than
+    fetching a page of it.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 5000
+    count_query_param = 'count'
+    count_query_description = _('Whether to include the total number of results, "true" by '
+                                'default.')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Paginate a queryset, counting it first unless the request opted out of the count.
+        """
+        if self.get_count_enabled(request):
+            self.count = queryset.count()
+        else:
+            self.count = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_enabled(self, request):
+        """
+        Returns:
+            bool: False if the request asks for no count with the `count` query parameter.
+        """
+        value = request.query_params.get(self.count_query_param, '')
+        return value.lower() not in ('false', '0', 'no')
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_schema_fields(self, view):
+        fields = super().get_schema_fields(view)
+        fields.append(coreapi.Field(
+            name=self.count_query_param,
+            required=False,
+            location='query',
+            schema=coreschema.Boolean(title='Count', description=self.count_query_description)
+        ))
+        return fields
+
+
+class IDCursorPagination(CountedCursorPagination):
+    """
+    Paginate an API view with a cursor, based on the ID of objects being iterated over.
+
+    The same assumptions as for :class:`IDPagination` apply. This Paginator should be used for the
+    largest collections, like Content and Artifacts.
+    """
+    ordering = 'id'
+
+
+class CreatedCursorPagination(CountedCursorPagination):
+    """
+    Paginate an API view with a cursor, newest objects first, based on their 'created' timestamp.
+
+    This Paginator should be used for the large collections whose ID is not ordered, like Tasks.
+    The 'created' field should be indexed. A view with an `OrderingFilter` can still be ordered
+    by another field with the `ordering` query parameter.
+    """
+    ordering = '-created'
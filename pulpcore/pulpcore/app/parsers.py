@@ -0,0 +1,47 @@
+from functools import partial
+from gettext import gettext as _
+import os
+import tarfile
+
+from django.utils.datastructures import MultiValueDict
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, DataAndFiles
+
+from pulpcore.app.files import PulpTemporaryUploadedFile
+
+
+class TarParser(BaseParser):
+    """
+    Parser for a tar archive streamed as the request body, e.g. with ``tar c * | curl -T -``.
+
+    The archive can be compressed. Its regular files are written to temporary files and hashed
+    while the archive is read, the way :class:`~pulpcore.app.files.HashingFileUploadHandler` does
+    for multipart uploads. They are returned as the files of the ``file`` field.
+    """
+    media_type = 'application/x-tar'
+
+    # The number of bytes read from the archive at a time
+    chunk_size = 1048576  # 1 megabyte
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        files = []
+        try:
+            with tarfile.open(fileobj=stream, mode='r|*') as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    upload = PulpTemporaryUploadedFile(os.path.basename(member.name),
+                                                       'application/octet-stream', 0, None)
+                    files.append(upload)
+                    member_file = archive.extractfile(member)
+                    for chunk in iter(partial(member_file.read, self.chunk_size), b''):
+                        upload.write(chunk)
+                        for hasher in upload.hashers.values():
+                            hasher.update(chunk)
+                    upload.size = member.size
+                    upload.seek(0)
+        except tarfile.TarError as error:
+            for upload in files:
+                upload.close()
+            raise ParseError(_('Tar parse error - {error}').format(error=error))
+        return DataAndFiles({}, MultiValueDict({'file': files}))
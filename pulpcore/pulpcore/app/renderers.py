@@ -0,0 +1,47 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+def format_event(name, data):
+    """
+    Format a server-sent event.
+
+    Args:
+        name (str): The name of the event.
+        data: The data of the event, serialized as JSON.
+
+    Returns:
+        str: The event in the ``text/event-stream`` format.
+    """
+    return 'event: {name}\ndata: {data}\n\n'.format(name=name, data=json.dumps(data))
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Renderer for server-sent events.
+
+    Event streams are returned by :class:`~pulpcore.app.response.TaskEventStreamResponse`, which is
+    not rendered. This renders any other response, e.g. an error, as a single ``error`` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_event('error', data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for newline-delimited JSON.
+
+    Streams of JSON objects are returned by :class:`~pulpcore.app.response.ContentStreamResponse`,
+    which is not rendered. This renders any other response, e.g. an error, as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data) + '\n'
@@ -1,5 +1,20 @@
+from itertools import islice
+import json
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rq.compat import as_text
+
+from pulpcore.app.models import Content, ContentArtifact
+from pulpcore.app.renderers import format_event
+from pulpcore.app.serializers import view_name_for_model
+from pulpcore.constants import TASK_FINAL_STATES
+from pulpcore.tasking import events
+from pulpcore.tasking.connection import get_redis_connection
+from pulpcore.tasking.constants import TASKING_CONSTANTS
 
 
 class OperationPostponedResponse(Response):
@@ -25,3 +40,140 @@ class OperationPostponedResponse(Response):
         """
         task = {"task": reverse('tasks-detail', args=[result.id], request=None)}
         super().__init__(data=task, status=202)
+
+
+class TaskEventStreamResponse(StreamingHttpResponse):
+    """
+    An HTTP response class streaming the state and progress changes of tasks as server-sent events.
+
+    The stream starts with a ``state`` event for each task and a ``progress`` event for each of
+    their progress reports, then follows the changes as the workers publish them, and ends once all
+    tasks have reached a final state. The events look like the following::
+
+        event: state
+        data: {"task": "/pulp/api/v3/tasks/adlfk-bala-23k5l7-lslser/", "state": "running"}
+
+        event: progress
+        data: {"task": "/pulp/api/v3/tasks/adlfk-bala-23k5l7-lslser/", "progress_report":
+               {"message": "Downloading Artifacts", "state": "running", "total": null,
+                "done": 42, "suffix": ""}}
+    """
+
+    def __init__(self, tasks):
+        """
+        Args:
+            tasks (django.db.models.query.QuerySet): The tasks to stream the events of.
+        """
+        super().__init__(self._stream(tasks), content_type='text/event-stream')
+        self['Cache-Control'] = 'no-cache'
+        # Ask proxies not to buffer the stream
+        self['X-Accel-Buffering'] = 'no'
+
+    @staticmethod
+    def _stream(tasks):
+        """
+        Yield the server-sent events of the tasks.
+
+        The channels of the tasks are subscribed to before their current state is read, so no
+        change is missed.
+        """
+        task_ids = [str(task_id) for task_id in tasks.values_list('pk', flat=True)]
+        if not task_ids:
+            return
+        pubsub = get_redis_connection().pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(*[events.channel(task_id) for task_id in task_ids])
+
+            pending = set()
+            for task in tasks.model.objects.filter(pk__in=task_ids).prefetch_related(
+                    'progress_reports'):
+                href = reverse('tasks-detail', args=[task.pk])
+                yield format_event(events.STATE_EVENT, {'task': href, 'state': task.state})
+                for report in task.progress_reports.all():
+                    yield format_event(events.PROGRESS_EVENT, {
+                        'task': href, 'progress_report': events.progress_report_data(report)})
+                if task.state not in TASK_FINAL_STATES:
+                    pending.add(str(task.pk))
+
+            last_sent = time.monotonic()
+            while pending:
+                message = pubsub.get_message(timeout=TASKING_CONSTANTS.EVENTS_KEEPALIVE)
+                if message is None:
+                    if time.monotonic() - last_sent >= TASKING_CONSTANTS.EVENTS_KEEPALIVE:
+                        # A comment keeps the connection from being closed as idle
+                        yield ': keep-alive\n\n'
+                        last_sent = time.monotonic()
+                    continue
+                event = json.loads(as_text(message['data']))
+                name = event.pop('event')
+                task_id = event['task']
+                event['task'] = reverse('tasks-detail', args=[task_id])
+                yield format_event(name, event)
+                last_sent = time.monotonic()
+                if name == events.STATE_EVENT and event['state'] in TASK_FINAL_STATES:
+                    pending.discard(task_id)
+        finally:
+            pubsub.close()
+
+
+class ContentStreamResponse(StreamingHttpResponse):
+    """
+    An HTTP response class streaming Content as newline-delimited JSON, one unit per line.
+
+    The Content is read from a server-side cursor and represented a chunk at a time, so the memory
+    used does not grow with the number of units. Each line looks like the following::
+
+        {"_href": "/pulp/api/v3/content/file/1/", "type": "file",
+         "natural_key": {"relative_path": "1.iso", "digest": "b5bb9d80..."},
+         "artifacts": {"1.iso": {"_href": "/pulp/api/v3/artifacts/1/", "sha256": "b5bb9d80..."}}}
+
+    Artifacts which were not downloaded yet are represented as ``null``.
+    """
+
+    # The number of units read from the cursor and represented at a time
+    chunk_size = 1000
+
+    def __init__(self, content):
+        """
+        Args:
+            content (django.db.models.query.QuerySet): The Content to stream.
+        """
+        super().__init__(self._stream(content), content_type='application/x-ndjson')
+        # Ask proxies not to buffer the stream
+        self['X-Accel-Buffering'] = 'no'
+
+    @classmethod
+    def _stream(cls, content):
+        """
+        Yield a line of JSON for each unit of the Content, in the order of their IDs.
+        """
+        view_names = {}
+        units = content.order_by('pk').iterator(chunk_size=cls.chunk_size)
+        while True:
+            chunk = Content.cast_all(islice(units, cls.chunk_size))
+            if not chunk:
+                return
+
+            artifacts = {unit.pk: {} for unit in chunk}
+            content_artifacts = ContentArtifact.objects.filter(content__in=list(artifacts))
+            content_artifacts = content_artifacts.values_list(
+                'content_id', 'relative_path', 'artifact_id', 'artifact__sha256')
+            for content_id, relative_path, artifact_id, sha256 in content_artifacts.iterator():
+                if artifact_id is None:
+                    artifacts[content_id][relative_path] = None
+                else:
+                    artifacts[content_id][relative_path] = {
+                        '_href': reverse('artifacts-detail', args=[artifact_id]),
+                        'sha256': sha256,
+                    }
+
+            for unit in chunk:
+                model = unit._meta.model
+                if model not in view_names:
+                    view_names[model] = view_name_for_model(model, 'detail')
+                yield json.dumps({
+                    '_href': reverse(view_names[model], args=[unit.pk]),
+                    'type': unit.type,
+                    'natural_key': unit.natural_key_dict(),
+                    'artifacts': artifacts[unit.pk],
+                }, cls=DjangoJSONEncoder) + '\n'
@@ -17,7 +17,14 @@ from .base import (  # noqa
     AsyncOperationResponseSerializer
 )
 from .fields import BaseURLField, ContentRelatedField, LatestVersionField  # noqa
-from .content import ArtifactSerializer, ContentGuardSerializer, ContentSerializer  # noqa
+from .content import (  # noqa
+    ArtifactDigestSerializer,
+    ArtifactExistsResponseSerializer,
+    ArtifactExistsSerializer,
+    ArtifactSerializer,
+    ContentGuardSerializer,
+    ContentSerializer
+)
 from .progress import ProgressReportSerializer  # noqa
 from .repository import (  # noqa
     DistributionSerializer,
@@ -31,5 +38,13 @@ from .repository import (  # noqa
     RepositoryVersionSerializer,
     RepositoryVersionCreateSerializer
 )
-from .task import MinimalTaskSerializer, TaskSerializer, WorkerSerializer  # noqa
+from .task import (  # noqa
+    BulkTaskDispatchResponseSerializer,
+    BulkTaskDispatchSerializer,
+    MinimalTaskSerializer,
+    TaskOperationSerializer,
+    TaskSerializer,
+    WorkerSerializer
+)
+from .upload import UploadChunkSerializer, UploadCommitSerializer, UploadSerializer  # noqa
 from .user import UserSerializer  # noqa
@@ -1,8 +1,10 @@
-from collections import OrderedDict
+from collections import defaultdict, OrderedDict
 from gettext import gettext as _
 from urllib.parse import urljoin
 
 from django.core.validators import URLValidator
+from django.db import models
+from django.db.models import prefetch_related_objects
 from drf_queryfields.mixins import QueryFieldsMixin
 
 from rest_framework import serializers
@@ -106,6 +108,13 @@ class GenericKeyValueRelatedField(serializers.DictField):
     """
     child = serializers.CharField()
 
+    @property
+    def prefetch_lookups(self):
+        """
+        The lookups a list serializer prefetches for all the instances it represents.
+        """
+        return (self.source,)
+
     def to_representation(self, value):
         # The field being represented isn't a dict, but the mapping attr is,
         # so value.mapping is the actual value that needs to be represented.
@@ -244,6 +253,48 @@ class MasterModelSerializer(ModelSerializer):
     class Meta:
         fields = ModelSerializer.Meta.fields + ('type',)
 
+    # The readable fields of the Detail serializers, by Detail model
+    _detail_fields = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """
+        Create a :class:`MasterModelListSerializer` when `many=True` is used.
+
+        The Meta classes of Detail serializers do not inherit from this one, so the list serializer
+        class is not declared with `Meta.list_serializer_class`.
+        """
+        list_serializer = super().many_init(*args, **kwargs)
+        if type(list_serializer) is not serializers.ListSerializer:
+            return list_serializer
+        return MasterModelListSerializer(*list_serializer._args, **list_serializer._kwargs)
+
+    def get_detail_fields(self, instance):
+        """
+        Return the readable fields of the serializer of the Detail model of a cast instance.
+
+        The fields are built once for each Detail model the serializer represents.
+
+        Args:
+            instance (pulpcore.app.models.MasterModel): A cast Detail instance.
+
+        Returns:
+            list: The readable fields of the serializer registered for the Detail model.
+        """
+        if self._detail_fields is None:
+            self._detail_fields = {}
+        model = instance._meta.model
+        try:
+            return self._detail_fields[model]
+        except KeyError:
+            pass
+
+        viewset = viewset_for_model(instance)()
+        viewset.request = self._context['request']
+        fields = list(viewset.get_serializer_class()(context=self._context)._readable_fields)
+        self._detail_fields[model] = fields
+        return fields
+
     def to_representation(self, instance):
         """
         Represent a cast Detail instance as a dict of primitive datatypes
@@ -255,11 +306,8 @@ class MasterModelSerializer(ModelSerializer):
         ret = OrderedDict()
 
         instance = instance.cast()
-        viewset = viewset_for_model(instance)()
-        viewset.request = self._context['request']
-        fields = viewset.get_serializer_class()(context=self._context)._readable_fields
 
-        for field in fields:
+        for field in self.get_detail_fields(instance):
             try:
                 attribute = field.get_attribute(instance)
             except SkipField:
@@ -274,6 +322,36 @@ class MasterModelSerializer(ModelSerializer):
         return ret
 
 
+class MasterModelListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer used for Master/Detail Models when `many=True` is used.
+
+    Representing the instances one by one would cast each of them, and fetch the related objects
+    of each of them, with queries of their own. Instead, the instances are cast with
+    :meth:`~pulpcore.app.models.MasterModel.cast_all`, and the lookups named by the
+    `prefetch_lookups` attribute of the Detail serializer fields are prefetched for all instances
+    of a Detail model at once.
+    """
+
+    def to_representation(self, data):
+        """
+        List of object instances -> List of dicts of primitive datatypes.
+        """
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        instances = self.child.Meta.model.cast_all(iterable)
+
+        by_model = defaultdict(list)
+        for instance in instances:
+            by_model[instance._meta.model].append(instance)
+        for model_instances in by_model.values():
+            lookups = set()
+            for field in self.child.get_detail_fields(model_instances[0]):
+                lookups.update(getattr(field, 'prefetch_lookups', ()))
+            prefetch_related_objects(model_instances, *lookups)
+
+        return [self.child.to_representation(instance) for instance in instances]
+
+
 class MatchingNullViewName(object):
     """Object that can be used as the default view name for detail fields
 
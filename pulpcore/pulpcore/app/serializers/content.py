@@ -1,8 +1,9 @@
 from gettext import gettext as _
 import hashlib
 
+from django.db.models import Q
 from rest_framework import serializers
-from rest_framework.validators import UniqueValidator
+from rest_framework.validators import UniqueTogetherValidator
 
 from pulpcore.app import models
 from pulpcore.app.serializers import base, fields
@@ -29,6 +30,24 @@ class ContentSerializer(base.MasterModelSerializer):
         model = models.Content
         fields = base.MasterModelSerializer.Meta.fields + ('notes', 'artifacts')
 
+    def get_validators(self):
+        """
+        Leave out the validator of the natural key when validating many units for a bulk create.
+
+        The validator queries the db once for each unit. The bulk create looks up the natural keys
+        of all the units at once instead, which it tells with the `bulk` key of the context.
+
+        Returns:
+            list: The validators of the serializer.
+        """
+        validators = super().get_validators()
+        if not self.context.get('bulk'):
+            return validators
+        natural_key = set(self.Meta.model.natural_key_fields())
+        return [validator for validator in validators
+                if not (isinstance(validator, UniqueTogetherValidator) and
+                        set(validator.fields) == natural_key)]
+
 
 class ArtifactSerializer(base.ModelSerializer):
     _href = base.IdentityField(
@@ -110,13 +129,16 @@ class ArtifactSerializer(base.ModelSerializer):
                                                       % algorithm)
                 else:
                     data[algorithm] = digest
-                if algorithm in UNIQUE_ALGORITHMS:
-                    validator = UniqueValidator(models.Artifact.objects.all(),
-                                                message=_("{0} checksum must be "
-                                                          "unique.").format(algorithm))
-                    validator.field_name = algorithm
-                    validator.instance = None
-                    validator(digest)
+
+        # A single query finds the Artifacts sharing any of the unique digests
+        query = Q()
+        for algorithm in UNIQUE_ALGORITHMS:
+            query |= Q(**{algorithm: data[algorithm]})
+        for existing in models.Artifact.objects.filter(query).values(*UNIQUE_ALGORITHMS):
+            for algorithm in UNIQUE_ALGORITHMS:
+                if existing[algorithm] == data[algorithm]:
+                    raise serializers.ValidationError(_("{0} checksum must be "
+                                                        "unique.").format(algorithm))
         return data
 
     class Meta:
@@ -125,6 +147,49 @@ class ArtifactSerializer(base.ModelSerializer):
                                                      'sha256', 'sha384', 'sha512')
 
 
+class ArtifactDigestSerializer(serializers.Serializer):
+    """
+    Serializer for the sha256 digest and the size of a file.
+    """
+    sha256 = serializers.RegexField(
+        help_text=_("The SHA-256 checksum of the file."),
+        regex=r'^[0-9a-f]{64}$'
+    )
+
+    size = serializers.IntegerField(
+        help_text=_("The size of the file in bytes."),
+        min_value=0
+    )
+
+
+class ArtifactExistsSerializer(serializers.Serializer):
+    """
+    Serializer for checking which of many files are already stored as Artifacts.
+    """
+    artifacts = ArtifactDigestSerializer(
+        help_text=_("The digests and sizes of the files to check."),
+        many=True,
+        allow_empty=False
+    )
+
+
+class ArtifactExistsResponseSerializer(serializers.Serializer):
+    """
+    Serializer for the response of an Artifact existence check.
+    """
+    existing = serializers.DictField(
+        help_text=_("The hrefs of the Artifacts already stored, keyed by their sha256."),
+        child=serializers.CharField(),
+        read_only=True
+    )
+
+    missing = serializers.ListField(
+        help_text=_("The sha256 of the files which are not stored yet, and need to be uploaded."),
+        child=serializers.CharField(),
+        read_only=True
+    )
+
+
 class ContentGuardSerializer(base.MasterModelSerializer):
     _href = base.DetailIdentityField()
 
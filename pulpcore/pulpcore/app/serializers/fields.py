@@ -1,13 +1,16 @@
 from gettext import gettext as _
 import os
+from urllib.parse import urlparse
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.urls import resolve, Resolver404
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 from rest_framework_nested.relations import NestedHyperlinkedRelatedField
 
 from pulpcore.app import models
-from pulpcore.app.serializers import DetailRelatedField, RelatedField
+from pulpcore.app.serializers import DetailRelatedField
 
 
 class ContentRelatedField(DetailRelatedField):
@@ -21,6 +24,10 @@ class ContentArtifactsField(serializers.DictField):
     """
     A serializer field for the 'artifacts' ManyToManyField on the Content model.
     """
+    child = serializers.CharField()
+
+    # The lookups a list serializer prefetches for all the Content it represents
+    prefetch_lookups = ('contentartifact_set',)
 
     def run_validation(self, data):
         """
@@ -29,6 +36,9 @@ class ContentArtifactsField(serializers.DictField):
         Validates that all keys of 'data' are relative paths. Validates that all values of 'data'
         are URLs for an existing Artifact.
 
+        The Artifacts are looked up in the `artifacts` mapping of the serializer context when there
+        is one, see :meth:`resolve_artifacts`, and with a single query otherwise.
+
         Args:
             data (dict): A dict mapping relative paths inside the Content to the corresponding
                 Artifact URLs.
@@ -41,23 +51,48 @@ class ContentArtifactsField(serializers.DictField):
             :class:`rest_framework.exceptions.ValidationError`: When one of the Artifacts does not
                 exist or one of the paths is not a relative path.
         """
-        ret = {}
-        for relative_path, url in data.items():
+        data = super().run_validation(data)
+        for relative_path in data:
             if os.path.isabs(relative_path):
                 raise serializers.ValidationError(_("Relative path can't start with '/'. "
                                                     "{0}").format(relative_path))
-            artifactfield = RelatedField(view_name='artifacts-detail',
-                                         queryset=models.Artifact.objects.all(),
-                                         source='*', initial=url)
+
+        artifacts = self.context.get('artifacts')
+        if artifacts is None:
+            artifacts = self.resolve_artifacts(data.values())
+        ret = {}
+        for relative_path, url in data.items():
             try:
-                artifact = artifactfield.run_validation(data=url)
-                ret[relative_path] = artifact
-            except serializers.ValidationError as e:
-                # Append the URL of missing Artifact to the error message
-                e.detail[0] = "%s %s" % (e.detail[0], url)
-                raise e
+                ret[relative_path] = artifacts[url]
+            except KeyError:
+                raise serializers.ValidationError(_("Invalid hyperlink - Object does not exist. "
+                                                    "{0}").format(url))
         return ret
 
+    @staticmethod
+    def resolve_artifacts(urls):
+        """
+        Look up the Artifacts of many URLs with a single query.
+
+        Args:
+            urls (iterable): Artifact URLs.
+
+        Returns:
+            dict: The Artifacts found, keyed by their URL. URLs which are not the URL of an
+                existing Artifact are left out.
+        """
+        pks = {}
+        for url in urls:
+            try:
+                match = resolve(urlparse(url).path)
+                pk = models.Artifact._meta.pk.to_python(match.kwargs['pk'])
+            except (Resolver404, KeyError, ValidationError):
+                continue
+            if match.view_name == 'artifacts-detail':
+                pks[url] = pk
+        found = models.Artifact.objects.in_bulk(set(pks.values()))
+        return {url: found[pk] for url, pk in pks.items() if pk in found}
+
     def get_attribute(self, instance):
         """
         Returns the field from the instance that should be serialized using this serializer field.
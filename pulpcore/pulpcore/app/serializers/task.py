@@ -72,6 +72,12 @@ class TaskSerializer(ModelSerializer):
         read_only=True,
         view_name='tasks-detail'
     )
+    dependencies = RelatedField(
+        help_text=_("Tasks which must complete before this task is dispatched."),
+        many=True,
+        read_only=True,
+        view_name='tasks-detail'
+    )
     progress_reports = ProgressReportSerializer(
         many=True,
         read_only=True
@@ -87,8 +93,8 @@ class TaskSerializer(ModelSerializer):
         model = models.Task
         fields = ModelSerializer.Meta.fields + ('state', 'started_at', 'finished_at',
                                                 'non_fatal_errors', 'error', 'worker', 'parent',
-                                                'spawned_tasks', 'progress_reports',
-                                                'created_resources')
+                                                'spawned_tasks', 'dependencies',
+                                                'progress_reports', 'created_resources')
 
 
 class MinimalTaskSerializer(TaskSerializer):
@@ -99,6 +105,55 @@ class MinimalTaskSerializer(TaskSerializer):
                                                 'worker', 'parent')
 
 
+class TaskOperationSerializer(serializers.Serializer):
+    """
+    Serializer for one operation of a bulk task dispatch.
+    """
+    path = serializers.CharField(
+        help_text=_("The path of an endpoint which dispatches a task, "
+                    "e.g. '/pulp/api/v3/repositories/1/versions/'.")
+    )
+    method = serializers.ChoiceField(
+        help_text=_("The HTTP method of the operation."),
+        choices=('post', 'put', 'patch', 'delete'),
+        default='post'
+    )
+    body = serializers.JSONField(
+        help_text=_("The body of the operation, as it would be sent to the endpoint."),
+        default=dict
+    )
+    depends_on = serializers.ListField(
+        help_text=_("Indexes of previous operations and hrefs of tasks which must complete "
+                    "before this operation is performed."),
+        child=serializers.CharField(),
+        default=list
+    )
+
+
+class BulkTaskDispatchSerializer(serializers.Serializer):
+    """
+    Serializer for dispatching the tasks of many operations with a single request.
+    """
+    operations = TaskOperationSerializer(
+        help_text=_("The operations to perform. Either the tasks of all operations are "
+                    "dispatched or, if any operation fails, none of them."),
+        many=True,
+        allow_empty=False
+    )
+
+
+class BulkTaskDispatchResponseSerializer(serializers.Serializer):
+    """
+    Serializer for the response of a bulk task dispatch.
+    """
+    tasks = RelatedField(
+        help_text=_("The hrefs of the dispatched tasks, in the order of the operations."),
+        many=True,
+        read_only=True,
+        view_name='tasks-detail'
+    )
+
+
 class WorkerSerializer(ModelSerializer):
     _href = IdentityField(view_name='workers-detail')
 
@@ -0,0 +1,67 @@
+from gettext import gettext as _
+
+from django.conf import settings
+from rest_framework import serializers
+
+from pulpcore.app import models
+from pulpcore.app.serializers import base
+
+
+class UploadChunkSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(
+        help_text=_('The offset of the chunk in the file.'),
+        read_only=True
+    )
+
+    size = serializers.IntegerField(
+        help_text=_('The size of the chunk in bytes.'),
+        read_only=True
+    )
+
+    class Meta:
+        model = models.UploadChunk
+        fields = ('offset', 'size')
+
+
+class UploadSerializer(base.ModelSerializer):
+    _href = base.IdentityField(
+        view_name='uploads-detail',
+    )
+
+    size = serializers.IntegerField(
+        help_text=_('The size of the file in bytes.'),
+        min_value=0
+    )
+
+    chunks = UploadChunkSerializer(
+        help_text=_('The chunks received so far.'),
+        many=True,
+        read_only=True
+    )
+
+    def validate_size(self, value):
+        """
+        Check that the size does not exceed ``UPLOAD['MAX_SIZE']``.
+        """
+        max_size = settings.UPLOAD['MAX_SIZE']
+        if max_size is not None and value > max_size:
+            raise serializers.ValidationError(
+                _('Uploads are limited to {max_size} bytes.').format(max_size=max_size))
+        return value
+
+    def create(self, validated_data):
+        """
+        Create the Upload, along with its file preallocated to its size.
+        """
+        return models.Upload.create(validated_data['size'])
+
+    class Meta:
+        model = models.Upload
+        fields = base.ModelSerializer.Meta.fields + ('size', 'chunks')
+
+
+class UploadCommitSerializer(serializers.Serializer):
+    sha256 = serializers.CharField(
+        help_text=_('The expected SHA-256 checksum of the file.'),
+        required=False
+    )
@@ -217,3 +217,13 @@ CONTENT = {
 }
 
 PROFILE_STAGES_API = False
+
+WORK_HORSE_POOL = {
+    'ENABLED': False,
+    'MAX_JOBS': 100,
+}
+
+UPLOAD = {
+    'MAX_SIZE': 16 * 1024 ** 3,
+    'EXPIRATION': 24 * 60 * 60,
+}
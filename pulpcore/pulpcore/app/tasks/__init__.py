@@ -1,3 +1,3 @@
-from pulpcore.app.tasks import base, repository  # noqa
+from pulpcore.app.tasks import base, repository, upload  # noqa
 
 from .orphan import orphan_cleanup  # noqa
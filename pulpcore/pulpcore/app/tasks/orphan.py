@@ -1,32 +1,251 @@
-from pulpcore.app.models import Artifact, Content, ContentArtifact, ProgressBar, RepositoryContent
+from concurrent.futures import ThreadPoolExecutor
+from gettext import gettext as _
+import logging
+import time
+
+from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.signals import post_delete, pre_delete
+
+from pulpcore.app.models import (
+    Artifact,
+    Content,
+    ContentArtifact,
+    ProgressBar,
+    RepositoryContent,
+    Task,
+    Upload,
+)
+from pulpcore.constants import API_ROOT, TASK_STATES
+
+
+_logger = logging.getLogger(__name__)
+
+# The resource reserved by orphan cleanup, so that only one runs at a time
+ORPHAN_CLEANUP_RESOURCE = '/{api_root}orphans/'.format(api_root=API_ROOT)
+
+# The number of orphans deleted per transaction
+CHUNK_SIZE = 1000
+
+# The number of seconds after which the cleanup yields to other tasks by continuing in a new task
+TIME_BUDGET = 60
+
+# The number of threads removing the files of orphan Artifacts
+UNLINK_THREADS = 8
 
 
 def orphan_cleanup():
     """
     Delete all orphan Content and Artifact records.
     This task removes Artifact files from the filesystem as well.
+
+    The cleanup runs concurrently with other tasks. It only removes orphans whose
+    ``timestamp_of_interest`` is older than the start of the cleanup and of every running task, see
+    :func:`_snapshot`. Tasks and API requests touch the existing Content and Artifacts before they
+    associate them, see :func:`pulpcore.app.models.content.touch`, and create new ones with a recent
+    timestamp, so nothing about to be associated is removed.
+
+    Orphans are deleted in chunks of ``CHUNK_SIZE``, each in its own transaction, without loading
+    them or the records depending on them. Once ``TIME_BUDGET`` seconds have elapsed, the cleanup
+    continues in a new task so the tasks waiting meanwhile get dispatched.
+
+    Uploads which received no chunk for ``UPLOAD['EXPIRATION']`` seconds are deleted as well, along
+    with their files.
     """
+    started_at = timezone.now()
+    deadline = time.monotonic() + TIME_BUDGET
+
+    # Upload cleanup
+    for upload in Upload.expired():
+        upload.delete()
+
     # Content cleanup
-    content = Content.objects.exclude(pk__in=RepositoryContent.objects.values_list('content_id',
-                                                                                   flat=True))
-    progress_bar = ProgressBar(message='Clean up orphan Content', total=content.count(),
-                               done=0, state='running')
-    progress_bar.save()
-    content.delete()
-    progress_bar.done = progress_bar.total
-    progress_bar.state = 'completed'
-    progress_bar.save()
+    content = Content.objects.annotate(
+        in_repository=Exists(RepositoryContent.objects.filter(content_id=OuterRef('pk')))
+    ).filter(in_repository=False)
+    total = content.filter(timestamp_of_interest__lt=_snapshot(started_at)).count()
+    with ProgressBar(message='Clean up orphan Content', total=total) as progress_bar:
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                orphans = content.filter(timestamp_of_interest__lt=_snapshot(started_at))
+                chunk = _select_chunk(orphans, last_pk)
+                if not chunk:
+                    break
+                _delete(Content.objects.filter(pk__in=chunk))
+            last_pk = chunk[-1]
+            progress_bar.increase_by(len(chunk))
+            if time.monotonic() > deadline:
+                return _continue_orphan_cleanup(progress_bar)
 
     # Artifact cleanup
-    artifacts = Artifact.objects.exclude(pk__in=ContentArtifact.objects.values_list('artifact_id',
-                                                                                    flat=True))
-    progress_bar = ProgressBar(message='Clean up orphan Artifacts', total=artifacts.count(),
-                               done=0, state='running')
-    progress_bar.save()
-    for artifact in artifacts:
-        # we need to manually call delete() because it cleans up the file on the filesystem
-        artifact.delete()
-        progress_bar.increment()
-
-    progress_bar.state = 'completed'
-    progress_bar.save()
+    artifacts = Artifact.objects.annotate(
+        in_content=Exists(ContentArtifact.objects.filter(artifact_id=OuterRef('pk')))
+    ).filter(in_content=False)
+    total = artifacts.filter(timestamp_of_interest__lt=_snapshot(started_at)).count()
+    storage = Artifact._meta.get_field('file').storage
+    with ProgressBar(message='Clean up orphan Artifacts', total=total) as progress_bar:
+        with ThreadPoolExecutor(max_workers=UNLINK_THREADS) as executor:
+            last_pk = 0
+            while True:
+                with transaction.atomic():
+                    orphans = artifacts.filter(timestamp_of_interest__lt=_snapshot(started_at))
+                    chunk = _select_chunk(orphans, last_pk, 'file')
+                    if not chunk:
+                        break
+                    _delete(Artifact.objects.filter(pk__in=[pk for pk, name in chunk]))
+                last_pk = chunk[-1][0]
+                # The files are removed once the records are, so no record is left without its file
+                for future in [executor.submit(storage.delete, name) for pk, name in chunk]:
+                    future.result()
+                progress_bar.increase_by(len(chunk))
+                if time.monotonic() > deadline:
+                    return _continue_orphan_cleanup(progress_bar)
+
+
+def _snapshot(started_at):
+    """
+    The time before which orphans can be removed.
+
+    Running tasks only touch or create Content and Artifacts after they started, so anything with
+    an older ``timestamp_of_interest`` is not about to be associated by them. Tasks starting later
+    touch the orphans they find, waiting for the chunk being deleted if need be, see
+    :func:`pulpcore.app.models.content.touch`.
+
+    Args:
+        started_at (datetime.datetime): The time the cleanup started.
+
+    Returns:
+        datetime.datetime: The start of the cleanup or of the earliest running task, whichever is
+            older.
+    """
+    running = Task.objects.filter(state=TASK_STATES.RUNNING)
+    earliest = running.aggregate(earliest=Min('started_at'))['earliest']
+    if earliest is None:
+        return started_at
+    return min(started_at, earliest)
+
+
+def _select_chunk(queryset, last_pk, *fields):
+    """
+    Select and lock the next ``CHUNK_SIZE`` records of a queryset, in primary key order.
+
+    The queryset is never evaluated as a whole. Records locked by another transaction are skipped.
+    This must be called within a transaction, which holds the locks.
+
+    Args:
+        queryset (django.db.models.query.QuerySet): The records to select from.
+        last_pk (int): The primary key of the last record of the previous chunk, or 0.
+        fields (str): Names of fields to select as well, in which case each primary key is
+            returned in a tuple with the values of these fields.
+
+    Returns:
+        list: The primary keys, or tuples, of up to ``CHUNK_SIZE`` records.
+    """
+    records = queryset.filter(pk__gt=last_pk).order_by('pk').select_for_update(skip_locked=True)
+    return list(records.values_list('pk', *fields, flat=not fields)[:CHUNK_SIZE])
+
+
+def _continue_orphan_cleanup(progress_bar):
+    """
+    Dispatch a new orphan cleanup task which continues the current one.
+
+    The progress bar of the unfinished step is marked as canceled, so it is not saved as completed
+    when its context manager exits. The new task reports the remaining progress.
+
+    Args:
+        progress_bar (pulpcore.app.models.ProgressBar): The progress bar of the unfinished step.
+    """
+    from pulpcore.tasking.tasks import enqueue_with_reservation
+
+    _logger.info(_('Orphan cleanup continues in a new task.'))
+    progress_bar.state = TASK_STATES.CANCELED
+    progress_bar.message = _('{message} (continued in a new task)').format(
+        message=progress_bar.message)
+    enqueue_with_reservation(orphan_cleanup, [ORPHAN_CLEANUP_RESOURCE])
+
+
+def _delete(queryset):
+    """
+    Delete the records of a queryset and the records depending on them.
+
+    The records are deleted with one statement per related model, following the cascades in the
+    database without loading any record. When any model involved has delete signal receivers or a
+    relation which needs Django's collector, the collector is used instead.
+
+    Args:
+        queryset (django.db.models.query.QuerySet): The records to delete.
+    """
+    if _can_raw_delete(queryset.model):
+        _raw_delete(queryset)
+    else:
+        queryset.delete()
+
+
+def _can_raw_delete(model, path=()):
+    """
+    Whether records of the model can be deleted by :func:`_raw_delete`.
+
+    Args:
+        model (django.db.models.Model): The model to delete records of.
+        path (tuple): The models whose records depend on the ones of the model.
+
+    Returns:
+        bool: True if no model involved has delete signal receivers and all relations to delete
+            along are plain cascades, or are protecting or set to null on delete.
+    """
+    if model in path or pre_delete.has_listeners(model) or post_delete.has_listeners(model):
+        return False
+    path = path + (model,)
+    for relation in get_candidate_relations_to_delete(model._meta):
+        if relation.on_delete == models.CASCADE:
+            if not _can_raw_delete(relation.related_model, path):
+                return False
+        elif relation.on_delete not in (models.DO_NOTHING, models.PROTECT, models.SET_NULL):
+            return False
+    for field in model._meta.private_fields:
+        if isinstance(field, GenericRelation) and not _can_raw_delete(field.related_model, path):
+            return False
+    return True
+
+
+def _raw_delete(queryset):
+    """
+    Delete the records of a queryset and the records depending on them, without loading any.
+
+    Args:
+        queryset (django.db.models.query.QuerySet): The records to delete.
+
+    Raises:
+        django.db.models.ProtectedError: If a record is referenced through a protected relation.
+    """
+    model = queryset.model
+    pks = queryset.values('pk')
+    for relation in get_candidate_relations_to_delete(model._meta):
+        related = relation.related_model._base_manager.filter(
+            **{'{field}__in'.format(field=relation.field.name): pks})
+        if relation.on_delete == models.CASCADE:
+            _raw_delete(related)
+        elif relation.on_delete == models.SET_NULL:
+            related.update(**{relation.field.name: None})
+        elif relation.on_delete == models.PROTECT:
+            protected = list(related[:1])
+            if protected:
+                msg = _("Cannot delete some instances of model '{model}' because they are "
+                        "referenced through a protected foreign key: '{related}.{field}'")
+                raise models.ProtectedError(msg.format(
+                    model=model.__name__, related=relation.related_model.__name__,
+                    field=relation.field.name), protected)
+    for field in model._meta.private_fields:
+        if isinstance(field, GenericRelation):
+            content_type = ContentType.objects.get_for_model(
+                model, for_concrete_model=field.for_concrete_model)
+            _raw_delete(field.related_model._base_manager.filter(**{
+                field.content_type_field_name: content_type,
+                '{field}__in'.format(field=field.object_id_field_name): pks,
+            }))
+    queryset._raw_delete(queryset.db)
@@ -80,6 +80,10 @@ def add_and_remove(repository_pk, add_content_units, remove_content_units, base_
             should be removed from the previous Repository Version for this Repository.
         base_version_pk (int): the primary key for a RepositoryVersion whose content will be used
             as the initial set of content for our new RepositoryVersion
+
+    Raises:
+        ValueError: if some of the content to add does not exist, e.g. because orphan cleanup
+            removed it.
     """
     repository = models.Repository.objects.get(pk=repository_pk)
 
@@ -88,6 +92,13 @@ def add_and_remove(repository_pk, add_content_units, remove_content_units, base_
     else:
         base_version = None
 
+    # The content is likely to be orphan, so it is touched before orphan cleanup can remove it
+    add_content = models.Content.objects.filter(pk__in=add_content_units)
+    if models.touch(add_content) < len(set(add_content_units)):
+        missing = set(add_content_units) - set(add_content.values_list('pk', flat=True))
+        raise ValueError(_('The content {pks} to add does not exist.').format(
+            pks=', '.join(str(pk) for pk in sorted(missing))))
+
     with models.RepositoryVersion.create(repository, base_version=base_version) as new_version:
-        new_version.add_content(models.Content.objects.filter(pk__in=add_content_units))
+        new_version.add_content(add_content)
         new_version.remove_content(models.Content.objects.filter(pk__in=remove_content_units))
@@ -0,0 +1,45 @@
+from gettext import gettext as _
+from logging import getLogger
+
+from pulpcore.app import models
+
+log = getLogger(__name__)
+
+
+def commit(upload_pk, sha256=None):
+    """
+    Create the Artifact of a complete :class:`~pulpcore.app.models.Upload`, and delete the Upload.
+
+    The digests are computed in one pass over the assembled file, which is then moved into Artifact
+    storage. If an Artifact with the same sha256 is already stored, it is used instead.
+
+    Args:
+        upload_pk (int): The primary key of the Upload.
+        sha256 (str): The expected sha256 digest of the file, if any.
+
+    Raises:
+        ValueError: if some ranges of the file were not uploaded.
+        :class:`~pulpcore.exceptions.DigestValidationError`: When the sha256 digest of the file
+            does not match the expected one.
+    """
+    upload = models.Upload.objects.get(pk=upload_pk)
+    missing = upload.missing_ranges()
+    if missing:
+        raise ValueError(_('Upload is missing the chunks at offsets {offsets}.').format(
+            offsets=', '.join(str(offset) for offset, size in missing)))
+
+    expected_digests = {'sha256': sha256} if sha256 else None
+    artifact = models.Artifact.init_and_validate(upload.file.path,
+                                                 expected_digests=expected_digests,
+                                                 expected_size=upload.size)
+    stored = models.Artifact.objects.filter(sha256=artifact.sha256)
+    # Touching the stored Artifact keeps orphan cleanup from removing it before it is used
+    if models.touch(stored):
+        artifact = stored.get()
+        log.info(_('Artifact %(sha256)s was already stored.'), {'sha256': artifact.sha256})
+    else:
+        artifact.save()
+
+    resource = models.CreatedResource(content_object=artifact)
+    resource.save()
+    upload.delete()
@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 
 from pulpcore.app.response import OperationPostponedResponse
 from pulpcore.app.tasks import orphan_cleanup
+from pulpcore.app.tasks.orphan import ORPHAN_CLEANUP_RESOURCE
 from pulpcore.tasking.tasks import enqueue_with_reservation
 
 
@@ -10,7 +11,9 @@ class OrphansView(APIView):
     def delete(self, request, format=None):
         """
         Cleans up all the Content and Artifact orphans in the system
+
+        The cleanup runs alongside other tasks, but only one cleanup runs at a time.
         """
-        async_result = enqueue_with_reservation(orphan_cleanup, [])
+        async_result = enqueue_with_reservation(orphan_cleanup, [ORPHAN_CLEANUP_RESOURCE])
 
         return OperationPostponedResponse(async_result, request)
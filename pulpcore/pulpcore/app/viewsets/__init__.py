@@ -16,4 +16,5 @@ from .repository import (  # noqa
     RepositoryVersionViewSet
 )
 from .task import TaskViewSet, WorkerViewSet  # noqa
+from .upload import UploadViewSet  # noqa
 from .user import UserViewSet  # noqa
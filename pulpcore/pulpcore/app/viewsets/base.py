@@ -1,15 +1,17 @@
+from collections import defaultdict
 import warnings
 
 from gettext import gettext as _
 from urllib.parse import urlparse
 
 from pulpcore.app import tasks
+from pulpcore.app.apps import pulp_plugin_configs
 from pulpcore.app.models import MasterModel
 from pulpcore.app.response import OperationPostponedResponse
 from pulpcore.app.serializers import AsyncOperationResponseSerializer
 from pulpcore.tasking.tasks import enqueue_with_reservation
 
-from django.urls import resolve, Resolver404
+from django.urls import NoReverseMatch, resolve, reverse, Resolver404
 from django.core.exceptions import FieldError, ValidationError
 from django_filters.rest_framework import filterset
 
@@ -30,6 +32,10 @@ DATETIME_FILTER_OPTIONS = ['lt', 'lte', 'gt', 'gte', 'range']
 # /?created__gte=2018-04-12T19:45:52
 # /?created__range=2018-04-12T19:45:52,2018-04-13T19:45:52
 
+# The models of the non-nested viewsets, by the path their hrefs start with, e.g.
+# {'/pulp/api/v3/content/file/': FileContent}. Filled on first use, once the urls are loaded.
+_resource_paths = {}
+
 
 class DefaultSchema(AutoSchema):
     """
@@ -157,6 +163,88 @@ class NamedModelViewSet(viewsets.GenericViewSet):
             raise DRFValidationError(detail=_('URI {u} is not a valid {m}.').format(
                 u=uri, m=model._meta.model_name))
 
+    @staticmethod
+    def split_resource_uri(uri):
+        """
+        Split the URI of a resource of a non-nested viewset into its model and primary key.
+
+        Rather than resolving the URI with Django's url resolver, the path of the viewset is looked
+        up in a table built once from the registered viewsets.
+
+        Args:
+            uri (str): A resource URI.
+
+        Returns:
+            tuple: The model of the viewset and the primary key in the URI, or (None, None) when
+                the URI is not one of a resource of a non-nested viewset.
+        """
+        if not _resource_paths:
+            for app_config in pulp_plugin_configs():
+                for model, viewset in app_config.named_viewsets.items():
+                    if viewset.parent_lookup_kwargs or viewset.lookup_field != 'pk':
+                        continue
+                    try:
+                        path = reverse(viewset.view_name() + '-detail', kwargs={'pk': 0})
+                    except NoReverseMatch:
+                        # Master viewsets are not registered
+                        continue
+                    _resource_paths[path[:-len('0/')]] = model
+
+        path = urlparse(uri).path
+        if not path.endswith('/'):
+            return None, None
+        path, sep, pk = path[:-1].rpartition('/')
+        return _resource_paths.get(path + sep), pk
+
+    @staticmethod
+    def get_resources(uris, model):
+        """
+        Resolve many resource URIs to instances of the resources.
+
+        Unlike :meth:`get_resource`, the URIs are split with :meth:`split_resource_uri` and the
+        resources are fetched with one query per model. URIs of nested resources fall back to
+        :meth:`get_resource`.
+
+        Args:
+            uris (iterable): Resource URIs.
+            model (django.models.Model): A model class, which the resources must be instances of.
+
+        Returns:
+            list: The resources fetched from the DB, in the order of `uris`.
+
+        Raises:
+            rest_framework.exceptions.ValidationError: on invalid URI or resource not found.
+        """
+        uris = list(uris)
+        keys = []
+        pks = defaultdict(set)
+        resources = {}
+        for uri in uris:
+            uri_model, pk = NamedModelViewSet.split_resource_uri(uri)
+            if uri_model is None or not issubclass(uri_model, model):
+                resources[uri] = NamedModelViewSet.get_resource(uri, model)
+                keys.append(uri)
+                continue
+            try:
+                pk = uri_model._meta.pk.to_python(pk)
+            except ValidationError:
+                raise DRFValidationError(detail=_('ID invalid: {u}').format(u=pk))
+            pks[uri_model].add(pk)
+            keys.append((uri_model, pk))
+
+        for uri_model, model_pks in pks.items():
+            resources.update(((uri_model, pk), resource)
+                             for pk, resource in uri_model.objects.in_bulk(model_pks).items())
+
+        found = []
+        for uri, key in zip(uris, keys):
+            try:
+                found.append(resources[key])
+            except KeyError:
+                raise DRFValidationError(detail=_('URI {u} not found for {m}.').format(
+                    u=uri, m=model._meta.model_name))
+        return found
+
     @classmethod
     def is_master_viewset(cls):
         # ViewSet isn't related to a model, so it can't represent a master model
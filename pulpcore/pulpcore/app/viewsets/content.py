@@ -1,15 +1,38 @@
 from gettext import gettext as _
+from itertools import chain
+import os
 
-from django.db import models, transaction
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.db import IntegrityError, models, transaction
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, mixins
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.serializers import ValidationError
+from rest_framework.settings import api_settings
 
-from pulpcore.app.models import Artifact, Content, ContentGuard, ContentArtifact
-from pulpcore.app.serializers import ArtifactSerializer, ContentSerializer, ContentGuardSerializer
+from pulpcore.app.models import Artifact, Content, ContentArtifact, ContentGuard, Notes, touch
+from pulpcore.app.pagination import IDCursorPagination
+from pulpcore.app.parsers import TarParser
+from pulpcore.app.serializers import (
+    ArtifactExistsResponseSerializer,
+    ArtifactExistsSerializer,
+    ArtifactSerializer,
+    ContentGuardSerializer,
+    ContentSerializer
+)
+from pulpcore.app.serializers.fields import ContentArtifactsField
 from pulpcore.app.viewsets import BaseFilterSet, NamedModelViewSet
 
 
+# The number of natural keys looked up per query when creating content in bulk
+NATURAL_KEY_CHUNK_SIZE = 1000
+
+
 class ArtifactFilter(BaseFilterSet):
     """
     Artifact filter Plugin content filters should:
@@ -33,8 +56,123 @@ class ArtifactViewSet(NamedModelViewSet,
     queryset = Artifact.objects.all()
     serializer_class = ArtifactSerializer
     filterset_class = ArtifactFilter
+    pagination_class = IDCursorPagination
     parser_classes = (MultiPartParser, FormParser)
 
+    @swagger_auto_schema(operation_description="Upload many files at once, as multipart `file` "
+                                               "fields or as a tar archive, and create an "
+                                               "Artifact for each file not stored yet.",
+                         responses={201: ArtifactSerializer(many=True)})
+    @list_route(methods=('post',), parser_classes=(MultiPartParser, FormParser, TarParser))
+    def bulk(self, request):
+        """
+        Create the Artifacts of many uploaded files.
+
+        The files were hashed while they were received. The Artifacts already stored are looked up
+        with a single query on their sha256, and touched so orphan cleanup does not remove them. The
+        others are created with a single insert. The Artifacts of all the files are returned, in the
+        order of the files.
+
+        When another request creates some of the Artifacts in between, the insert fails, and the
+        Artifacts are looked up and inserted again.
+        """
+        files = request.FILES.getlist('file')
+        try:
+            if not files:
+                raise ValidationError({'file': _('No file was submitted.')})
+
+            artifacts = {}
+            for file in files:
+                artifact = Artifact.init_and_validate(file)
+                artifacts.setdefault(artifact.sha256, artifact)
+            existing = self._create_artifacts(artifacts)
+
+            artifacts = [existing[file.hashers['sha256'].hexdigest()] for file in files]
+            serializer = self.get_serializer(artifacts, many=True)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        finally:
+            for file in files:
+                file.close()
+
+    @staticmethod
+    def _create_artifacts(artifacts):
+        """
+        Create the Artifacts which are not stored yet with a single insert, and touch the others.
+
+        Args:
+            artifacts (dict): The unsaved Artifacts, by sha256.
+
+        Returns:
+            dict: The saved Artifacts, by sha256.
+
+        Raises:
+            django.db.IntegrityError: If the insert fails for another reason than Artifacts created
+                meanwhile.
+        """
+        stored_files = []
+        try:
+            while True:
+                existing = Artifact.objects.in_bulk(list(artifacts), field_name='sha256')
+                found = [artifact.pk for artifact in existing.values()]
+                if touch(Artifact.objects.filter(pk__in=found)) < len(found):
+                    # Orphan cleanup removed some of them meanwhile, so they are created instead
+                    continue
+                new_artifacts = [artifact for sha256, artifact in artifacts.items()
+                                 if sha256 not in existing]
+                try:
+                    with transaction.atomic():
+                        Artifact.objects.bulk_create(new_artifacts)
+                except IntegrityError:
+                    for artifact in new_artifacts:
+                        artifact.file.close()
+                    created = set(Artifact.objects.filter(
+                        sha256__in=[artifact.sha256 for artifact in new_artifacts]
+                    ).values_list('sha256', flat=True))
+                    if not created:
+                        raise
+                    # The files were moved into storage before the insert failed. Storage keeps a
+                    # file already in place, so the other Artifacts are inserted again with them.
+                    for artifact in new_artifacts:
+                        if artifact.sha256 not in created:
+                            stored_files.append(open(artifact.file.name, 'rb'))
+                            artifact.file = File(stored_files[-1],
+                                                 name=os.path.basename(artifact.file.name))
+                    continue
+                for artifact in new_artifacts:
+                    artifact.file.close()
+                existing.update((artifact.sha256, artifact) for artifact in new_artifacts)
+                return existing
+        finally:
+            for file in stored_files:
+                file.close()
+
+    @swagger_auto_schema(operation_description="Check which of many files are already stored as "
+                                               "Artifacts, given their sha256 and size, before "
+                                               "uploading them.",
+                         request_body=ArtifactExistsSerializer,
+                         responses={200: ArtifactExistsResponseSerializer})
+    @list_route(methods=('post',), parser_classes=(JSONParser,))
+    def exists(self, request):
+        """
+        Look up the Artifacts of many files with a single query on their sha256.
+
+        A file is only reported as stored if the size of the Artifact matches. The Artifacts found
+        are touched, so orphan cleanup does not remove them before they are used.
+        """
+        serializer = ArtifactExistsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sizes = {item['sha256']: item['size'] for item in serializer.validated_data['artifacts']}
+
+        found = Artifact.objects.filter(sha256__in=list(sizes)).values_list('pk', 'sha256', 'size')
+        existing = {sha256: pk for pk, sha256, size in found if sizes[sha256] == size}
+        touch(Artifact.objects.filter(pk__in=existing.values()))
+
+        return Response({
+            'existing': {sha256: reverse('artifacts-detail', args=[pk])
+                         for sha256, pk in existing.items()},
+            'missing': [sha256 for sha256 in sizes if sha256 not in existing],
+        })
+
     def destroy(self, request, pk):
         """
         Remove Artifact only if it is not associated with any Content.
@@ -69,6 +207,7 @@ class ContentViewSet(NamedModelViewSet,
     queryset = Content.objects.all()
     serializer_class = ContentSerializer
     filterset_class = ContentFilter
+    pagination_class = IDCursorPagination
 
     @transaction.atomic
     def create(self, request):
@@ -78,6 +217,7 @@ class ContentViewSet(NamedModelViewSet,
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         artifacts = serializer.validated_data.pop('artifacts')
+        self._touch_artifacts(artifacts.values())
         content = serializer.save()
 
         for relative_path, artifact in artifacts.items():
@@ -87,6 +227,134 @@ class ContentViewSet(NamedModelViewSet,
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    @staticmethod
+    def _touch_artifacts(artifacts):
+        """
+        Touch the Artifacts about to be associated, so orphan cleanup does not remove them.
+
+        Args:
+            artifacts (iterable): The Artifacts.
+
+        Raises:
+            :class:`rest_framework.exceptions.ValidationError`: When some of the Artifacts were
+                removed meanwhile.
+        """
+        pks = {artifact.pk for artifact in artifacts}
+        if touch(Artifact.objects.filter(pk__in=pks)) < len(pks):
+            raise ValidationError({'artifacts': _('Some of the Artifacts no longer exist.')})
+
+    @swagger_auto_schema(operation_description="Create many content units with one request. "
+                                               "The units are either all created, or none of "
+                                               "them is and the errors of each unit are returned "
+                                               "in the order of the units.")
+    @list_route(methods=('post',))
+    def bulk(self, request):
+        """
+        Create many Content units, with their ContentArtifacts and notes, in one transaction.
+
+        The Artifacts of all the units are looked up and touched with a single query each, and the
+        units already stored with the natural key of one of the units are looked up with one query
+        per ``NATURAL_KEY_CHUNK_SIZE`` units. The rows of each table are inserted with one statement
+        for all the units.
+
+        The units are created without calling the ``create()`` of the viewset and the serializer,
+        nor the ``save()`` of the model, so content types overriding any of them are refused.
+        """
+        serializer_class = self.get_serializer_class()
+        model = serializer_class.Meta.model
+        if (type(self).create is not ContentViewSet.create or
+                serializer_class.create is not ContentSerializer.create or
+                model.save is not Content.save):
+            raise MethodNotAllowed(request.method, detail=_(
+                'Content of type {type} cannot be created in bulk.').format(type=model.TYPE))
+        if not isinstance(request.data, list) or not request.data:
+            raise ValidationError(_('A non-empty list of content units is expected.'))
+        urls = []
+        for unit in request.data:
+            if isinstance(unit, dict) and isinstance(unit.get('artifacts'), dict):
+                urls.extend(url for url in unit['artifacts'].values() if isinstance(url, str))
+
+        context = self.get_serializer_context()
+        context['artifacts'] = ContentArtifactsField.resolve_artifacts(urls)
+        context['bulk'] = True
+        serializer = serializer_class(data=request.data, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+
+        units = []
+        artifacts = []
+        notes = []
+        for data in serializer.validated_data:
+            data = dict(data)
+            artifacts.append(data.pop('artifacts'))
+            notes.append(data.pop('notes', {}))
+            units.append(model(**data))
+
+        errors = self._natural_key_errors(model, units)
+        if any(errors):
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            self._touch_artifacts(chain.from_iterable(
+                unit_artifacts.values() for unit_artifacts in artifacts))
+            model.bulk_create_details(units)
+            ContentArtifact.objects.bulk_create(
+                ContentArtifact(artifact=artifact, content=unit, relative_path=relative_path)
+                for unit, unit_artifacts in zip(units, artifacts)
+                for relative_path, artifact in unit_artifacts.items()
+            )
+            content_type = ContentType.objects.get_for_model(model)
+            Notes.objects.bulk_create(
+                Notes(content_type=content_type, object_id=unit.pk, key=key, value=value)
+                for unit, unit_notes in zip(units, notes)
+                for key, value in unit_notes.items()
+            )
+
+        return Response(self.get_serializer(units, many=True).data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _natural_key_errors(model, units):
+        """
+        Find the units which are duplicates of another unit, or of a unit already stored.
+
+        The units already stored are looked up with one query per ``NATURAL_KEY_CHUNK_SIZE``
+        distinct natural keys, so no statement grows with the number of units.
+
+        Args:
+            model (pulpcore.app.models.Content): The Content model of the units.
+            units (list): Unsaved instances of the model.
+
+        Returns:
+            list: The errors of each unit, in the order of the units, empty for a valid unit.
+        """
+        fields = [model._meta.get_field(name).attname for name in model.natural_key_fields()]
+        if not fields:
+            return [{} for unit in units]
+        natural_keys = [tuple(getattr(unit, field) for field in fields) for unit in units]
+
+        distinct = list(set(natural_keys))
+        stored = set()
+        for start in range(0, len(distinct), NATURAL_KEY_CHUNK_SIZE):
+            stored_q = models.Q(pk=None)
+            for natural_key in distinct[start:start + NATURAL_KEY_CHUNK_SIZE]:
+                stored_q |= models.Q(**dict(zip(fields, natural_key)))
+            stored.update(model.objects.filter(stored_q).values_list(*fields))
+
+        first_index = {}
+        errors = []
+        for index, natural_key in enumerate(natural_keys):
+            if natural_key in stored:
+                errors.append({api_settings.NON_FIELD_ERRORS_KEY: [
+                    _('A content unit with the same {fields} is already stored.').format(
+                        fields=', '.join(model.natural_key_fields()))]})
+            elif natural_key in first_index:
+                errors.append({api_settings.NON_FIELD_ERRORS_KEY: [
+                    _('The content unit is a duplicate of the unit at index {index}.').format(
+                        index=first_index[natural_key])]})
+            else:
+                first_index[natural_key] = index
+                errors.append({})
+        return errors
+
 
 class ContentGuardViewSet(NamedModelViewSet,
                           mixins.CreateModelMixin,
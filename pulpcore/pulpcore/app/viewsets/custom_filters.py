@@ -9,6 +9,8 @@ from django_filters.fields import IsoDateTimeField
 
 from rest_framework import serializers
 
+from pulpcore.app.viewsets.base import NamedModelViewSet
+
 
 class HyperlinkRelatedFilter(Filter):
     """
@@ -36,12 +38,14 @@ class HyperlinkRelatedFilter(Filter):
         if not value:
             raise serializers.ValidationError(
                 detail=_('No value supplied for {name} filter.').format(name=self.field_name))
-        try:
-            match = resolve(urlparse(value).path)
-        except Resolver404:
-            raise serializers.ValidationError(detail=_('URI not valid: {u}').format(u=value))
+        model, pk = NamedModelViewSet.split_resource_uri(value)
+        if model is None:
+            try:
+                match = resolve(urlparse(value).path)
+            except Resolver404:
+                raise serializers.ValidationError(detail=_('URI not valid: {u}').format(u=value))
 
-        pk = match.kwargs['pk']
+            pk = match.kwargs['pk']
 
         key = "{}__pk".format(self.field_name)
         return qs.filter(**{key: pk})
@@ -1,12 +1,16 @@
 from gettext import gettext as _
-import itertools
 
+from django.db.models import Exists, OuterRef, Q
 from django_filters.rest_framework import filters, DjangoFilterBackend
 from django_filters import Filter
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
 from rest_framework import decorators, mixins, serializers
 from rest_framework.filters import OrderingFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from pulpcore.app import tasks
 from pulpcore.app.models import (
@@ -20,8 +24,9 @@ from pulpcore.app.models import (
     RepositoryContent,
     RepositoryVersion
 )
-from pulpcore.app.pagination import IDPagination, NamePagination
-from pulpcore.app.response import OperationPostponedResponse
+from pulpcore.app.pagination import IDCursorPagination, NamePagination
+from pulpcore.app.renderers import NDJSONRenderer
+from pulpcore.app.response import ContentStreamResponse, OperationPostponedResponse
 from pulpcore.app.serializers import (
     AsyncOperationResponseSerializer,
     ContentSerializer,
@@ -45,6 +50,15 @@ from pulpcore.app.viewsets.base import NAME_FILTER_OPTIONS, DATETIME_FILTER_OPTI
 from pulpcore.tasking.tasks import enqueue_with_reservation
 
 
+# The content routes of repository versions also stream all their content as NDJSON when asked to
+CONTENT_RENDERER_CLASSES = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (NDJSONRenderer,)
+
+BASE_VERSION_PARAMETER = openapi.Parameter(
+    'base_version', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+    description=_('The href of the Repository Version to compare with, of any repository.')
+)
+
+
 class RepositoryFilter(BaseFilterSet):
     name = filters.CharFilter()
 
@@ -102,11 +116,13 @@ class RepositoryVersionContentFilter(Filter):
     """
     Filter used to get the repository versions where some given content can be found.
 
-    Given a content_href, this filter will:
-        1. Get the RepositoryContent that the content can be found in
-        2. Get a list of version_added and version_removed where the content was
-           changed on the repository
-        3. Calculate and return the versions that the content can be found on
+    A version contains a content unit if the unit was added to its repository by that version or
+    an earlier one, and was not removed by that version or an earlier one since. Given a
+    content_href, this filter looks for such a RepositoryContent with a single EXISTS subquery,
+    instead of computing the numbers of the versions containing the content.
+
+    With the `in` lookup, the versions containing any of the comma-separated content hrefs are
+    returned.
     """
 
     def __init__(self, *args, **kwargs):
@@ -117,7 +133,8 @@ class RepositoryVersionContentFilter(Filter):
         """
         Args:
             qs (django.db.models.query.QuerySet): The RepositoryVersion Queryset
-            value (string): of content href to filter
+            value (string): of content href to filter, or of comma-separated hrefs with the `in`
+                lookup
 
         Returns:
             Queryset of the RepositoryVersions containing the specified content
@@ -130,43 +147,20 @@ class RepositoryVersionContentFilter(Filter):
         if not value:
             raise serializers.ValidationError(detail=_('No value supplied for content filter'))
 
-        # Get the content object from the content_href
-        content = NamedModelViewSet.get_resource(value, Content)
-
-        # Get the repository from the parent request.
-        repository_pk = self.parent.request.parser_context['kwargs']['repository_pk']
-        repository = Repository.objects.get(pk=repository_pk)
-
-        repository_content_set = RepositoryContent.objects.filter(content=content,
-                                                                  repository=repository)
-
-        # Get the sorted list of version_added and version_removed.
-        version_added = list(repository_content_set.values_list('version_added__number', flat=True))
-
-        # None values have to be filtered out from version_removed,
-        # in order for zip_longest to pass it a default fillvalue
-        version_removed = list(filter(None.__ne__, repository_content_set
-                                      .values_list('version_removed__number', flat=True)))
-
-        # The range finding should work as long as both lists are sorted
-        # Why it works: https://gist.github.com/werwty/6867f83ae5adbae71e452c28ecd9c444
-        version_added.sort()
-        version_removed.sort()
-
-        # Match every version_added to a version_removed, if len(version_removed)
-        # is shorter than len(version_added), pad out the remaining space with the current
-        # repository version +1 (the +1 is to the current version gets included when we
-        # calculate range)
-        version_tuples = itertools.zip_longest(version_added, version_removed,
-                                               fillvalue=repository.last_version + 1)
-
-        # Get the ranges between paired version_added and version_removed to get all
-        # the versions the content is present in.
-        versions = [list(range(added, removed)) for (added, removed) in version_tuples]
-        # Flatten the list of lists
-        versions = list(itertools.chain.from_iterable(versions))
-
-        return qs.filter(number__in=versions)
+        if self.lookup_expr == 'in':
+            hrefs = [href for href in value.split(',') if href]
+        else:
+            hrefs = [value]
+        content_pks = [content.pk for content in NamedModelViewSet.get_resources(hrefs, Content)]
+
+        memberships = RepositoryContent.objects.filter(
+            repository=OuterRef('repository'),
+            content__in=content_pks,
+            version_added__number__lte=OuterRef('number')
+        ).filter(
+            Q(version_removed__isnull=True) | Q(version_removed__number__gt=OuterRef('number'))
+        )
+        return qs.annotate(has_content=Exists(memberships)).filter(has_content=True)
 
 
 class RepositoryVersionFilter(BaseFilterSet):
@@ -176,9 +170,11 @@ class RepositoryVersionFilter(BaseFilterSet):
     # /?created__gte=2018-04-12T19:45
     # /?created__range=2018-04-12T19:45,2018-04-13T20:00
     # /?content=http://localhost:8000/pulp/api/v3/content/file/fb8ad2d0-03a8-4e36-a209-77763d4ed16c/
+    # /?content__in=/pulp/api/v3/content/file/1/,/pulp/api/v3/content/file/2/
     number = filters.NumberFilter()
     created = IsoDateTimeFilter()
     content = RepositoryVersionContentFilter()
+    content__in = RepositoryVersionContentFilter(field_name='content', lookup_expr='in')
 
     class Meta:
         model = RepositoryVersion
@@ -211,36 +207,91 @@ class RepositoryVersionViewSet(NamedModelViewSet,
         operation_description="List Content",
         responses={'200': ContentSerializer}
     )
-    @decorators.detail_route()
+    @decorators.detail_route(renderer_classes=CONTENT_RENDERER_CLASSES)
     def content(self, request, repository_pk, number):
         return self._paginated_response(self.get_object().content, request)
 
+    @swagger_auto_schema(
+        operation_description="Stream all Content as newline-delimited JSON, one unit per line.",
+        responses={200: 'An application/x-ndjson stream of Content.'}
+    )
+    @decorators.detail_route(renderer_classes=(NDJSONRenderer, JSONRenderer))
+    def stream_content(self, request, repository_pk, number):
+        """
+        Stream the content of the Repository Version, see
+        :class:`~pulpcore.app.response.ContentStreamResponse`.
+        """
+        return ContentStreamResponse(self.get_object().content)
+
     @swagger_auto_schema(
         operation_description="List added Content",
+        manual_parameters=[BASE_VERSION_PARAMETER],
         responses={'200': ContentSerializer}
     )
-    @decorators.detail_route()
+    @decorators.detail_route(renderer_classes=CONTENT_RENDERER_CLASSES)
     def added_content(self, request, repository_pk, number):
         """
-        Display content added since the previous Repository Version.
+        Display content added since the previous Repository Version, or since the
+        `base_version`.
         """
-        return self._paginated_response(self.get_object().added(), request)
+        base_version = self._base_version(request)
+        return self._paginated_response(self.get_object().added(base_version), request)
 
     @swagger_auto_schema(
         operation_description="List removed Content",
+        manual_parameters=[BASE_VERSION_PARAMETER],
         responses={'200': ContentSerializer}
     )
-    @decorators.detail_route()
+    @decorators.detail_route(renderer_classes=CONTENT_RENDERER_CLASSES)
     def removed_content(self, request, repository_pk, number):
         """
-        Display content removed since the previous Repository Version.
+        Display content removed since the previous Repository Version, or since the
+        `base_version`.
+        """
+        base_version = self._base_version(request)
+        return self._paginated_response(self.get_object().removed(base_version), request)
+
+    @swagger_auto_schema(
+        operation_description="Count the Content added and removed since another Repository "
+                              "Version, by type.",
+        manual_parameters=[BASE_VERSION_PARAMETER],
+        responses={200: 'The counts of added and removed Content by type.'}
+    )
+    @decorators.detail_route()
+    def diff(self, request, repository_pk, number):
+        """
+        Summarize the difference with the `base_version`, which can be of any repository, e.g.::
+
+            {"added": {"file": 3}, "removed": {"file": 1}}
+
+        The units themselves are listed by the `added_content` and `removed_content` routes.
+        """
+        base_version = self._base_version(request)
+        if base_version is None:
+            raise serializers.ValidationError(
+                detail={'base_version': _('This query parameter is required.')})
+        return Response(self.get_object().diff(base_version))
+
+    def _base_version(self, request):
         """
-        return self._paginated_response(self.get_object().removed(), request)
+        Resolve the `base_version` query parameter of the request.
+
+        Returns:
+            pulpcore.app.models.RepositoryVersion: The version compared with, or None if the
+                request does not specify one.
+        """
+        href = request.query_params.get('base_version')
+        if href is None:
+            return None
+        return self.get_resource(href, RepositoryVersion)
 
     def _paginated_response(self, content, request):
         """
         a helper method to make a paginated response for content list views.
 
+        When newline-delimited JSON is requested, e.g. with `?format=ndjson`, all the content is
+        streamed instead, see :class:`~pulpcore.app.response.ContentStreamResponse`.
+
         Args:
             content (django.db.models.QuerySet): the Content to render
             request (rest_framework.request.Request): the current HTTP request being handled
@@ -248,7 +299,9 @@ class RepositoryVersionViewSet(NamedModelViewSet,
         Returns:
             rest_framework.response.Response: a paginated response for the corresponding content
         """
-        paginator = IDPagination()
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return ContentStreamResponse(content)
+        paginator = IDCursorPagination()
         page = paginator.paginate_queryset(content, request)
         serializer = ContentSerializer(page, many=True, context={'request': request})
         return paginator.get_paginated_response(serializer.data)
@@ -284,13 +337,11 @@ class RepositoryVersionViewSet(NamedModelViewSet,
             base_version_pk = None
 
         if 'add_content_units' in request.data:
-            for url in request.data['add_content_units']:
-                content = self.get_resource(url, Content)
+            for content in self.get_resources(request.data['add_content_units'], Content):
                 add_content_units.append(content.pk)
 
         if 'remove_content_units' in request.data:
-            for url in request.data['remove_content_units']:
-                content = self.get_resource(url, Content)
+            for content in self.get_resources(request.data['remove_content_units'], Content):
                 remove_content_units.append(content.pk)
 
         result = enqueue_with_reservation(
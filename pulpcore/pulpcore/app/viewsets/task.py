@@ -1,19 +1,46 @@
+from gettext import gettext as _
+from io import BytesIO
+import json
+from urllib.parse import urlparse
+import uuid
+
+from django.db import transaction
+from django.http import HttpRequest
+from django.urls import resolve, Resolver404
 from django_filters.rest_framework import filters, DjangoFilterBackend
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, mixins
-from rest_framework.decorators import detail_route
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.filters import OrderingFilter
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.serializers import ValidationError
 
 from pulpcore.constants import TASK_INCOMPLETE_STATES
 
 from pulpcore.app.models import Task, Worker
-from pulpcore.app.serializers import MinimalTaskSerializer, TaskSerializer, WorkerSerializer
+from pulpcore.app.pagination import CreatedCursorPagination
+from pulpcore.app.renderers import EventStreamRenderer
+from pulpcore.app.response import OperationPostponedResponse, TaskEventStreamResponse
+from pulpcore.app.serializers import (
+    BulkTaskDispatchResponseSerializer,
+    BulkTaskDispatchSerializer,
+    MinimalTaskSerializer,
+    TaskSerializer,
+    WorkerSerializer
+)
 from pulpcore.app.viewsets import BaseFilterSet, NamedModelViewSet
 from pulpcore.app.viewsets.base import NAME_FILTER_OPTIONS, DATETIME_FILTER_OPTIONS
 from pulpcore.app.viewsets.custom_filters import HyperlinkRelatedFilter, IsoDateTimeFilter
+from pulpcore.tasking.constants import TASKING_CONSTANTS
+from pulpcore.tasking.tasks import bulk_dispatch, enqueue_operation
 from pulpcore.tasking.util import cancel as cancel_task
 
 
+# The parts of the WSGI environment kept for operations performed later
+DEFERRED_OPERATION_META = ('HTTP_HOST', 'SERVER_NAME', 'SERVER_PORT', 'wsgi.url_scheme')
+
+
 class TaskFilter(BaseFilterSet):
     state = filters.CharFilter()
     worker = HyperlinkRelatedFilter()
@@ -42,7 +69,8 @@ class TaskViewSet(NamedModelViewSet,
     serializer_class = TaskSerializer
     minimal_serializer_class = MinimalTaskSerializer
     filter_backends = (OrderingFilter, DjangoFilterBackend)
-    ordering = ('-created')
+    ordering = ('-created',)
+    pagination_class = CreatedCursorPagination
 
     @detail_route(methods=('post',))
     def cancel(self, request, pk=None):
@@ -50,12 +78,204 @@ class TaskViewSet(NamedModelViewSet,
         cancel_task(task.pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @swagger_auto_schema(operation_description="Stream the state and progress changes of a task "
+                                               "as server-sent events, until it finishes.",
+                         responses={200: 'A text/event-stream of state and progress events.'})
+    @detail_route(methods=('get',), renderer_classes=(EventStreamRenderer, JSONRenderer))
+    def events(self, request, pk=None):
+        """
+        Stream the events of a task, see :class:`~pulpcore.app.response.TaskEventStreamResponse`.
+        """
+        task = self.get_object()
+        return TaskEventStreamResponse(Task.objects.filter(pk=task.pk))
+
+    @swagger_auto_schema(operation_description="Stream the state and progress changes of all "
+                                               "unfinished tasks matching the filters as "
+                                               "server-sent events, until they finish.",
+                         responses={200: 'A text/event-stream of state and progress events.',
+                                    400: 'Too many unfinished tasks match the filters.'})
+    @list_route(methods=('get',), url_path='events',
+                renderer_classes=(EventStreamRenderer, JSONRenderer))
+    def list_events(self, request):
+        """
+        Stream the events of many tasks, e.g. ``?worker=<href>``, see
+        :class:`~pulpcore.app.response.TaskEventStreamResponse`.
+
+        Only the tasks which are not finished yet are followed, and at most
+        ``TASKING_CONSTANTS.EVENTS_MAX_TASKS`` of them, so a stream never subscribes to the
+        channels of every task ever run.
+        """
+        tasks = self.filter_queryset(self.get_queryset()).filter(state__in=TASK_INCOMPLETE_STATES)
+        task_ids = list(tasks.values_list('pk', flat=True)[:TASKING_CONSTANTS.EVENTS_MAX_TASKS + 1])
+        if len(task_ids) > TASKING_CONSTANTS.EVENTS_MAX_TASKS:
+            raise ValidationError(_('More than {max} unfinished tasks match the filters, narrow '
+                                    'them down.').format(max=TASKING_CONSTANTS.EVENTS_MAX_TASKS))
+        return TaskEventStreamResponse(Task.objects.filter(pk__in=task_ids))
+
     def destroy(self, request, pk=None):
         task = self.get_object()
         if task.state in TASK_INCOMPLETE_STATES:
             return Response(status=status.HTTP_409_CONFLICT)
         return super().destroy(request, pk)
 
+    @swagger_auto_schema(operation_description="Perform many operations which dispatch tasks with "
+                                               "a single request.",
+                         request_body=BulkTaskDispatchSerializer,
+                         responses={202: BulkTaskDispatchResponseSerializer})
+    @list_route(methods=('post',))
+    def bulk(self, request):
+        """
+        Perform each operation as if it was requested on its own, and dispatch the tasks of all
+        operations at once.
+
+        An operation which depends on other operations or tasks is performed only once all of them
+        completed, e.g. a publish after a sync. Its task is dispatched right away, and is skipped
+        if any prerequisite does not complete.
+
+        The operations are performed in a single transaction. If any operation does not dispatch
+        a task, the transaction is rolled back, so none of the changes of the operations are kept
+        and no task is dispatched. The errors are returned in the order of the operations.
+        """
+        serializer = BulkTaskDispatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # The transaction is committed before the tasks are dispatched, when bulk_dispatch() exits
+        with bulk_dispatch(), transaction.atomic():
+            responses = []
+            for index, operation in enumerate(serializer.validated_data['operations']):
+                depends_on = operation.pop('depends_on')
+                if depends_on:
+                    response = self._enqueue_operation(request, depends_on, responses[:index],
+                                                       **operation)
+                else:
+                    response = perform_operation(user=request.user, auth=request.auth,
+                                                 meta=request.META, **operation)
+                responses.append(response)
+
+            if not all(_dispatched_task(response) for response in responses):
+                # raising rolls back the operations and discards the tasks collected so far
+                raise ValidationError({'operations': [
+                    {} if _dispatched_task(response) else
+                    {'status': response.status_code, 'response': getattr(response, 'data', None)}
+                    for response in responses
+                ]})
+
+        tasks = [response.data['task'] for response in responses]
+        return Response({'tasks': tasks}, status=status.HTTP_202_ACCEPTED)
+
+    @staticmethod
+    def _enqueue_operation(request, depends_on, previous_responses, path, method, body):
+        """
+        Enqueue an operation of a bulk dispatch to be performed once its prerequisites completed.
+
+        Args:
+            request (rest_framework.request.Request): The bulk dispatch request.
+            depends_on (list): Indexes of previous operations and task hrefs.
+            previous_responses (list): The responses of the previous operations.
+            path (str): The path of the operation.
+            method (str): The HTTP method of the operation.
+            body (dict): The body of the operation.
+
+        Returns:
+            rest_framework.response.Response: The response for the operation.
+        """
+        prerequisite_ids = []
+        task_hrefs = {}
+        errors = []
+        for prerequisite in depends_on:
+            if prerequisite.isdigit():
+                try:
+                    response = previous_responses[int(prerequisite)]
+                except IndexError:
+                    errors.append(_('{index} is not the index of a previous operation.').format(
+                        index=prerequisite))
+                    continue
+                # the failure of a previous operation is reported on its own
+                if _dispatched_task(response):
+                    prerequisite_ids.append(_task_id(response.data['task']))
+            else:
+                task_id = _task_id(prerequisite)
+                if task_id is None:
+                    errors.append(_('URI is not a valid task: {href}').format(href=prerequisite))
+                else:
+                    task_hrefs[task_id] = prerequisite
+
+        existing_ids = {str(pk) for pk in
+                        Task.objects.filter(pk__in=task_hrefs).values_list('pk', flat=True)}
+        errors.extend(_('URI not found: {href}').format(href=href)
+                      for task_id, href in task_hrefs.items() if task_id not in existing_ids)
+        if errors:
+            return Response({'depends_on': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        meta = {key: request.META[key] for key in DEFERRED_OPERATION_META if key in request.META}
+        prerequisite_ids.extend(task_hrefs)
+        job = enqueue_operation(path, method, body, request.user, meta, prerequisite_ids)
+        return OperationPostponedResponse(job, request)
+
+
+def perform_operation(path, method, body, user, auth=None, meta=None):
+    """
+    Call the view of an API operation in-process, as an already authenticated user.
+
+    Args:
+        path (str): The path of the operation.
+        method (str): The HTTP method of the operation.
+        body (dict): The body of the operation.
+        user (django.contrib.auth.models.User): The user performing the operation.
+        auth: The authentication token of the user, if any.
+        meta (dict): The request headers and WSGI environment to perform the operation with.
+
+    Returns:
+        rest_framework.response.Response: The response of the operation's view.
+    """
+    path = urlparse(path).path
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return Response({'path': [_('URI not found: {path}').format(path=path)]},
+                        status=status.HTTP_404_NOT_FOUND)
+
+    data = json.dumps(body).encode()
+    operation_request = HttpRequest()
+    operation_request.method = method.upper()
+    operation_request.path = operation_request.path_info = path
+    operation_request.META = dict(meta or {}, REQUEST_METHOD=method.upper(), PATH_INFO=path,
+                                  QUERY_STRING='', CONTENT_TYPE='application/json',
+                                  CONTENT_LENGTH=str(len(data)))
+    operation_request._stream = BytesIO(data)
+    # authenticated already, see rest_framework.request.ForcedAuthentication
+    operation_request._force_auth_user = user
+    operation_request._force_auth_token = auth
+
+    return match.func(operation_request, *match.args, **match.kwargs)
+
+
+def _dispatched_task(response):
+    """
+    Returns:
+        bool: True if the response is the one of an operation which dispatched a task.
+    """
+    data = getattr(response, 'data', None)
+    return response.status_code == status.HTTP_202_ACCEPTED and isinstance(data, dict) and \
+        'task' in data
+
+
+def _task_id(href):
+    """
+    Returns:
+        str: The UUID of the task an href points to, or None if it is not a task href.
+    """
+    try:
+        match = resolve(urlparse(href).path)
+    except Resolver404:
+        return None
+    if match.url_name != 'tasks-detail':
+        return None
+    try:
+        return str(uuid.UUID(match.kwargs['pk']))
+    except ValueError:
+        return None
+
 
 class WorkerFilter(BaseFilterSet):
     name = filters.CharFilter()
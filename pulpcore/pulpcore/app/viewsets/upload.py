@@ -0,0 +1,84 @@
+from gettext import gettext as _
+import re
+
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import mixins
+from rest_framework.decorators import detail_route
+from rest_framework.response import Response
+from rest_framework.serializers import ValidationError
+
+from pulpcore.app import tasks
+from pulpcore.app.models import Upload
+from pulpcore.app.response import OperationPostponedResponse
+from pulpcore.app.serializers import (
+    AsyncOperationResponseSerializer,
+    UploadCommitSerializer,
+    UploadSerializer
+)
+from pulpcore.app.viewsets import NamedModelViewSet
+from pulpcore.tasking.tasks import enqueue_with_reservation
+
+
+# e.g. "bytes 0-1048575/5242880", the total size can be unknown to the client: "bytes 0-1048575/*"
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class UploadViewSet(NamedModelViewSet,
+                    mixins.CreateModelMixin,
+                    mixins.RetrieveModelMixin,
+                    mixins.ListModelMixin,
+                    mixins.DestroyModelMixin):
+    """
+    Upload a large file in chunks, possibly in parallel, then commit it to create an Artifact.
+
+    An upload is created with the size of the file. Each chunk is then sent with a PUT, its range
+    given by the `Content-Range` header, in any order. A failed chunk is sent again on its own.
+    Once all chunks were received, the upload is committed.
+    """
+    endpoint_name = 'uploads'
+    queryset = Upload.objects.all()
+    serializer_class = UploadSerializer
+
+    @swagger_auto_schema(operation_description="Upload a chunk of the file, its range given by the "
+                                               "Content-Range header, e.g. 'bytes 0-1048575/*'.",
+                         request_body=None,
+                         responses={200: UploadSerializer})
+    def update(self, request, pk):
+        """
+        Write the chunk in the request body at its offset in the file.
+        """
+        upload = self.get_object()
+        match = CONTENT_RANGE_PATTERN.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        if match is None:
+            raise ValidationError(_("A Content-Range header like 'bytes 0-1048575/*' is required."))
+        start, end, total = match.groups()
+        if total != '*' and int(total) != upload.size:
+            raise ValidationError(_('The Content-Range total does not match the size of the '
+                                    'upload, {size} bytes.').format(size=upload.size))
+        try:
+            upload.write_chunk(int(start), int(end) - int(start) + 1, request.stream)
+        except ValueError as error:
+            raise ValidationError(str(error))
+        return Response(self.get_serializer(upload).data)
+
+    @swagger_auto_schema(operation_description="Trigger an asynchronous task to create an "
+                                               "Artifact from the complete upload.",
+                         request_body=UploadCommitSerializer,
+                         responses={202: AsyncOperationResponseSerializer})
+    @detail_route(methods=('post',))
+    def commit(self, request, pk):
+        """
+        Queues a task that creates an Artifact from the uploaded file, and deletes the upload.
+        """
+        upload = self.get_object()
+        serializer = UploadCommitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        missing = upload.missing_ranges()
+        if missing:
+            raise ValidationError(_('The chunks at offsets {offsets} were not uploaded.').format(
+                offsets=', '.join(str(offset) for offset, size in missing)))
+        async_result = enqueue_with_reservation(
+            tasks.upload.commit, [upload],
+            kwargs={'upload_pk': upload.pk, 'sha256': serializer.validated_data.get('sha256')}
+        )
+        return OperationPostponedResponse(async_result, request)
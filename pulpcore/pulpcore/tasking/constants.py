@@ -9,6 +9,24 @@ TASKING_CONSTANTS = SimpleNamespace(
     WORKER_TTL=30,
     # The amount of time (in seconds) between checks
     JOB_MONITORING_INTERVAL=5,
-    # The Redis key used to force-kill a job
-    KILL_KEY="rq:jobs:kill"
+    # The minimum amount of time (in seconds) between two heartbeats recorded in the database
+    HEARTBEAT_INTERVAL=10,
+    # The Redis key held by the worker which checks for missing workers on behalf of all workers
+    LIVENESS_CHECK_KEY="rq:workers:liveness-check",
+    # The amount of time (in seconds) between two checks for missing workers
+    LIVENESS_CHECK_INTERVAL=10,
+    # The Redis pub/sub channel on which a worker receives the ids of running jobs to kill
+    KILL_CHANNEL="rq:worker:{worker}:kill",
+    # The Redis key on which a worker acknowledges that a job it was asked to kill has stopped
+    KILL_ACK_KEY="rq:job:{job}:killed",
+    # The amount of time (in seconds) to wait for a killed job to stop
+    KILL_TIMEOUT=10,
+    # The Redis key of the set of tasks waiting for their prerequisites to be dispatched
+    DEFERRED_KEY="rq:jobs:deferred",
+    # The Redis pub/sub channel on which the state and progress changes of a task are published
+    EVENTS_CHANNEL="rq:task:{task}:events",
+    # The amount of time (in seconds) after which an idle event stream sends a keep-alive comment
+    EVENTS_KEEPALIVE=15,
+    # The maximum number of tasks whose events a single stream follows
+    EVENTS_MAX_TASKS=1000
 )
@@ -0,0 +1,93 @@
+"""
+Task events, published on Redis channels as tasks and their progress reports change.
+
+Each task has its own channel, see ``TASKING_CONSTANTS.EVENTS_CHANNEL``. An event is a JSON object
+with the id of the task and either its new state or the new values of one of its progress reports.
+"""
+from gettext import gettext as _
+import json
+import logging
+
+from redis.exceptions import RedisError
+
+from pulpcore.tasking import connection
+from pulpcore.tasking.constants import TASKING_CONSTANTS
+
+
+_logger = logging.getLogger(__name__)
+
+# The names of the events
+STATE_EVENT = 'state'
+PROGRESS_EVENT = 'progress'
+
+
+def channel(task_id):
+    """
+    Returns:
+        str: The name of the channel on which the events of a task are published.
+    """
+    return TASKING_CONSTANTS.EVENTS_CHANNEL.format(task=task_id)
+
+
+def publish_state(task_ids, state, pipeline=None):
+    """
+    Publish that tasks have moved to a state.
+
+    Args:
+        task_ids (list): The UUIDs of the tasks.
+        state (str): The state of the tasks.
+        pipeline (redis.client.Pipeline): The pipeline to publish with, if any.
+    """
+    _publish([(task_id, {'event': STATE_EVENT, 'task': str(task_id), 'state': state})
+              for task_id in task_ids], pipeline)
+
+
+def publish_progress(reports):
+    """
+    Publish the current values of progress reports.
+
+    Args:
+        reports (list): The :class:`~pulpcore.app.models.ProgressReport` instances.
+    """
+    _publish([(report.task_id, {
+        'event': PROGRESS_EVENT,
+        'task': str(report.task_id),
+        'progress_report': progress_report_data(report),
+    }) for report in reports if report.task_id], None)
+
+
+def progress_report_data(report):
+    """
+    Returns:
+        dict: The compact representation of a progress report sent in events.
+    """
+    return {
+        'message': report.message,
+        'state': report.state,
+        'total': report.total,
+        'done': report.done,
+        'suffix': report.suffix,
+    }
+
+
+def _publish(events, pipeline):
+    """
+    Publish events on the channels of their tasks.
+
+    Events are a best effort: failing to publish does not fail the change they report.
+
+    Args:
+        events (list): (task id, event) tuples.
+        pipeline (redis.client.Pipeline): The pipeline to publish with, or None to publish with a
+            pipeline of its own.
+    """
+    if not events:
+        return
+    try:
+        pipe = pipeline or connection.get_redis_connection().pipeline()
+        for task_id, event in events:
+            pipe.publish(channel(task_id), json.dumps(event))
+        if pipeline is None:
+            pipe.execute()
+    except RedisError as error:
+        _logger.warning(_('Publishing task events failed: {error}').format(error=error))
@@ -1,10 +1,12 @@
 from gettext import gettext as _
 import logging
 
+from django.db.models import Count, Q
+
 from pulpcore.app.models import Worker
 from pulpcore.constants import TASK_INCOMPLETE_STATES
 from pulpcore.tasking.constants import TASKING_CONSTANTS
-from pulpcore.tasking.util import cancel
+from pulpcore.tasking.util import cancel_tasks
 
 
 _logger = logging.getLogger(__name__)
@@ -26,29 +28,20 @@ def handle_worker_heartbeat(worker_name):
     """
     This is a generic function for updating worker heartbeat records.
 
-    Existing Worker objects are searched for one to update. If an existing one is found, it is
-    updated. Otherwise a new Worker entry is created. Logging at the info level is also done.
+    The heartbeat is recorded with a single query, which creates the Worker entry if none exists
+    yet. Logging at the info level is also done.
 
     Args:
         worker_name (str): The hostname of the worker
     """
-    worker, created = Worker.objects.get_or_create(name=worker_name)
+    created, back_online = Worker.objects.save_heartbeat(worker_name)
 
     if created:
         _logger.info(_("New worker '{name}' discovered").format(name=worker_name))
-    elif worker.online is False:
-        worker.gracefully_stopped = False
-        worker.cleaned_up = False
-        worker.save()
+    elif back_online:
         _logger.info(_("Worker '{name}' is back online.").format(name=worker_name))
 
-    worker.save_heartbeat()
-
-    msg = _("Worker heartbeat from '{name}' at time {timestamp}").format(
-        timestamp=worker.last_heartbeat,
-        name=worker_name
-    )
-
+    msg = _("Worker heartbeat from '{name}'").format(name=worker_name)
     _logger.debug(msg)
 
 
@@ -63,7 +56,10 @@ def check_worker_processes():
 
     This method also checks that at least one resource_manager and one worker process is
     present. If there are zero of either, log at the error level that Pulp will not operate
-    correctly.
+    correctly. Both are counted with one query.
+
+    This only needs to run in one process of the whole installation at a time, see
+    :meth:`pulpcore.tasking.worker.PulpWorker.heartbeat`.
     """
     msg = _('Checking if pulp_workers or pulp_resource_manager processes are '
             'missing for more than %d seconds') % TASKING_CONSTANTS.WORKER_TTL
@@ -75,25 +71,24 @@ def check_worker_processes():
 
         mark_worker_offline(worker.name)
 
-    worker_count = Worker.objects.online_workers().filter(
-        name__startswith=TASKING_CONSTANTS.WORKER_PREFIX).count()
-
-    resource_manager_count = Worker.objects.online_workers().filter(
-        name__startswith=TASKING_CONSTANTS.RESOURCE_MANAGER_WORKER_NAME).count()
+    counts = Worker.objects.online_workers().aggregate(
+        workers=Count('pk', filter=Q(name__startswith=TASKING_CONSTANTS.WORKER_PREFIX)),
+        resource_manager=Count(
+            'pk', filter=Q(name__startswith=TASKING_CONSTANTS.RESOURCE_MANAGER_WORKER_NAME))
+    )
 
-    if resource_manager_count == 0:
+    if counts['resource_manager'] == 0:
         msg = _("There are 0 pulp_resource_manager processes running. Pulp will not operate "
                 "correctly without at least one pulp_resource_mananger process running.")
         _logger.error(msg)
 
-    if worker_count == 0:
+    if counts['workers'] == 0:
         msg = _("There are 0 worker processes running. Pulp will not operate "
                 "correctly without at least one worker process running.")
         _logger.error(msg)
 
-    output_dict = {'workers': worker_count, 'resource_manager': resource_manager_count}
     msg = _("%(workers)d pulp_worker processes and %(resource_manager)d "
-            "pulp_resource_manager processes") % output_dict
+            "pulp_resource_manager processes") % counts
     _logger.debug(msg)
 
 
@@ -121,7 +116,8 @@ def mark_worker_offline(worker_name, normal_shutdown=False):
 
     Any resource reservations associated with this worker are cleaned up by this function.
 
-    Any tasks associated with this worker are explicitly canceled.
+    Any tasks associated with this worker are explicitly canceled, all at once and without
+    waiting for them to stop. Either the worker is gone or it is the caller itself.
 
     Args:
         worker_name (str) The name of the worker
@@ -142,8 +138,8 @@ def mark_worker_offline(worker_name, normal_shutdown=False):
         pass
     else:
         # Cancel all of the tasks that were assigned to this worker's queue
-        for task_status in worker.tasks.filter(state__in=TASK_INCOMPLETE_STATES):
-            cancel(task_status.pk)
+        tasks = worker.tasks.filter(state__in=TASK_INCOMPLETE_STATES).select_related('worker')
+        cancel_tasks(tasks, wait=False)
 
         if normal_shutdown:
             worker.gracefully_stopped = True
@@ -1,15 +1,21 @@
 import logging
+import threading
 import time
 import uuid
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 from gettext import gettext as _
 
 from django.db import IntegrityError
+from django.utils import timezone
 from rq import Queue
-from rq.job import get_current_job, Job
+from rq.exceptions import NoSuchJobError
+from rq.job import get_current_job, Job, JobStatus
 
-from pulpcore.app.models import Task, ReservedResource, Worker
-from pulpcore.constants import TASK_STATES
-from pulpcore.tasking import connection, util
+from pulpcore.app.models import Task, Worker
+from pulpcore.constants import TASK_FINAL_STATES, TASK_STATES
+from pulpcore.tasking import connection, events, util
+from pulpcore.tasking.constants import TASKING_CONSTANTS
 
 
 _logger = logging.getLogger(__name__)
@@ -19,6 +25,12 @@ _logger = logging.getLogger(__name__)
 # Pulp tasks should never run more than one Julian year
 TASK_TIMEOUT = 31557600
 
+# Calls collected by bulk_dispatch() in the current thread, or None when not batching
+_dispatch_buffer = threading.local()
+
+# A task to dispatch: the resource manager job which dispatches it and the ids of its prerequisites
+_TaskCall = namedtuple('_TaskCall', ('task_id', 'job_func', 'job_args', 'depends_on'))
+
 
 def _acquire_worker(resources):
     """
@@ -75,23 +87,7 @@ def _queue_reserved_task(func, inner_task_id, resources, inner_args, inner_kwarg
     """
     redis_conn = connection.get_redis_connection()
     task_status = Task.objects.get(pk=inner_task_id)
-    task_name = func.__module__ + '.' + func.__name__
     while True:
-        if task_name == "pulpcore.app.tasks.orphan.orphan_cleanup":
-            if ReservedResource.objects.exists():
-                # wait until there are no reservations
-                time.sleep(0.25)
-                continue
-            else:
-                task_status.state = TASK_STATES.RUNNING
-                task_status.save()
-                q = Queue('resource_manager', connection=redis_conn, is_async=False)
-                q.enqueue(func, args=inner_args, kwargs=inner_kwargs, job_id=inner_task_id,
-                          timeout=TASK_TIMEOUT, **options)
-                task_status.state = TASK_STATES.COMPLETED
-                task_status.save()
-                return
-
         try:
             worker = _acquire_worker(resources)
         except Worker.DoesNotExist:
@@ -142,9 +138,175 @@ def _release_resources(task_id):
         task.set_failed(exc, None)
 
     Task.objects.get(pk=task_id).release_resources()
+    util.dispatch_dependents(task_id)
+
+
+def _dispatch_ready_tasks(task_ids):
+    """
+    Do not queue this task yourself. It is used automatically to dispatch the tasks enqueued with
+    prerequisites once those have reached a final state.
+
+    A task is queued for reservation when all of its prerequisites completed. It is skipped when
+    any of them failed, was canceled or was skipped itself, which releases its own dependents in
+    turn. Tasks with unfinished prerequisites are left alone.
+
+    Args:
+        task_ids (list): The UUIDs of the tasks to check
+    """
+    redis_conn = connection.get_redis_connection()
+    q = Queue('resource_manager', connection=redis_conn)
+    TaskDependency = Task.dependencies.through
+
+    task_ids = [str(task_id) for task_id in task_ids]
+    while task_ids:
+        task_states = {str(pk): state for pk, state in
+                       Task.objects.filter(pk__in=task_ids).values_list('pk', 'state')}
+        prerequisite_states = defaultdict(list)
+        dependencies = TaskDependency.objects.filter(from_task_id__in=task_ids)
+        for task_id, state in dependencies.values_list('from_task_id', 'to_task__state'):
+            prerequisite_states[str(task_id)].append(state)
+
+        skipped = []
+        for task_id in task_ids:
+            states = prerequisite_states[task_id]
+            if not all(state in TASK_FINAL_STATES for state in states):
+                continue
+            # Only the first caller to remove the task from the set may release it
+            if not redis_conn.srem(TASKING_CONSTANTS.DEFERRED_KEY, task_id):
+                continue
+
+            job_id = _deferred_job_id(task_id)
+            if task_states.get(task_id) == TASK_STATES.WAITING and \
+                    all(state == TASK_STATES.COMPLETED for state in states):
+                try:
+                    q.enqueue_job(Job.fetch(job_id, connection=redis_conn))
+                except NoSuchJobError:
+                    _logger.error(_('The dispatch job of task {task_id} does not exist.').format(
+                        task_id=task_id))
+                    skipped.append(task_id)
+            else:
+                Job(id=job_id, connection=redis_conn).delete()
+                skipped.append(task_id)
+
+        waiting = Task.objects.filter(pk__in=skipped, state=TASK_STATES.WAITING)
+        waiting_ids = list(waiting.values_list('pk', flat=True))
+        waiting.filter(pk__in=waiting_ids).update(
+            state=TASK_STATES.SKIPPED, finished_at=timezone.now())
+        events.publish_state(waiting_ids, TASK_STATES.SKIPPED)
+        dependents = TaskDependency.objects.filter(to_task_id__in=skipped)
+        task_ids = [str(task_id) for task_id in
+                    dependents.values_list('from_task_id', flat=True).distinct()]
+
+
+def _deferred_job_id(task_id):
+    """
+    Returns:
+        str: The id of the resource manager job which dispatches a task with prerequisites. Like
+            every job id it is a UUID, but it is never the UUID of a task.
+    """
+    return str(uuid.uuid5(uuid.UUID(str(task_id)), 'deferred'))
+
+
+@contextmanager
+def bulk_dispatch():
+    """
+    Collect the tasks enqueued with :func:`enqueue_with_reservation` and dispatch them together.
+
+    Inside this context manager :func:`enqueue_with_reservation` returns the Job of the task right
+    away without touching the database or Redis. When the block exits, all collected tasks are
+    created with a single bulk insert and enqueued through a single Redis pipeline. If the block
+    raises an exception, the collected tasks are discarded.
+
+    Nested uses dispatch everything when the outermost block exits.
+    """
+    if getattr(_dispatch_buffer, 'calls', None) is not None:
+        yield
+        return
+
+    _dispatch_buffer.calls = []
+    try:
+        yield
+        calls = _dispatch_buffer.calls
+    finally:
+        _dispatch_buffer.calls = None
+    _dispatch(calls)
+
+
+def _dispatch(calls):
+    """
+    Create the Task entries for calls and enqueue them to the resource manager.
+
+    The resource manager jobs of calls with prerequisites are saved as deferred jobs instead, which
+    :func:`_dispatch_ready_tasks` enqueues once the prerequisites reached a final state.
+
+    Args:
+        calls (list): A list of :class:`_TaskCall` to dispatch.
+    """
+    if not calls:
+        return
+
+    redis_conn = connection.get_redis_connection()
+    current_job = get_current_job(connection=redis_conn)
+    parent = Task.objects.filter(pk=current_job.id).first() if current_job else None
+    Task.objects.bulk_create([
+        Task(pk=call.task_id, state=TASK_STATES.WAITING, parent=parent) for call in calls
+    ])
+    Task.dependencies.through.objects.bulk_create([
+        Task.dependencies.through(from_task_id=call.task_id, to_task_id=prerequisite_id)
+        for call in calls for prerequisite_id in call.depends_on
+    ])
+
+    q = Queue('resource_manager', connection=redis_conn)
+    deferred_task_ids = []
+    with redis_conn.pipeline() as pipe:
+        for call in calls:
+            if call.depends_on:
+                job = Job.create(call.job_func, args=call.job_args, connection=redis_conn,
+                                 timeout=TASK_TIMEOUT, id=_deferred_job_id(call.task_id),
+                                 origin=q.name, status=JobStatus.DEFERRED)
+                job.save(pipeline=pipe)
+                pipe.sadd(TASKING_CONSTANTS.DEFERRED_KEY, call.task_id)
+                deferred_task_ids.append(call.task_id)
+            else:
+                job = Job.create(call.job_func, args=call.job_args, connection=redis_conn,
+                                 timeout=TASK_TIMEOUT, origin=q.name)
+                q.enqueue_job(job, pipeline=pipe)
+
+        if deferred_task_ids:
+            # The prerequisites may have reached a final state already
+            job = Job.create(_dispatch_ready_tasks, args=(deferred_task_ids,),
+                             connection=redis_conn, timeout=TASK_TIMEOUT, origin=q.name)
+            q.enqueue_job(job, pipeline=pipe)
+        pipe.execute()
 
 
-def enqueue_with_reservation(func, resources, args=None, kwargs=None, options=None):
+def _add_call(call):
+    """
+    Dispatch a call, or collect it if :func:`bulk_dispatch` is in effect.
+
+    Args:
+        call (_TaskCall): The call to dispatch.
+    """
+    buffered_calls = getattr(_dispatch_buffer, 'calls', None)
+    if buffered_calls is not None:
+        buffered_calls.append(call)
+    else:
+        _dispatch([call])
+
+
+def _prerequisite_ids(depends_on):
+    """
+    Args:
+        depends_on (list): Tasks, RQ Jobs or task UUIDs
+
+    Returns:
+        list: The task UUIDs as strings
+    """
+    return [str(getattr(prerequisite, 'id', prerequisite)) for prerequisite in depends_on or ()]
+
+
+def enqueue_with_reservation(func, resources, args=None, kwargs=None, options=None,
+                             depends_on=None):
     """
     Enqueue a message to Pulp workers with a reservation.
 
@@ -158,15 +320,21 @@ def enqueue_with_reservation(func, resources, args=None, kwargs=None, options=No
 
     This method creates a :class:`pulpcore.app.models.Task` object. Pulp expects to poll on a
     task just after calling this method, so a Task entry needs to exist for it
-    before it returns.
+    before it returns. Within :func:`bulk_dispatch` the Task entry is created when the
+    block exits instead.
+
+    A task with prerequisites waits until all of them reached a final state. It is dispatched if
+    all of them completed and it is skipped otherwise.
 
     Args:
         func (callable): The function to be run by RQ when the necessary locks are acquired.
         resources (list): A list of resources to reserve guaranteeing that only one task
-            reserves these resources
+            reserves these resources. Resources are models or urls.
         args (tuple): The positional arguments to pass on to the task.
         kwargs (dict): The keyword arguments to pass on to the task.
         options (dict): The options to be passed on to the task.
+        depends_on (list): The tasks which must complete before this task is dispatched, given
+            as :class:`pulpcore.app.models.Task` or :class:`rq.job.Job` instances or as task UUIDs.
 
     Returns (rq.job.job): An RQ Job instance as returned by RQ's enqueue function
     """
@@ -179,14 +347,94 @@ def enqueue_with_reservation(func, resources, args=None, kwargs=None, options=No
 
     resources = {util.get_url(resource) for resource in resources}
     inner_task_id = str(uuid.uuid4())
-    redis_conn = connection.get_redis_connection()
-    current_job = get_current_job(connection=redis_conn)
-    parent_kwarg = {}
-    if current_job:
-        current_task = Task.objects.get(id=current_job.id)
-        parent_kwarg['parent'] = current_task
-    Task.objects.create(pk=inner_task_id, state=TASK_STATES.WAITING, **parent_kwarg)
-    q = Queue('resource_manager', connection=redis_conn)
     task_args = (func, inner_task_id, list(resources), args, kwargs, options)
-    q.enqueue(_queue_reserved_task, args=task_args, timeout=TASK_TIMEOUT)
-    return Job(id=inner_task_id, connection=redis_conn)
+    _add_call(_TaskCall(inner_task_id, _queue_reserved_task, task_args,
+                        _prerequisite_ids(depends_on)))
+    return Job(id=inner_task_id, connection=connection.get_redis_connection())
+
+
+def bulk_enqueue_with_reservation(calls):
+    """
+    Enqueue many messages to Pulp workers with reservations at once.
+
+    Each call is handled as by :func:`enqueue_with_reservation`, but all Task entries are created
+    with one bulk insert and all messages are sent to Redis in one pipeline.
+
+    Args:
+        calls (iterable): Tuples of the positional arguments of :func:`enqueue_with_reservation`,
+            e.g. ``(func, resources)`` or ``(func, resources, args, kwargs, options, depends_on)``.
+
+    Returns:
+        list: The :class:`rq.job.Job` instances of the tasks, in the order of calls.
+    """
+    with bulk_dispatch():
+        return [enqueue_with_reservation(*call) for call in calls]
+
+
+def enqueue_operation(path, method, body, user, meta, depends_on):
+    """
+    Enqueue an API operation which dispatches a task, to be performed once its prerequisites
+    completed.
+
+    This lets a client submit a chain of operations, e.g. sync, publish and distribute, whose
+    requests can only be validated against the results of the previous ones. The operation is
+    performed by the resource manager, and the task it dispatches runs under the UUID of the Task
+    entry created here. If the operation does not dispatch a task, that Task fails.
+
+    Args:
+        path (str): The path of the endpoint
+        method (str): The HTTP method of the operation
+        body (dict): The body of the operation
+        user (django.contrib.auth.models.User): The user performing the operation
+        meta (dict): The request headers and WSGI environment of the operation
+        depends_on (list): The tasks which must complete before the operation is performed
+
+    Returns (rq.job.job): An RQ Job instance for the dispatched task
+    """
+    task_id = str(uuid.uuid4())
+    job_args = (task_id, path, method, body, user.pk, meta)
+    _add_call(_TaskCall(task_id, _perform_operation, job_args, _prerequisite_ids(depends_on)))
+    return Job(id=task_id, connection=connection.get_redis_connection())
+
+
+def _perform_operation(task_id, path, method, body, user_id, meta):
+    """
+    Do not queue this task yourself. It is used automatically by :func:`enqueue_operation`.
+
+    Performs the operation, then reserves the resources of the task it dispatched under task_id.
+
+    Args:
+        task_id (basestring): The UUID of the Task entry created for the operation
+        path (str): The path of the endpoint
+        method (str): The HTTP method of the operation
+        body (dict): The body of the operation
+        user_id (int): The primary key of the user performing the operation, if any
+        meta (dict): The request headers and WSGI environment of the operation
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import AnonymousUser
+    from pulpcore.app.viewsets.task import perform_operation
+
+    if user_id is None:
+        user = AnonymousUser()
+    else:
+        user = get_user_model().objects.get(pk=user_id)
+
+    _dispatch_buffer.calls = []
+    try:
+        response = perform_operation(path, method, body, user, meta=meta)
+        calls = _dispatch_buffer.calls
+    finally:
+        _dispatch_buffer.calls = None
+
+    if response.status_code != 202 or len(calls) != 1:
+        msg = _('The operation {method} {path} did not dispatch a task: {status} {response}')
+        exc = RuntimeError(msg.format(method=method.upper(), path=path,
+                                      status=response.status_code,
+                                      response=getattr(response, 'data', None)))
+        Task.objects.get(pk=task_id).set_failed(exc, None)
+        util.dispatch_dependents(task_id)
+        return
+
+    func, _inner_task_id, resources, args, kwargs, options = calls[0].job_args
+    _queue_reserved_task(func, task_id, resources, args, kwargs, options)
@@ -3,14 +3,18 @@ import logging
 import time
 
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.urls import reverse
-from rq.job import Job
+from rq import Queue
+from rq.compat import as_text
+from rq.job import Job, JobStatus
+from rq.registry import StartedJobRegistry
 
 from pulpcore.app.models import Task
 from pulpcore.app.serializers import view_name_for_model
 from pulpcore.constants import TASK_FINAL_STATES, TASK_STATES
 from pulpcore.exceptions import MissingResource
-from pulpcore.tasking import connection
+from pulpcore.tasking import connection, events
 from pulpcore.tasking.constants import TASKING_CONSTANTS
 
 
@@ -22,7 +26,8 @@ def cancel(task_id):
     Cancel the task that is represented by the given task_id.
 
     This method cancels only the task with given task_id, not the spawned tasks. This also updates
-    task's state to 'canceled'.
+    task's state to 'canceled'. If the task is running, this returns once its worker acknowledged
+    that it has stopped.
 
     :param task_id: The ID of the task you wish to cancel
     :type  task_id: basestring
@@ -30,7 +35,7 @@ def cancel(task_id):
     :raises MissingResource: if a task with given task_id does not exist
     """
     try:
-        task_status = Task.objects.get(pk=task_id)
+        task_status = Task.objects.select_related('worker').get(pk=task_id)
     except Task.DoesNotExist:
         raise MissingResource(task=task_id)
 
@@ -40,22 +45,91 @@ def cancel(task_id):
         _logger.info(msg.format(task_id=task_id, state=task_status.state))
         return
 
-    redis_conn = connection.get_redis_connection()
-    job = Job(id=str(task_id), connection=redis_conn)
+    cancel_tasks([task_status])
+
+
+def cancel_tasks(tasks, wait=True):
+    """
+    Cancel many incomplete tasks at once.
 
-    if job.is_started:
-        redis_conn.sadd(TASKING_CONSTANTS.KILL_KEY, job.get_id())
-    job.delete()
+    The jobs of all tasks are deleted with one Redis pipeline. The workers running any of them are
+    asked to kill their work horse over their kill channel, see
+    :meth:`pulpcore.tasking.worker.PulpWorker.listen_for_kill_requests`, and the states of all
+    tasks are updated with one query.
 
-    # A hack to ensure that we aren't deleting resources still being used by the workhorse
-    time.sleep(1.5)
+    Args:
+        tasks (list): The :class:`pulpcore.app.models.Task` instances to cancel, with their worker.
+        wait (bool): Whether to wait for the workers to acknowledge that the running jobs have
+            stopped before deleting the incomplete resources those created. A worker must not
+            wait for itself.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
 
+    redis_conn = connection.get_redis_connection()
+    jobs = [Job(id=str(task.pk), connection=redis_conn) for task in tasks]
+    with redis_conn.pipeline() as pipe:
+        for job in jobs:
+            pipe.hget(job.key, 'status')
+        statuses = [as_text(status) for status in pipe.execute()]
+
+    # Kill the running jobs and delete the jobs, whichever their state
+    running = [(task, job) for task, job, status in zip(tasks, jobs, statuses)
+               if status == JobStatus.STARTED and task.worker]
+    with redis_conn.pipeline() as pipe:
+        for task, job in running:
+            pipe.publish(TASKING_CONSTANTS.KILL_CHANNEL.format(worker=task.worker.name), job.id)
+        for task, job in zip(tasks, jobs):
+            if task.worker:
+                Queue(task.worker.name, connection=redis_conn).remove(job.id, pipeline=pipe)
+                StartedJobRegistry(task.worker.name, connection=redis_conn).remove(
+                    job, pipeline=pipe)
+            pipe.delete(job.key, job.dependents_key)
+        receivers = pipe.execute()[:len(running)]
+
+    if wait:
+        # Only a worker listening on its channel acknowledges the kill
+        ack_keys = {TASKING_CONSTANTS.KILL_ACK_KEY.format(job=job.id)
+                    for (task, job), count in zip(running, receivers) if count}
+        deadline = time.time() + TASKING_CONSTANTS.KILL_TIMEOUT
+        while ack_keys and time.time() < deadline:
+            acknowledged = redis_conn.blpop(list(ack_keys), max(1, int(deadline - time.time())))
+            if acknowledged is None:
+                break
+            ack_keys.discard(as_text(acknowledged[0]))
+        if ack_keys:
+            _logger.warning(_('Canceled tasks did not stop in time: {ids}').format(
+                ids=', '.join(key.split(':')[2] for key in ack_keys)))
+
+    task_ids = [task.pk for task in tasks]
+    prefetch_related_objects(tasks, 'created_resources')
     with transaction.atomic():
-        task_status.state = TASK_STATES.CANCELED
-        task_status.save()
-        _delete_incomplete_resources(task_status)
+        Task.objects.filter(pk__in=task_ids).update(state=TASK_STATES.CANCELED)
+        for task in tasks:
+            task.state = TASK_STATES.CANCELED
+            _delete_incomplete_resources(task)
+    events.publish_state(task_ids, TASK_STATES.CANCELED)
+
+    dispatch_dependents(*task_ids)
+    for task_id in task_ids:
+        _logger.info(_('Task canceled: {id}.').format(id=task_id))
 
-    _logger.info(_('Task canceled: {id}.').format(id=task_id))
+
+def dispatch_dependents(*task_ids):
+    """
+    Ask the resource manager to dispatch or skip the tasks depending on tasks which have reached a
+    final state.
+
+    Args:
+        task_ids (basestring): The UUIDs of the tasks
+    """
+    dependent_ids = Task.dependencies.through.objects.filter(to_task_id__in=task_ids)
+    dependent_ids = dependent_ids.values_list('from_task_id', flat=True).distinct()
+    dependent_ids = [str(dependent_id) for dependent_id in dependent_ids]
+    if dependent_ids:
+        q = Queue('resource_manager', connection=connection.get_redis_connection())
+        q.enqueue('pulpcore.tasking.tasks._dispatch_ready_tasks', args=(dependent_ids,))
 
 
 def _delete_incomplete_resources(task):
@@ -86,9 +160,11 @@ def get_url(model):
     resource URI.  This is used in our resource locking/reservation code to identify resources.
 
     Args:
-        model (django.models.Model): A model object.
+        model (django.models.Model): A model object, or the url of a resource which is not a model.
 
     Returns:
         str: The path component of the resource url
     """
+    if isinstance(model, str):
+        return model
     return reverse(view_name_for_model(model, 'detail'), args=[model.pk])
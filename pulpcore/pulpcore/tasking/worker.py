@@ -1,5 +1,9 @@
+from gettext import gettext as _
+import importlib.util
 import logging
 import os
+import random
+import select
 import signal
 import socket
 import sys
@@ -9,15 +13,22 @@ import time
 # https://github.com/rochacbruno/dynaconf/issues/89
 from dynaconf.contrib import django_dynaconf  # noqa
 
+from redis.exceptions import ConnectionError as RedisConnectionError
 from rq import Queue
-from rq.worker import Worker
+from rq.compat import as_text
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rq.worker import Worker, WorkerStatus
 
 
 import django  # noqa otherwise E402: module level not at top of file
 django.setup()  # noqa otherwise E402: module level not at top of file
 
 
-from pulpcore.app.models import Task
+from django.apps import apps  # noqa otherwise E402: module level not at top of file
+from django.conf import settings  # noqa otherwise E402: module level not at top of file
+
+from pulpcore.app.models import ProgressReport, Task
 
 from pulpcore.tasking.constants import TASKING_CONSTANTS
 from pulpcore.tasking.services.storage import WorkerDirectory
@@ -43,8 +54,11 @@ class PulpWorker(Worker):
         * If the name starts with 'resource_manager' the worker ignores any other Queue
           configuration and only subscribes to the 'resource_manager' queue
         * Sets the worker TTL
-        * Supports the killing of a job that is already running
+        * Supports the killing of a job that is already running, see
+          :meth:`listen_for_kill_requests`
         * Closes the database connection before forking so it is not process shared
+        * Optionally performs jobs in a persistent work horse instead of forking one per job, see
+          :meth:`execute_job_in_pooled_horse`
     """
 
     # Do not print "Result is kept for XXX seconds" after each job
@@ -62,22 +76,214 @@ class PulpWorker(Worker):
         kwargs['default_worker_ttl'] = TASKING_CONSTANTS.WORKER_TTL
         kwargs['job_monitoring_interval'] = TASKING_CONSTANTS.JOB_MONITORING_INTERVAL
 
+        # The job performed by the current work horse and whether it was killed, guarded by a lock
+        # shared with the kill listener thread
+        self._horse_lock = threading.Lock()
+        self._horse_job_id = None
+        self._horse_killed = False
+
+        # The persistent work horse: its pid, the pipe to send it jobs, the pipe it reports on, and
+        # the number of jobs it performed
+        self.pool_work_horses = settings.WORK_HORSE_POOL['ENABLED']
+        self._pooled_horse = None
+
+        # When the heartbeat was last recorded in the database
+        self._last_heartbeat = float('-inf')
+
         return super().__init__(queues, **kwargs)
 
-    def execute_job(self, *args, **kwargs):
+    def execute_job(self, job, queue):
+        """
+        Perform the job in a forked work horse, or in the pooled work horse if enabled.
+
+        Close the database connection before forking, so that it is not shared. Once the job is
+        performed, acknowledge that it has stopped if it was killed.
+        """
+        try:
+            if self.pool_work_horses:
+                self.execute_job_in_pooled_horse(job, queue)
+            else:
+                django.db.connections.close_all()
+                super().execute_job(job, queue)
+        finally:
+            with self._horse_lock:
+                killed = self._horse_killed
+                self._horse_job_id = None
+                self._horse_killed = False
+            if killed:
+                self._acknowledge_kill(job.id)
+
+    def fork_work_horse(self, job, queue):
+        """
+        Record the job of the work horse, once the work horse is forked.
+
+        Args:
+            job (rq.job.Job): The job to perform
+            queue (rq.queue.Queue): The Queue associated with the job
+        """
+        super().fork_work_horse(job, queue)
+        with self._horse_lock:
+            self._horse_job_id = job.id
+
+    def execute_job_in_pooled_horse(self, job, queue):
+        """
+        Hand the job to the persistent work horse and wait until it is performed.
+
+        Forking a work horse per job makes every job pay for the fork, the lazy imports of the task
+        modules and the database connection. The pooled work horse is forked and initialized ahead
+        of time and performs the jobs one after the other, like the worker does. It is replaced
+        after ``WORK_HORSE_POOL['MAX_JOBS']`` jobs, and whenever it exits, e.g. when the job was
+        killed.
+
+        Args:
+            job (rq.job.Job): The job to perform
+            queue (rq.queue.Queue): The Queue associated with the job
+        """
+        self.set_state(WorkerStatus.BUSY)
+        if self._pooled_horse is None:
+            self.spawn_pooled_horse()
+        pid, job_fd, result_fd, performed_jobs = self._pooled_horse
+
+        with self._horse_lock:
+            self._horse_job_id = job.id
+        line = '{job_id} {queue}\n'.format(job_id=job.id, queue=queue.name).encode()
+        try:
+            os.write(job_fd, line)
+        except BrokenPipeError:
+            # The idle work horse exited, e.g. it was killed. Reap it and fork a new one.
+            self.stop_pooled_horse()
+            self.spawn_pooled_horse()
+            pid, job_fd, result_fd, performed_jobs = self._pooled_horse
+            os.write(job_fd, line)
+
+        while True:
+            readable, _w, _x = select.select([result_fd], [], [], self.job_monitoring_interval)
+            if readable:
+                break
+            # The job is still running. Send a heartbeat to keep the worker alive.
+            self.heartbeat(self.job_monitoring_interval + 5)
+
+        performed = os.read(result_fd, 1)
+        # The work horse is done with the job, so a kill request for it must not kill the work
+        # horse spawned below for the next job
+        with self._horse_lock:
+            self._horse_job_id = None
+
+        if performed:
+            self._pooled_horse = (pid, job_fd, result_fd, performed_jobs + 1)
+            if performed_jobs + 1 >= settings.WORK_HORSE_POOL['MAX_JOBS']:
+                self.stop_pooled_horse()
+        else:
+            # The work horse exited, let rq reap it and handle the job it left behind
+            self._close_pooled_horse_pipes()
+            self.monitor_work_horse(job)
+
+        # Have a work horse ready for the next job
+        if self._pooled_horse is None:
+            self.spawn_pooled_horse()
+        self.set_state(WorkerStatus.IDLE)
+
+    def spawn_pooled_horse(self):
         """
-        Close the database connection before forking, so that it is not shared
+        Fork the persistent work horse, see :meth:`execute_job_in_pooled_horse`.
         """
         django.db.connections.close_all()
-        super().execute_job(*args, **kwargs)
+        job_read, job_write = os.pipe()
+        result_read, result_write = os.pipe()
+        child_pid = os.fork()
+        if child_pid == 0:
+            os.close(job_write)
+            os.close(result_read)
+            self.main_pooled_horse(job_read, result_write)
+        os.close(job_read)
+        os.close(result_write)
+        self._horse_pid = child_pid
+        self._pooled_horse = (child_pid, job_write, result_read, 0)
+        self.procline('Forked pooled work horse {0} at {1}'.format(child_pid, time.time()))
+
+    def stop_pooled_horse(self):
+        """
+        Let the persistent work horse exit once it is done with its current job, and reap it.
+        """
+        if self._pooled_horse is None:
+            return
+        pid = self._pooled_horse[0]
+        self._close_pooled_horse_pipes()
+        os.waitpid(pid, 0)
+
+    def _close_pooled_horse_pipes(self):
+        """
+        Close the pipes to the persistent work horse, which makes it exit.
+        """
+        pid, job_fd, result_fd, performed_jobs = self._pooled_horse
+        os.close(job_fd)
+        os.close(result_fd)
+        self._pooled_horse = None
+
+    def main_pooled_horse(self, job_fd, result_fd):
+        """
+        The entry point of the persistent work horse.
+
+        Initializes the process, then performs the jobs read from job_fd and reports each one on
+        result_fd, until job_fd is closed.
+
+        Args:
+            job_fd (int): The file descriptor to read "<job id> <queue name>" lines from
+            result_fd (int): The file descriptor to report on
+        """
+        random.seed()
+        self.setup_work_horse_signals()
+        self._is_horse = True
+        try:
+            self.initialize_work_horse()
+            with os.fdopen(job_fd, 'rb') as jobs:
+                for line in jobs:
+                    job_id, queue_name = as_text(line).split()
+                    os.environ['RQ_JOB_ID'] = job_id
+                    try:
+                        job = Job.fetch(job_id, connection=self.connection)
+                    except NoSuchJobError:
+                        # The job was canceled meanwhile
+                        pass
+                    else:
+                        self.perform_job(job, Queue(queue_name, connection=self.connection))
+                    self.reset_work_horse()
+                    os.write(result_fd, b'1')
+        finally:
+            # os._exit() is the way to exit from childs after a fork()
+            os._exit(0)
+
+    def initialize_work_horse(self):
+        """
+        Import the task modules of all apps and connect to the database ahead of the first job.
+        """
+        for app_config in apps.get_app_configs():
+            module_name = '{app}.tasks'.format(app=app_config.name)
+            if importlib.util.find_spec(module_name) is not None:
+                importlib.import_module(module_name)
+        django.db.connection.ensure_connection()
+
+    def reset_work_horse(self):
+        """
+        Drop the database connections a job left unusable or within a transaction.
+        """
+        for conn in django.db.connections.all():
+            if conn.connection is not None and (conn.in_atomic_block or not conn.is_usable()):
+                conn.close()
+
+    def register_death(self):
+        """
+        Stop the persistent work horse, if any, when the worker exits.
+        """
+        self.stop_pooled_horse()
+        return super().register_death()
 
     def perform_job(self, job, queue):
         """
-        Set the :class:`pulpcore.app.models.Task` to running and install a kill monitor Thread
+        Set the :class:`pulpcore.app.models.Task` to running.
 
         This method is called by the worker's work horse thread (the forked child) just before the
-        task begins executing. It creates a Thread which monitors a special Redis key which if
-        created should kill the task with SIGKILL.
+        task begins executing.
 
         Args:
             job (rq.job.Job): The job to perform
@@ -90,21 +296,56 @@ class PulpWorker(Worker):
         else:
             task.set_running()
 
-        def check_kill(conn, id, interval=1):
-            while True:
-                res = conn.srem(TASKING_CONSTANTS.KILL_KEY, id)
-                if res > 0:
-                    os.kill(os.getpid(), signal.SIGKILL)
-                time.sleep(interval)
+        return super().perform_job(job, queue)
 
-        t = threading.Thread(target=check_kill, args=(self.connection, job.get_id()))
-        t.start()
+    def listen_for_kill_requests(self):
+        """
+        Kill the work horse with SIGKILL when the job it performs is canceled.
 
-        return super().perform_job(job, queue)
+        This runs in a thread of the worker process for the life of the worker. It listens on the
+        worker's kill channel, on which :func:`pulpcore.tasking.util.cancel_tasks` publishes the
+        ids of the jobs to kill. Each request is acknowledged once the job has stopped, right away
+        if the job is not running.
+        """
+        channel = TASKING_CONSTANTS.KILL_CHANNEL.format(worker=self.name)
+        while True:
+            try:
+                pubsub = self.connection.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                for message in pubsub.listen():
+                    job_id = as_text(message['data'])
+                    with self._horse_lock:
+                        running = job_id == self._horse_job_id
+                        if running:
+                            self._horse_killed = True
+                            try:
+                                os.kill(self.horse_pid, signal.SIGKILL)
+                            except ProcessLookupError:
+                                # The work horse exited and was reaped meanwhile
+                                pass
+                    if not running:
+                        self._acknowledge_kill(job_id)
+            except RedisConnectionError:
+                _logger.exception(_('Lost the connection to the kill channel, reconnecting.'))
+                time.sleep(1)
+
+    def _acknowledge_kill(self, job_id):
+        """
+        Acknowledge that a job this worker was asked to kill has stopped.
+
+        Args:
+            job_id (str): The id of the job
+        """
+        key = TASKING_CONSTANTS.KILL_ACK_KEY.format(job=job_id)
+        with self.connection.pipeline() as pipe:
+            pipe.rpush(key, 1)
+            pipe.expire(key, TASKING_CONSTANTS.KILL_TIMEOUT)
+            pipe.execute()
 
     def handle_job_failure(self, job, **kwargs):
         """
-        Set the :class:`pulpcore.app.models.Task` to failed and record the exception.
+        Set the :class:`pulpcore.app.models.Task` to failed and record the exception, once its
+        progress reports are written.
 
         This method is called by rq to handle a job failure.
 
@@ -112,6 +353,7 @@ class PulpWorker(Worker):
             job (rq.job.Job): The job that experienced the failure
             kwargs (dict): Unused parameters
         """
+        ProgressReport.flush_all()
         try:
             task = Task.objects.get(pk=job.get_id())
         except Task.DoesNotExist:
@@ -124,7 +366,8 @@ class PulpWorker(Worker):
 
     def handle_job_success(self, job, queue, started_job_registry):
         """
-        Set the :class:`pulpcore.app.models.Task` to completed.
+        Set the :class:`pulpcore.app.models.Task` to completed, once its progress reports are
+        written.
 
         This method is called by rq to handle a job success.
 
@@ -133,6 +376,7 @@ class PulpWorker(Worker):
             queue (rq.queue.Queue): The Queue associated with the job
             started_job_registry (rq.registry.StartedJobRegistry): The RQ registry of started jobs
         """
+        ProgressReport.flush_all()
         try:
             task = Task.objects.get(pk=job.get_id())
         except Task.DoesNotExist:
@@ -146,8 +390,9 @@ class PulpWorker(Worker):
         """
         Handle the birth of a RQ worker.
 
-        This creates the working directory and removes any vestige records from a previous worker
-        with the same name.
+        This creates the working directory, removes any vestige records from a previous worker
+        with the same name, forks the pooled work horse if enabled, and starts listening for kill
+        requests.
 
         Args:
             args (tuple): unused positional arguments
@@ -157,20 +402,33 @@ class PulpWorker(Worker):
         working_dir = WorkerDirectory(self.name)
         working_dir.delete()
         working_dir.create()
+        if self.pool_work_horses:
+            self.spawn_pooled_horse()
+        threading.Thread(target=self.listen_for_kill_requests, daemon=True).start()
         return super().register_birth(*args, **kwargs)
 
     def heartbeat(self, *args, **kwargs):
         """
         Handle the heartbeat of a RQ worker.
 
-        This writes the heartbeat records to the :class:`pulpcore.app.models.Worker` records.
+        This writes the heartbeat records to the :class:`pulpcore.app.models.Worker` records, at
+        most once every ``HEARTBEAT_INTERVAL`` seconds.
+
+        The worker which takes the liveness check lease in Redis checks for missing workers on
+        behalf of all workers, so the check runs once every ``LIVENESS_CHECK_INTERVAL`` seconds
+        regardless of the number of workers.
 
         Args:
             args (tuple): unused positional arguments
             kwargs (dict): unused keyword arguments
         """
-        handle_worker_heartbeat(self.name)
-        check_worker_processes()
+        now = time.monotonic()
+        if now - self._last_heartbeat >= TASKING_CONSTANTS.HEARTBEAT_INTERVAL:
+            handle_worker_heartbeat(self.name)
+            self._last_heartbeat = now
+        if self.connection.set(TASKING_CONSTANTS.LIVENESS_CHECK_KEY, self.name, nx=True,
+                               ex=TASKING_CONSTANTS.LIVENESS_CHECK_INTERVAL):
+            check_worker_processes()
         return super().heartbeat(*args, **kwargs)
 
     def handle_warm_shutdown_request(self, *args, **kwargs):
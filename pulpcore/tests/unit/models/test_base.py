@@ -0,0 +1,65 @@
+from django.db import connection, models
+from django.test import TestCase
+from django.test.utils import isolate_apps
+
+from pulpcore.app.models import Content
+
+
+@isolate_apps('pulpcore.app')
+class TestBulkCreateDetails(TestCase):
+    def setUp(self):
+        class BulkTestContent(Content):
+            TYPE = 'bulk-test'
+            name = models.TextField()
+
+            class Meta:
+                app_label = 'pulp_app'
+
+        class BulkTestSubContent(BulkTestContent):
+            TYPE = 'bulk-test-sub'
+            extra = models.TextField()
+
+            class Meta:
+                app_label = 'pulp_app'
+
+        with connection.schema_editor() as editor:
+            editor.create_model(BulkTestContent)
+            editor.create_model(BulkTestSubContent)
+        self.detail_model = BulkTestContent
+        self.model = BulkTestSubContent
+
+    def test_bulk_create_details(self):
+        """
+        Test that the rows of each table down to the Detail model are created, with the primary key
+        of the Master rows.
+        """
+        units = self.model.bulk_create_details(
+            [self.model(name='a', extra='1'), self.model(name='b', extra='2')])
+
+        self.assertEqual(len({unit.pk for unit in units}), 2)
+        for unit in units:
+            self.assertIsNotNone(unit.pk)
+            self.assertEqual(unit.content_ptr_id, unit.pk)
+            self.assertEqual(unit.bulktestcontent_ptr_id, unit.pk)
+            self.assertEqual(unit.type, 'bulk-test-sub')
+            self.assertFalse(unit._state.adding)
+            self.assertEqual(unit._state.db, 'default')
+
+        self.assertEqual(
+            list(Content.objects.filter(pk__in=[unit.pk for unit in units]).order_by('pk')
+                 .values_list('pk', 'type')),
+            sorted((unit.pk, 'bulk-test-sub') for unit in units))
+        self.assertEqual(
+            set(self.detail_model.objects.values_list('pk', 'name')),
+            {(unit.pk, unit.name) for unit in units})
+        self.assertEqual(
+            set(self.model.objects.values_list('pk', 'name', 'extra')),
+            {(unit.pk, unit.name, unit.extra) for unit in units})
+
+    def test_type(self):
+        """
+        Test that a type already set is kept.
+        """
+        unit, = self.model.bulk_create_details([self.model(name='a', extra='1', type='other')])
+
+        self.assertEqual(Content.objects.get(pk=unit.pk).type, 'other')
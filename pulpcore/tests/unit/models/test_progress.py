@@ -0,0 +1,36 @@
+from django.test import TestCase
+
+from pulpcore.app.models import ProgressBar, ProgressReport, Task
+from pulpcore.constants import TASK_STATES
+
+
+class ProgressBarTestCase(TestCase):
+    def setUp(self):
+        self.task = Task.objects.create()
+
+    def test_increase_by(self):
+        """
+        Tests that increments are written to the database at once, when flushed.
+        """
+        progress_bar = ProgressBar.objects.create(message='test', task=self.task)
+        with self.assertNumQueries(0):
+            for i in range(10):
+                progress_bar.increment()
+            progress_bar.increase_by(5)
+
+        ProgressReport.flush_all()
+        self.assertEqual(ProgressBar.objects.get(pk=progress_bar.pk).done, 15)
+
+    def test_flush_after_exit(self):
+        """
+        Tests that a late flush does not overwrite the state saved when the context manager exits.
+        """
+        with ProgressBar(message='test', task=self.task) as progress_bar:
+            stale = ProgressBar.objects.get(pk=progress_bar.pk)
+            progress_bar.increase_by(2)
+        stale.increase_by(1)
+        ProgressReport.flush_all()
+
+        progress_bar.refresh_from_db()
+        self.assertEqual(progress_bar.state, TASK_STATES.COMPLETED)
+        self.assertEqual(progress_bar.done, 2)
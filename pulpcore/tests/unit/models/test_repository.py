@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from pulpcore.app.models import Content, Repository, RepositoryVersion
+
+
+class RepositoryVersionDiffTestCase(TestCase):
+    def setUp(self):
+        self.a, self.b, self.c = [Content.objects.create(type='test') for i in range(3)]
+        self.base_version = self.create_version('base', [self.a, self.b])
+        self.version = self.create_version('other', [self.b, self.c])
+
+    @staticmethod
+    def create_version(name, content):
+        repository = Repository.objects.create(name=name)
+        version = RepositoryVersion.objects.create(repository=repository, number=1)
+        version.add_content(Content.objects.filter(pk__in=[c.pk for c in content]))
+        return version
+
+    def test_added_and_removed(self):
+        """
+        Test that the content added and removed since a version of another repository is found.
+        """
+        self.assertEqual(list(self.version.added(self.base_version)), [self.c])
+        self.assertEqual(list(self.version.removed(self.base_version)), [self.a])
+
+    def test_diff(self):
+        """
+        Test that the diff counts the added and removed content by type.
+        """
+        self.assertEqual(self.version.diff(self.base_version),
+                         {'added': {'test': 1}, 'removed': {'test': 1}})
+        self.assertEqual(self.version.diff(self.version), {'added': {}, 'removed': {}})
@@ -1,3 +1,4 @@
+from django.db import IntegrityError
 from django.db.models import ProtectedError
 from django.test import TestCase
 
@@ -20,3 +21,77 @@ class TaskTestCase(TestCase):
         task.release_resources()
         task.delete()
         self.assertFalse(Task.objects.filter(id=task.id).exists())
+
+
+class WorkerLockResourcesTestCase(TestCase):
+    def setUp(self):
+        self.worker = Worker.objects.create(name="test_worker")
+        self.other_worker = Worker.objects.create(name="other_worker")
+
+    def test_lock_resources(self):
+        """
+        Tests that reservations are created for unreserved resources and reused when they are
+        already held by the same worker.
+        """
+        first_task = Task.objects.create()
+        second_task = Task.objects.create()
+        self.worker.lock_resources(first_task, ["a", "b"])
+        self.worker.lock_resources(second_task, ["b", "c"])
+
+        self.assertEqual(
+            set(self.worker.reservations.values_list('resource', flat=True)), {"a", "b", "c"})
+        self.assertEqual(first_task.reserved_resources.count(), 2)
+        self.assertEqual(second_task.reserved_resources.count(), 2)
+        self.assertEqual(ReservedResource.objects.get(resource="b").tasks.count(), 2)
+
+    def test_lock_resources_reserved_by_another_worker(self):
+        """
+        Tests that no reservation is made when any resource is held by another worker.
+        """
+        self.other_worker.lock_resources(Task.objects.create(), ["b"])
+        task = Task.objects.create()
+        with self.assertRaises(IntegrityError):
+            self.worker.lock_resources(task, ["a", "b"])
+
+        self.assertFalse(self.worker.reservations.exists())
+        self.assertFalse(task.reserved_resources.exists())
+
+    def test_release_resources(self):
+        """
+        Tests that releasing a task's resources only deletes the reservations no other task holds.
+        """
+        first_task = Task.objects.create()
+        second_task = Task.objects.create()
+        self.worker.lock_resources(first_task, ["a", "b"])
+        self.worker.lock_resources(second_task, ["b"])
+
+        first_task.release_resources()
+        self.assertFalse(first_task.reserved_resources.exists())
+        self.assertEqual(
+            list(self.worker.reservations.values_list('resource', flat=True)), ["b"])
+
+        second_task.release_resources()
+        self.assertFalse(ReservedResource.objects.exists())
+
+
+class WorkerSaveHeartbeatTestCase(TestCase):
+    def test_save_heartbeat(self):
+        """
+        Tests that a heartbeat creates the worker, and is recorded with a single query.
+        """
+        self.assertEqual(Worker.objects.save_heartbeat("test_worker"), (True, False))
+        with self.assertNumQueries(1):
+            self.assertEqual(Worker.objects.save_heartbeat("test_worker"), (False, False))
+        self.assertTrue(Worker.objects.get(name="test_worker").online)
+
+    def test_save_heartbeat_back_online(self):
+        """
+        Tests that a heartbeat brings a gracefully stopped worker back online.
+        """
+        Worker.objects.create(name="test_worker", gracefully_stopped=True, cleaned_up=True)
+        self.assertEqual(Worker.objects.save_heartbeat("test_worker"), (False, True))
+
+        worker = Worker.objects.get(name="test_worker")
+        self.assertFalse(worker.gracefully_stopped)
+        self.assertFalse(worker.cleaned_up)
+        self.assertTrue(worker.online)
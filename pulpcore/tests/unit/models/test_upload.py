@@ -0,0 +1,52 @@
+from datetime import timedelta
+import io
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from pulpcore.app.models import Upload
+
+
+class UploadTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.upload = Upload.create(10)
+
+    def test_write_chunks_in_any_order(self):
+        """
+        Test that chunks are written at their offsets, and the missing ranges are tracked.
+        """
+        self.upload.write_chunk(6, 4, io.BytesIO(b'6789'))
+        self.upload.write_chunk(0, 2, io.BytesIO(b'01'))
+        self.assertEqual(self.upload.missing_ranges(), [(2, 4)])
+
+        self.upload.write_chunk(2, 4, io.BytesIO(b'2345'))
+        self.assertEqual(self.upload.missing_ranges(), [])
+        with open(self.upload.file.path, 'rb') as file:
+            self.assertEqual(file.read(), b'0123456789')
+
+    def test_chunk_out_of_range(self):
+        """
+        Test that a chunk which does not fit in the file, or is cut short, is not recorded.
+        """
+        with self.assertRaises(ValueError):
+            self.upload.write_chunk(8, 4, io.BytesIO(b'8901'))
+        with self.assertRaises(ValueError):
+            self.upload.write_chunk(0, 4, io.BytesIO(b'01'))
+        self.assertEqual(self.upload.missing_ranges(), [(0, 10)])
+
+    def test_expired(self):
+        """
+        Test that an upload expires once it received no chunk for the expiration time.
+        """
+        past = timezone.now() - timedelta(days=2)
+        Upload.objects.filter(pk=self.upload.pk).update(last_updated=past)
+        self.assertEqual(list(Upload.expired()), [self.upload])
+
+        self.upload.write_chunk(0, 2, io.BytesIO(b'01'))
+        self.assertEqual(list(Upload.expired()), [])
@@ -0,0 +1,84 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from pulpcore.app.models import Artifact, Content, ContentArtifact
+from pulpcore.app.serializers import ContentSerializer
+from pulpcore.app.serializers.fields import ContentArtifactsField
+
+
+class TestContentListSerializer(TestCase):
+    def setUp(self):
+        self.request = Request(APIRequestFactory().get('/'))
+
+    def create_content(self, count):
+        for i in range(count):
+            content = Content.objects.create(type='test')
+            ContentArtifact.objects.create(content=content, relative_path='path-{i}'.format(i=i))
+            content.notes.mapping['key'] = 'value-{i}'.format(i=i)
+
+    def serialize(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = ContentSerializer(Content.objects.order_by('id'), many=True,
+                                     context={'request': self.request}).data
+        return data, len(queries)
+
+    def test_constant_query_count(self):
+        """
+        Test that the number of queries does not grow with the number of Content represented.
+        """
+        self.create_content(2)
+        data, queries = self.serialize()
+        self.assertEqual(len(data), 2)
+
+        self.create_content(4)
+        data, more_queries = self.serialize()
+        self.assertEqual(len(data), 6)
+        self.assertEqual(queries, more_queries)
+
+    def test_prefetched_relations(self):
+        """
+        Test that the prefetched artifacts and notes are represented.
+        """
+        self.create_content(1)
+        data, queries = self.serialize()
+        self.assertEqual(data[0]['artifacts'], {'path-0': None})
+        self.assertEqual(data[0]['notes'], {'key': 'value-0'})
+
+
+class TestContentArtifactsField(TestCase):
+    URL = '/pulp/api/v3/artifacts/1/'
+
+    def get_field(self, context):
+        class ArtifactsSerializer(serializers.Serializer):
+            artifacts = ContentArtifactsField()
+
+        return ArtifactsSerializer(context=context).fields['artifacts']
+
+    def test_artifacts_from_context(self):
+        """
+        Test that the Artifacts resolved beforehand are used without any query.
+        """
+        artifact = Artifact(pk=1)
+        field = self.get_field({'artifacts': {self.URL: artifact}})
+        with self.assertNumQueries(0):
+            self.assertEqual(field.run_validation({'path': self.URL}), {'path': artifact})
+
+    def test_missing_artifact(self):
+        """
+        Test that a URL of an Artifact which does not exist is rejected.
+        """
+        field = self.get_field({'artifacts': {}})
+        with self.assertRaises(serializers.ValidationError):
+            field.run_validation({'path': self.URL})
+
+    def test_absolute_path(self):
+        """
+        Test that an absolute relative path is rejected.
+        """
+        field = self.get_field({'artifacts': {self.URL: Artifact(pk=1)}})
+        with self.assertRaises(serializers.ValidationError):
+            field.run_validation({'/path': self.URL})
@@ -0,0 +1,75 @@
+import json
+import uuid
+
+import mock
+from django.test import TestCase
+from redis.exceptions import ConnectionError
+
+from pulpcore.app.models import ProgressReport
+from pulpcore.tasking import events
+
+
+@mock.patch('pulpcore.tasking.events.connection')
+class TestPublish(TestCase):
+    def published(self, pipe):
+        return [(call[0][0], json.loads(call[0][1])) for call in pipe.publish.call_args_list]
+
+    def test_publish_state(self, mock_connection):
+        """
+        Test that the state of each task is published on its channel with a single pipeline.
+        """
+        task_ids = [uuid.uuid4(), uuid.uuid4()]
+        events.publish_state(task_ids, 'running')
+
+        pipe = mock_connection.get_redis_connection.return_value.pipeline.return_value
+        self.assertEqual(self.published(pipe), [
+            (events.channel(task_id), {'event': 'state', 'task': str(task_id), 'state': 'running'})
+            for task_id in task_ids])
+        pipe.execute.assert_called_once_with()
+
+    def test_publish_state_pipeline(self, mock_connection):
+        """
+        Test that events published with a given pipeline are left for its owner to execute.
+        """
+        pipeline = mock.Mock()
+        events.publish_state([uuid.uuid4()], 'completed', pipeline)
+
+        self.assertEqual(pipeline.publish.call_count, 1)
+        pipeline.execute.assert_not_called()
+        mock_connection.get_redis_connection.assert_not_called()
+
+    def test_publish_progress(self, mock_connection):
+        """
+        Test that the progress reports of tasks are published, and the others are not.
+        """
+        task_id = uuid.uuid4()
+        reports = [ProgressReport(message='Downloading', state='running', done=3, task_id=task_id),
+                   ProgressReport(message='Not in a task', state='running')]
+        events.publish_progress(reports)
+
+        pipe = mock_connection.get_redis_connection.return_value.pipeline.return_value
+        self.assertEqual(self.published(pipe), [(events.channel(task_id), {
+            'event': 'progress',
+            'task': str(task_id),
+            'progress_report': {'message': 'Downloading', 'state': 'running', 'total': None,
+                                'done': 3, 'suffix': ''},
+        })])
+
+    def test_publish_nothing(self, mock_connection):
+        """
+        Test that Redis is not used when there is nothing to publish.
+        """
+        events.publish_state([], 'running')
+        events.publish_progress([ProgressReport(message='Not in a task')])
+
+        mock_connection.get_redis_connection.assert_not_called()
+
+    def test_redis_error(self, mock_connection):
+        """
+        Test that failing to publish is not an error.
+        """
+        pipe = mock_connection.get_redis_connection.return_value.pipeline.return_value
+        pipe.execute.side_effect = ConnectionError()
+
+        with self.assertLogs('pulpcore.tasking.events', 'WARNING'):
+            events.publish_state([uuid.uuid4()], 'running')
@@ -0,0 +1,189 @@
+import mock
+from django.test import TestCase
+
+from pulpcore.app.models import Task
+from pulpcore.constants import TASK_STATES
+from pulpcore.tasking import tasks
+from pulpcore.tasking.constants import TASKING_CONSTANTS
+
+
+def noop():
+    pass
+
+
+def task_ids():
+    return {str(pk) for pk in Task.objects.values_list('pk', flat=True)}
+
+
+@mock.patch('pulpcore.tasking.tasks.get_current_job', return_value=None)
+@mock.patch('pulpcore.tasking.tasks.Queue')
+@mock.patch('pulpcore.tasking.tasks.connection')
+class TestBulkDispatch(TestCase):
+    def test_dispatch_on_exit(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that the tasks are only created and enqueued once the block exits.
+        """
+        with tasks.bulk_dispatch():
+            first = tasks.enqueue_with_reservation(noop, ['a'])
+            second = tasks.enqueue_with_reservation(noop, ['b'])
+            self.assertFalse(Task.objects.exists())
+            mock_queue.return_value.enqueue_job.assert_not_called()
+
+        self.assertEqual(task_ids(), {first.id, second.id})
+        self.assertEqual(set(Task.objects.values_list('state', flat=True)), {TASK_STATES.WAITING})
+        self.assertEqual(mock_queue.return_value.enqueue_job.call_count, 2)
+        pipe = mock_connection.get_redis_connection.return_value.pipeline.return_value
+        pipe.__enter__.return_value.execute.assert_called_once_with()
+
+    def test_discard_on_exception(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that the tasks collected are discarded when the block raises.
+        """
+        with self.assertRaises(RuntimeError):
+            with tasks.bulk_dispatch():
+                tasks.enqueue_with_reservation(noop, ['a'])
+                raise RuntimeError()
+
+        self.assertFalse(Task.objects.exists())
+        mock_queue.return_value.enqueue_job.assert_not_called()
+
+        # the next enqueue is dispatched right away
+        job = tasks.enqueue_with_reservation(noop, ['a'])
+        self.assertEqual(task_ids(), {job.id})
+
+    def test_nested(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that nested blocks dispatch everything when the outermost block exits.
+        """
+        with tasks.bulk_dispatch():
+            with tasks.bulk_dispatch():
+                tasks.enqueue_with_reservation(noop, ['a'])
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_dispatch_with_prerequisites(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that a task with prerequisites is deferred, and its dependencies recorded.
+        """
+        with tasks.bulk_dispatch():
+            first = tasks.enqueue_with_reservation(noop, ['a'])
+            second = tasks.enqueue_with_reservation(noop, ['b'], depends_on=[first])
+
+        dependencies = Task.dependencies.through.objects.values_list('from_task_id', 'to_task_id')
+        self.assertEqual([(str(from_id), str(to_id)) for from_id, to_id in dependencies],
+                         [(second.id, first.id)])
+        pipe = mock_connection.get_redis_connection.return_value.pipeline.return_value
+        pipe.__enter__.return_value.sadd.assert_called_once_with(TASKING_CONSTANTS.DEFERRED_KEY,
+                                                                 second.id)
+        # the first task, and the check of the deferred one in case its prerequisites are done
+        enqueued = [call[0][0] for call in mock_queue.return_value.enqueue_job.call_args_list]
+        self.assertEqual(len(enqueued), 2)
+        self.assertEqual(enqueued[1].func, tasks._dispatch_ready_tasks)
+        self.assertEqual(enqueued[1].args, ([second.id],))
+
+
+@mock.patch('pulpcore.tasking.tasks.events')
+@mock.patch('pulpcore.tasking.tasks.Job')
+@mock.patch('pulpcore.tasking.tasks.Queue')
+@mock.patch('pulpcore.tasking.tasks.connection')
+class TestDispatchReadyTasks(TestCase):
+    def create_task(self, state=TASK_STATES.WAITING, depends_on=()):
+        task = Task.objects.create(state=state)
+        task.dependencies.set(depends_on)
+        return task
+
+    def test_dispatch(self, mock_connection, mock_queue, mock_job, mock_events):
+        """
+        Test that a waiting task is dispatched once all of its prerequisites completed.
+        """
+        prerequisites = [self.create_task(TASK_STATES.COMPLETED) for i in range(2)]
+        task = self.create_task(depends_on=prerequisites)
+
+        tasks._dispatch_ready_tasks([task.pk])
+
+        redis_conn = mock_connection.get_redis_connection.return_value
+        redis_conn.srem.assert_called_once_with(TASKING_CONSTANTS.DEFERRED_KEY, str(task.pk))
+        mock_job.fetch.assert_called_once_with(tasks._deferred_job_id(task.pk),
+                                               connection=redis_conn)
+        mock_queue.return_value.enqueue_job.assert_called_once_with(mock_job.fetch.return_value)
+        task.refresh_from_db()
+        self.assertEqual(task.state, TASK_STATES.WAITING)
+
+    def test_unfinished_prerequisite(self, mock_connection, mock_queue, mock_job, mock_events):
+        """
+        Test that a task is left alone while any of its prerequisites is not finished.
+        """
+        completed = self.create_task(TASK_STATES.COMPLETED)
+        running = self.create_task(TASK_STATES.RUNNING)
+        task = self.create_task(depends_on=[completed, running])
+
+        tasks._dispatch_ready_tasks([task.pk])
+
+        mock_connection.get_redis_connection.return_value.srem.assert_not_called()
+        mock_queue.return_value.enqueue_job.assert_not_called()
+        task.refresh_from_db()
+        self.assertEqual(task.state, TASK_STATES.WAITING)
+
+    def test_already_released(self, mock_connection, mock_queue, mock_job, mock_events):
+        """
+        Test that a task released by a concurrent call is not dispatched twice.
+        """
+        task = self.create_task(depends_on=[self.create_task(TASK_STATES.COMPLETED)])
+        mock_connection.get_redis_connection.return_value.srem.return_value = 0
+
+        tasks._dispatch_ready_tasks([task.pk])
+
+        mock_queue.return_value.enqueue_job.assert_not_called()
+
+    def test_skip_cascade(self, mock_connection, mock_queue, mock_job, mock_events):
+        """
+        Test that a failed or canceled prerequisite skips its dependents, and theirs in turn.
+        """
+        for state in (TASK_STATES.FAILED, TASK_STATES.CANCELED):
+            with self.subTest(state=state):
+                prerequisite = self.create_task(state)
+                task = self.create_task(depends_on=[prerequisite])
+                dependent = self.create_task(depends_on=[task])
+                other = self.create_task(TASK_STATES.COMPLETED)
+                # the other prerequisite of the dependent does not prevent the skip
+                dependent.dependencies.add(other)
+
+                tasks._dispatch_ready_tasks([task.pk])
+
+                for skipped in (task, dependent):
+                    skipped.refresh_from_db()
+                    self.assertEqual(skipped.state, TASK_STATES.SKIPPED)
+                    self.assertIsNotNone(skipped.finished_at)
+                    mock_job.assert_any_call(id=tasks._deferred_job_id(skipped.pk),
+                                             connection=mock.ANY)
+                mock_queue.return_value.enqueue_job.assert_not_called()
+                mock_events.publish_state.assert_any_call([dependent.pk], TASK_STATES.SKIPPED)
+
+
+@mock.patch('pulpcore.tasking.tasks.get_current_job', return_value=None)
+@mock.patch('pulpcore.tasking.tasks.Queue')
+@mock.patch('pulpcore.tasking.tasks.connection')
+class TestPrerequisiteCompletedFirst(TestCase):
+    def test_prerequisite_completed_before_dispatch(self, mock_connection, mock_queue,
+                                                    mock_current_job):
+        """
+        Test that a task whose prerequisite completed before the task was saved is dispatched.
+
+        No dependent of the prerequisite existed when it completed, so the check enqueued by
+        _dispatch() is the one that dispatches the task.
+        """
+        prerequisite = Task.objects.create(state=TASK_STATES.COMPLETED)
+        job = tasks.enqueue_with_reservation(noop, ['a'], depends_on=[prerequisite])
+
+        check = mock_queue.return_value.enqueue_job.call_args[0][0]
+        self.assertEqual(check.func, tasks._dispatch_ready_tasks)
+        self.assertEqual(check.args, ([job.id],))
+
+        mock_queue.reset_mock()
+        redis_conn = mock_connection.get_redis_connection.return_value
+        redis_conn.srem.return_value = 1
+        with mock.patch('pulpcore.tasking.tasks.Job') as mock_job:
+            tasks._dispatch_ready_tasks(*check.args)
+        mock_job.fetch.assert_called_once_with(tasks._deferred_job_id(job.id),
+                                               connection=redis_conn)
+        mock_queue.return_value.enqueue_job.assert_called_once_with(mock_job.fetch.return_value)
@@ -0,0 +1,125 @@
+import mock
+from django.test import TestCase
+
+from pulpcore.app.models import Task, Worker
+from pulpcore.constants import TASK_STATES
+from pulpcore.tasking import util
+from pulpcore.tasking.constants import TASKING_CONSTANTS
+
+
+@mock.patch('pulpcore.tasking.util.Queue')
+@mock.patch('pulpcore.tasking.util.connection')
+class TestDispatchDependents(TestCase):
+    def test_dependents(self, mock_connection, mock_queue):
+        """
+        Test that the dependents of finished tasks are checked by the resource manager at once.
+        """
+        first = Task.objects.create(state=TASK_STATES.COMPLETED)
+        second = Task.objects.create(state=TASK_STATES.FAILED)
+        dependent = Task.objects.create()
+        dependent.dependencies.set([first, second])
+
+        util.dispatch_dependents(first.pk, second.pk)
+
+        mock_queue.assert_called_once_with(
+            'resource_manager', connection=mock_connection.get_redis_connection.return_value)
+        mock_queue.return_value.enqueue.assert_called_once_with(
+            'pulpcore.tasking.tasks._dispatch_ready_tasks', args=([str(dependent.pk)],))
+
+    def test_no_dependents(self, mock_connection, mock_queue):
+        """
+        Test that nothing is enqueued for tasks without dependents.
+        """
+        util.dispatch_dependents(Task.objects.create(state=TASK_STATES.COMPLETED).pk)
+        mock_queue.return_value.enqueue.assert_not_called()
+
+
+@mock.patch('pulpcore.tasking.util.events')
+@mock.patch('pulpcore.tasking.util.StartedJobRegistry')
+@mock.patch('pulpcore.tasking.util.Queue')
+@mock.patch('pulpcore.tasking.util.connection')
+class TestCancelTasks(TestCase):
+    def setUp(self):
+        self.workers = [Worker.objects.create(name='worker-{i}'.format(i=i)) for i in range(2)]
+
+    def create_tasks(self, statuses, mock_connection):
+        """
+        Create a running task on each worker, with their jobs in the given rq statuses.
+
+        Returns:
+            tuple: The tasks and the pipeline the mocked redis connection returns.
+        """
+        tasks = [Task.objects.create(state=TASK_STATES.RUNNING, worker=worker)
+                 for worker in self.workers[:len(statuses)]]
+        pipe = mock_connection.get_redis_connection.return_value.pipeline.return_value
+        pipe = pipe.__enter__.return_value
+        running = statuses.count('started')
+        # the statuses of the jobs, then the receivers of the kill requests followed by the
+        # results of the deletions
+        pipe.execute.side_effect = [[status.encode() for status in statuses],
+                                    [1] * running + [0] * 3 * len(tasks)]
+        return tasks, pipe
+
+    def assert_canceled(self, tasks, mock_events):
+        for task in tasks:
+            task.refresh_from_db()
+            self.assertEqual(task.state, TASK_STATES.CANCELED)
+        mock_events.publish_state.assert_called_once_with([task.pk for task in tasks],
+                                                          TASK_STATES.CANCELED)
+
+    def test_job_not_running(self, mock_connection, mock_queue, mock_registry, mock_events):
+        """
+        Test that a job which is not running is deleted without asking its worker to kill it.
+        """
+        tasks, pipe = self.create_tasks(['queued'], mock_connection)
+
+        util.cancel_tasks(tasks)
+
+        pipe.publish.assert_not_called()
+        mock_connection.get_redis_connection.return_value.blpop.assert_not_called()
+        self.assertEqual(pipe.delete.call_count, 1)
+        self.assert_canceled(tasks, mock_events)
+
+    def test_wait_for_acknowledgements(self, mock_connection, mock_queue, mock_registry,
+                                       mock_events):
+        """
+        Test that the workers of running jobs are asked to kill them, and that the kills are
+        waited for on every worker.
+        """
+        tasks, pipe = self.create_tasks(['started', 'started'], mock_connection)
+        redis_conn = mock_connection.get_redis_connection.return_value
+        ack_keys = [TASKING_CONSTANTS.KILL_ACK_KEY.format(job=task.pk) for task in tasks]
+        redis_conn.blpop.side_effect = [(key.encode(), b'1') for key in ack_keys]
+
+        util.cancel_tasks(tasks)
+
+        for worker, task in zip(self.workers, tasks):
+            pipe.publish.assert_any_call(TASKING_CONSTANTS.KILL_CHANNEL.format(worker=worker.name),
+                                         str(task.pk))
+        self.assertEqual(redis_conn.blpop.call_count, 2)
+        self.assert_canceled(tasks, mock_events)
+
+    def test_no_wait(self, mock_connection, mock_queue, mock_registry, mock_events):
+        """
+        Test that the kill of a running job is not waited for with wait=False.
+        """
+        tasks, pipe = self.create_tasks(['started'], mock_connection)
+
+        util.cancel_tasks(tasks, wait=False)
+
+        pipe.publish.assert_called_once_with(
+            TASKING_CONSTANTS.KILL_CHANNEL.format(worker=self.workers[0].name), str(tasks[0].pk))
+        mock_connection.get_redis_connection.return_value.blpop.assert_not_called()
+        self.assert_canceled(tasks, mock_events)
+
+    def test_acknowledgement_timeout(self, mock_connection, mock_queue, mock_registry,
+                                     mock_events):
+        """
+        Test that the tasks are canceled even when a worker does not acknowledge the kill.
+        """
+        tasks, pipe = self.create_tasks(['started'], mock_connection)
+        mock_connection.get_redis_connection.return_value.blpop.return_value = None
+
+        util.cancel_tasks(tasks)
+
+        self.assert_canceled(tasks, mock_events)
@@ -0,0 +1,131 @@
+import signal
+import threading
+from unittest import TestCase
+
+import mock
+
+from pulpcore.tasking.constants import TASKING_CONSTANTS
+from pulpcore.tasking.worker import PulpWorker
+
+
+class StopListening(Exception):
+    pass
+
+
+class TestKillRequests(TestCase):
+    def setUp(self):
+        # Only the attributes used by the kill protocol, without connecting to Redis
+        self.worker = PulpWorker.__new__(PulpWorker)
+        self.worker.name = 'worker'
+        self.worker.connection = mock.MagicMock()
+        self.worker._horse_lock = threading.Lock()
+        self.worker._horse_job_id = None
+        self.worker._horse_killed = False
+        self.worker._horse_pid = 1234
+        self.pipe = self.worker.connection.pipeline.return_value.__enter__.return_value
+
+    def listen(self, *job_ids):
+        pubsub = mock.MagicMock()
+        pubsub.listen.return_value = [{'data': job_id.encode()} for job_id in job_ids]
+        self.worker.connection.pubsub.side_effect = [pubsub, StopListening()]
+        with self.assertRaises(StopListening):
+            self.worker.listen_for_kill_requests()
+        pubsub.subscribe.assert_called_once_with(
+            TASKING_CONSTANTS.KILL_CHANNEL.format(worker='worker'))
+
+    @mock.patch('pulpcore.tasking.worker.os.kill')
+    def test_kill_running_job(self, mock_kill):
+        """
+        Test that the work horse performing the job is killed, and the kill not acknowledged yet.
+        """
+        self.worker._horse_job_id = 'job'
+        self.listen('job')
+
+        mock_kill.assert_called_once_with(1234, signal.SIGKILL)
+        self.assertTrue(self.worker._horse_killed)
+        self.pipe.rpush.assert_not_called()
+
+    @mock.patch('pulpcore.tasking.worker.os.kill')
+    def test_job_not_running(self, mock_kill):
+        """
+        Test that the kill of a job which is not running is acknowledged right away.
+        """
+        self.worker._horse_job_id = 'other-job'
+        self.listen('job')
+
+        mock_kill.assert_not_called()
+        key = TASKING_CONSTANTS.KILL_ACK_KEY.format(job='job')
+        self.pipe.rpush.assert_called_once_with(key, 1)
+        self.pipe.expire.assert_called_once_with(key, TASKING_CONSTANTS.KILL_TIMEOUT)
+
+    @mock.patch.object(PulpWorker, 'execute_job_in_pooled_horse')
+    def test_acknowledge_after_job(self, mock_execute):
+        """
+        Test that the kill of a job is acknowledged once its work horse is done with it.
+        """
+        def killed(job, queue):
+            self.worker._horse_job_id = job.id
+            self.worker._horse_killed = True
+
+        mock_execute.side_effect = killed
+        self.worker.pool_work_horses = True
+        job = mock.Mock(id='job')
+        self.worker.execute_job(job, mock.Mock())
+
+        self.pipe.rpush.assert_called_once_with(TASKING_CONSTANTS.KILL_ACK_KEY.format(job='job'),
+                                                1)
+        self.assertIsNone(self.worker._horse_job_id)
+        self.assertFalse(self.worker._horse_killed)
+
+
+class TestPooledHorse(TestCase):
+    def setUp(self):
+        self.worker = PulpWorker.__new__(PulpWorker)
+        self.worker._horse_lock = threading.Lock()
+        self.worker._horse_job_id = None
+        self.worker._horse_killed = False
+        self.worker._pooled_horse = (1234, 10, 11, 0)
+        self.worker.job_monitoring_interval = 5
+        self.horse_job_ids = []
+
+        def spawn():
+            # The job of the previous work horse must not be attributed to the new one
+            self.horse_job_ids.append(self.worker._horse_job_id)
+            self.worker._pooled_horse = (5678, 20, 21, 0)
+
+        def stop():
+            self.worker._pooled_horse = None
+
+        for name, side_effect in (('spawn_pooled_horse', spawn), ('stop_pooled_horse', stop),
+                                  ('set_state', None)):
+            patcher = mock.patch.object(PulpWorker, name, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @mock.patch('pulpcore.tasking.worker.select.select', return_value=([11], [], []))
+    @mock.patch('pulpcore.tasking.worker.os')
+    def test_job_cleared_before_respawn(self, mock_os, mock_select):
+        """
+        Test that the job is no longer the work horse's when the work horse is replaced.
+        """
+        mock_os.read.return_value = b'1'
+        with mock.patch.dict('pulpcore.tasking.worker.settings.WORK_HORSE_POOL', {'MAX_JOBS': 1}):
+            self.worker.execute_job_in_pooled_horse(mock.Mock(id='job'), mock.Mock())
+
+        self.assertEqual(self.horse_job_ids, [None])
+        self.assertIsNone(self.worker._horse_job_id)
+
+    @mock.patch('pulpcore.tasking.worker.select.select', return_value=([21], [], []))
+    @mock.patch('pulpcore.tasking.worker.os')
+    def test_respawn_on_broken_pipe(self, mock_os, mock_select):
+        """
+        Test that a work horse which exited while idle is replaced, and the job sent to the new one.
+        """
+        mock_os.write.side_effect = [BrokenPipeError(), None]
+        mock_os.read.return_value = b'1'
+        with mock.patch.dict('pulpcore.tasking.worker.settings.WORK_HORSE_POOL', {'MAX_JOBS': 10}):
+            self.worker.execute_job_in_pooled_horse(mock.Mock(id='job'), mock.Mock())
+
+        self.assertEqual([call[0][0] for call in mock_os.write.call_args_list], [10, 20])
+        mock_os.read.assert_called_once_with(21, 1)
+        self.assertEqual(self.worker._pooled_horse, (5678, 20, 21, 1))
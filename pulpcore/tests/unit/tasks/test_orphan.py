@@ -0,0 +1,121 @@
+from datetime import timedelta
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+import mock
+
+from pulpcore.app.models import (
+    Content,
+    ContentArtifact,
+    Notes,
+    ProgressReport,
+    Task,
+    Upload,
+    touch
+)
+from pulpcore.app.tasks import orphan
+from pulpcore.app.tasks.orphan import _delete, _snapshot
+from pulpcore.constants import TASK_STATES
+
+
+class DeleteTestCase(TestCase):
+    def test_delete_cascades(self):
+        """
+        Tests that the records depending on the deleted ones are deleted along, generic relations
+        included.
+        """
+        content = Content.objects.create(type='test')
+        kept = Content.objects.create(type='test')
+        content.notes.create(key='key', value='value')
+        kept.notes.create(key='key', value='value')
+        ContentArtifact.objects.create(content=content, relative_path='a')
+
+        _delete(Content.objects.filter(pk=content.pk))
+
+        self.assertFalse(Content.objects.filter(pk=content.pk).exists())
+        self.assertFalse(ContentArtifact.objects.filter(content_id=content.pk).exists())
+        self.assertEqual(Notes.objects.count(), 1)
+        self.assertTrue(Content.objects.filter(pk=kept.pk).exists())
+
+
+class SnapshotTestCase(TestCase):
+    def test_snapshot(self):
+        """
+        Tests that orphans touched after the earliest running task started are protected.
+        """
+        now = timezone.now()
+        self.assertEqual(_snapshot(now), now)
+
+        started_at = now - timedelta(hours=1)
+        Task.objects.create(state=TASK_STATES.RUNNING, started_at=started_at)
+        Task.objects.create(state=TASK_STATES.COMPLETED, started_at=now - timedelta(days=1))
+        self.assertEqual(_snapshot(now), started_at)
+
+    def test_touch(self):
+        """
+        Tests that touching Content moves its timestamp past the snapshot.
+        """
+        content = Content.objects.create(type='test')
+        snapshot = _snapshot(timezone.now())
+        touch(Content.objects.filter(pk=content.pk))
+        content.refresh_from_db()
+        self.assertGreater(content.timestamp_of_interest, snapshot)
+
+
+class OrphanCleanupTestCase(TestCase):
+    def setUp(self):
+        # The progress reports belong to the task of the cleanup
+        task = Task.objects.create(state=TASK_STATES.RUNNING)
+        patcher = mock.patch('pulpcore.app.models.task.get_current_job',
+                             return_value=mock.Mock(id=str(task.pk)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class ContinueTestCase(OrphanCleanupTestCase):
+    @mock.patch('pulpcore.tasking.tasks.enqueue_with_reservation')
+    @mock.patch.object(orphan, 'TIME_BUDGET', -1)
+    def test_continue(self, enqueue_with_reservation):
+        """
+        Tests that a cleanup running out of time continues in a new task, and that the progress
+        report of the unfinished step is not saved as completed.
+        """
+        content = Content.objects.create(type='test')
+        Content.objects.filter(pk=content.pk).update(
+            timestamp_of_interest=timezone.now() - timedelta(days=1))
+
+        orphan.orphan_cleanup()
+
+        enqueue_with_reservation.assert_called_once_with(
+            orphan.orphan_cleanup, [orphan.ORPHAN_CLEANUP_RESOURCE])
+        report = ProgressReport.objects.get()
+        self.assertEqual(report.state, TASK_STATES.CANCELED)
+        self.assertEqual(report.done, 1)
+        self.assertIn('continued in a new task', report.message)
+
+
+class UploadCleanupTestCase(OrphanCleanupTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_expired_uploads(self):
+        """
+        Tests that the uploads which received no chunk for the expiration time are deleted, along
+        with their files.
+        """
+        expired, recent = Upload.create(10), Upload.create(10)
+        Upload.objects.filter(pk=expired.pk).update(
+            last_updated=timezone.now() - timedelta(days=2))
+
+        orphan.orphan_cleanup()
+
+        self.assertEqual(list(Upload.objects.all()), [recent])
+        self.assertFalse(os.path.exists(expired.file.path))
+        self.assertTrue(os.path.exists(recent.file.path))
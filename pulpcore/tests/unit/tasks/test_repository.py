@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+import mock
+from django.test import TestCase
+from django.utils import timezone
+
+from pulpcore.app.models import Content, Repository, RepositoryVersion, Task
+from pulpcore.app.tasks.repository import add_and_remove
+
+
+class AddAndRemoveTestCase(TestCase):
+    def setUp(self):
+        task = Task.objects.create()
+        patcher = mock.patch('pulpcore.app.models.task.get_current_job',
+                             return_value=mock.Mock(id=str(task.pk)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.repository = Repository.objects.create(name='foo')
+        self.content = Content.objects.create(type='test')
+        Content.objects.filter(pk=self.content.pk).update(
+            timestamp_of_interest=timezone.now() - timedelta(days=1))
+
+    def test_touch(self):
+        """
+        Test that the content added is touched, so orphan cleanup does not remove it.
+        """
+        before = timezone.now()
+        add_and_remove(self.repository.pk, [self.content.pk], [])
+
+        self.content.refresh_from_db()
+        self.assertGreaterEqual(self.content.timestamp_of_interest, before)
+        version = RepositoryVersion.objects.get(repository=self.repository, number=1)
+        self.assertEqual(list(version.content), [self.content])
+
+    def test_missing(self):
+        """
+        Test that no version is created when some of the content to add does not exist.
+        """
+        missing = Content.objects.create(type='test')
+        missing.delete()
+
+        with self.assertRaises(ValueError):
+            add_and_remove(self.repository.pk, [self.content.pk, missing.pk], [])
+
+        self.assertFalse(RepositoryVersion.objects.filter(repository=self.repository).exists())
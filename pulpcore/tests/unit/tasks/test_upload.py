@@ -0,0 +1,94 @@
+from datetime import timedelta
+import hashlib
+import io
+import os
+import tempfile
+
+import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from pulpcore.app.models import Artifact, CreatedResource, Task, Upload
+from pulpcore.app.tasks.upload import commit
+from pulpcore.exceptions import DigestValidationError
+
+
+class CommitTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        task = Task.objects.create()
+        patcher = mock.patch('pulpcore.app.models.task.get_current_job',
+                             return_value=mock.Mock(id=str(task.pk)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.upload = Upload.create(10)
+        self.upload.write_chunk(0, 10, io.BytesIO(b'0123456789'))
+        self.sha256 = hashlib.sha256(b'0123456789').hexdigest()
+
+    def test_commit(self):
+        """
+        Test that the Artifact of the file is created, and the upload deleted.
+        """
+        commit(self.upload.pk, self.sha256)
+
+        artifact = Artifact.objects.get()
+        self.assertEqual(artifact.sha256, self.sha256)
+        self.assertEqual(artifact.size, 10)
+        with artifact.file.open('rb') as file:
+            self.assertEqual(file.read(), b'0123456789')
+        self.assertEqual(CreatedResource.objects.get().content_object, artifact)
+        self.assertFalse(Upload.objects.exists())
+
+    def test_digest_mismatch(self):
+        """
+        Test that no Artifact is created when the file does not have the expected digest.
+        """
+        with self.assertRaises(DigestValidationError):
+            commit(self.upload.pk, hashlib.sha256(b'other').hexdigest())
+
+        self.assertFalse(Artifact.objects.exists())
+        self.assertTrue(Upload.objects.filter(pk=self.upload.pk).exists())
+        self.assertTrue(os.path.exists(self.upload.file.path))
+
+    def test_existing_artifact(self):
+        """
+        Test that an Artifact already stored with the same sha256 is used, and touched so orphan
+        cleanup does not remove it.
+        """
+        path = os.path.join(self.media_root, 'stored')
+        with open(path, 'wb') as file:
+            file.write(b'0123456789')
+        existing = Artifact.init_and_validate(path)
+        existing.save()
+        Artifact.objects.filter(pk=existing.pk).update(
+            timestamp_of_interest=timezone.now() - timedelta(days=1))
+        before = timezone.now()
+
+        commit(self.upload.pk)
+
+        existing.refresh_from_db()
+        self.assertGreaterEqual(existing.timestamp_of_interest, before)
+
+        self.assertEqual(list(Artifact.objects.all()), [existing])
+        self.assertEqual(CreatedResource.objects.get().content_object, existing)
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(self.upload.file.path))
+
+    def test_missing_chunks(self):
+        """
+        Test that an upload missing some chunks is not committed.
+        """
+        upload = Upload.create(10)
+        upload.write_chunk(0, 4, io.BytesIO(b'0123'))
+
+        with self.assertRaises(ValueError):
+            commit(upload.pk)
+
+        self.assertFalse(Artifact.objects.exists())
@@ -0,0 +1,41 @@
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from pulpcore.app.models import Repository
+from pulpcore.app.pagination import IDCursorPagination
+
+
+class TestIDCursorPagination(TestCase):
+    def setUp(self):
+        for i in range(5):
+            Repository.objects.create(name='repo-{i}'.format(i=i))
+        self.queryset = Repository.objects.all()
+
+    def paginate(self, url):
+        paginator = IDCursorPagination()
+        request = Request(APIRequestFactory().get(url))
+        page = paginator.paginate_queryset(self.queryset, request)
+        return paginator.get_paginated_response([repo.name for repo in page]).data
+
+    def test_pages_by_id(self):
+        """
+        Test that following the next links walks through all objects in ID order.
+        """
+        names = []
+        data = self.paginate('/?page_size=2')
+        while True:
+            self.assertEqual(data['count'], 5)
+            names.extend(data['results'])
+            if not data['next']:
+                break
+            data = self.paginate(data['next'])
+        self.assertEqual(names, ['repo-{i}'.format(i=i) for i in range(5)])
+
+    def test_count_opt_out(self):
+        """
+        Test that the count is null when the request opts out of it.
+        """
+        data = self.paginate('/?page_size=2&count=false')
+        self.assertIsNone(data['count'])
+        self.assertEqual(len(data['results']), 2)
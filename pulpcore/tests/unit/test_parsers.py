@@ -0,0 +1,43 @@
+import hashlib
+import io
+import tarfile
+from unittest import TestCase
+
+from rest_framework.exceptions import ParseError
+
+from pulpcore.app.parsers import TarParser
+
+
+class TestTarParser(TestCase):
+    def test_parse(self):
+        """
+        Test that the regular files of a streamed archive are returned, with their digests.
+        """
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+            directory = tarfile.TarInfo('dir')
+            directory.type = tarfile.DIRTYPE
+            tar.addfile(directory)
+            for name, data in (('dir/a.txt', b'a'), ('b.txt', b'bb')):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        archive.seek(0)
+
+        files = TarParser().parse(archive).files.getlist('file')
+        try:
+            self.assertEqual([file.name for file in files], ['a.txt', 'b.txt'])
+            self.assertEqual([file.size for file in files], [1, 2])
+            self.assertEqual(files[1].read(), b'bb')
+            self.assertEqual(files[1].hashers['sha256'].hexdigest(),
+                             hashlib.sha256(b'bb').hexdigest())
+        finally:
+            for file in files:
+                file.close()
+
+    def test_not_an_archive(self):
+        """
+        Test that a body which is not an archive is a parse error.
+        """
+        with self.assertRaises(ParseError):
+            TarParser().parse(io.BytesIO(b'not an archive'))
@@ -0,0 +1,108 @@
+import json
+
+import mock
+from django.test import TestCase
+
+from pulpcore.app.models import Content, ContentArtifact, ProgressReport, Task
+from pulpcore.app.response import ContentStreamResponse, TaskEventStreamResponse
+from pulpcore.constants import API_ROOT, TASK_STATES
+from pulpcore.tasking import events
+
+
+class TestContentStreamResponse(TestCase):
+    def setUp(self):
+        self.content = [Content.objects.create(type='test') for i in range(5)]
+        ContentArtifact.objects.create(content=self.content[0], relative_path='path')
+
+    @mock.patch.object(ContentStreamResponse, 'chunk_size', 2)
+    def test_stream(self):
+        """
+        Test that each unit is streamed as a line of JSON, across chunks.
+        """
+        response = ContentStreamResponse(Content.objects.all())
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        units = [json.loads(line) for line in lines]
+
+        self.assertEqual(len(units), 5)
+        self.assertEqual([unit['type'] for unit in units], ['test'] * 5)
+        self.assertEqual(units[0]['artifacts'], {'path': None})
+        self.assertEqual(units[1]['artifacts'], {})
+
+
+@mock.patch('pulpcore.tasking.events.connection')
+@mock.patch('pulpcore.app.response.get_redis_connection')
+class TestTaskEventStreamResponse(TestCase):
+    def setUp(self):
+        self.completed = Task.objects.create(state=TASK_STATES.COMPLETED)
+        self.running = Task.objects.create(state=TASK_STATES.RUNNING)
+
+    def href(self, task):
+        return '/{api_root}tasks/{pk}/'.format(api_root=API_ROOT, pk=task.pk)
+
+    def message(self, event):
+        return {'type': 'message', 'data': json.dumps(event).encode()}
+
+    def stream(self, tasks):
+        response = TaskEventStreamResponse(tasks)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = b''.join(response.streaming_content).decode().split('\n\n')
+        received = []
+        for chunk in filter(None, chunks):
+            name, data = chunk.split('\n', 1)
+            received.append((name[len('event: '):], json.loads(data[len('data: '):])))
+        return received
+
+    def test_stream(self, mock_get_redis_connection, mock_connection):
+        """
+        Test that the stream starts with the current state of the tasks and ends once all of them
+        reached a final state.
+        """
+        ProgressReport.objects.create(message='Downloading', state=TASK_STATES.RUNNING, done=1,
+                                      task=self.running)
+        pubsub = mock_get_redis_connection.return_value.pubsub.return_value
+        report = {'message': 'Downloading', 'state': TASK_STATES.COMPLETED, 'total': 2, 'done': 2,
+                  'suffix': ''}
+        pubsub.get_message.side_effect = [
+            None,
+            self.message({'event': 'progress', 'task': str(self.running.pk),
+                          'progress_report': report}),
+            self.message({'event': 'state', 'task': str(self.running.pk),
+                          'state': TASK_STATES.COMPLETED}),
+        ]
+
+        received = self.stream(Task.objects.all())
+
+        pubsub.subscribe.assert_called_once_with(
+            *[events.channel(task.pk) for task in Task.objects.all()])
+        initial = received[:3]
+        self.assertIn(('state', {'task': self.href(self.completed), 'state': 'completed'}),
+                      initial)
+        self.assertIn(('state', {'task': self.href(self.running), 'state': 'running'}), initial)
+        self.assertIn(('progress', {'task': self.href(self.running), 'progress_report': {
+            'message': 'Downloading', 'state': 'running', 'total': None, 'done': 1, 'suffix': ''}}),
+            initial)
+        self.assertEqual(received[3:], [
+            ('progress', {'task': self.href(self.running), 'progress_report': report}),
+            ('state', {'task': self.href(self.running), 'state': 'completed'}),
+        ])
+        self.assertEqual(pubsub.get_message.call_count, 3)
+        pubsub.close.assert_called_once_with()
+
+    def test_finished(self, mock_get_redis_connection, mock_connection):
+        """
+        Test that the stream of finished tasks ends after their current state.
+        """
+        received = self.stream(Task.objects.filter(pk=self.completed.pk))
+
+        self.assertEqual(received, [('state', {'task': self.href(self.completed),
+                                               'state': 'completed'})])
+        pubsub = mock_get_redis_connection.return_value.pubsub.return_value
+        pubsub.get_message.assert_not_called()
+
+    def test_no_tasks(self, mock_get_redis_connection, mock_connection):
+        """
+        Test that an empty stream does not subscribe to anything.
+        """
+        self.assertEqual(self.stream(Task.objects.none()), [])
+        mock_get_redis_connection.assert_not_called()
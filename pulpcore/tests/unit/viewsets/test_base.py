@@ -110,6 +110,39 @@ class TestGetResource(TestCase):
             )
 
 
+class TestGetResources(TestCase):
+    def href(self, repo):
+        return "/{api_root}repositories/{pk}/".format(api_root=API_ROOT, pk=repo.pk)
+
+    def test_no_errors(self):
+        """
+        Tests that get_resources() resolves many URIs with one query, in the order of the URIs.
+        """
+        repos = [models.Repository.objects.create(name=name) for name in ('foo', 'bar', 'baz')]
+        hrefs = [self.href(repo) for repo in reversed(repos)]
+        with self.assertNumQueries(1):
+            resources = viewsets.NamedModelViewSet.get_resources(hrefs, models.Repository)
+        self.assertEqual(resources, list(reversed(repos)))
+
+    def test_resource_does_not_exist(self):
+        """
+        Tests that get_resources() raises a ValidationError if one of the resources does not exist.
+        """
+        repo = models.Repository.objects.create(name='foo')
+        hrefs = [self.href(repo), "/{api_root}repositories/500/".format(api_root=API_ROOT)]
+
+        with self.assertRaises(DRFValidationError):
+            viewsets.NamedModelViewSet.get_resources(hrefs, models.Repository)
+
+    def test_invalid_uri(self):
+        """
+        Tests that get_resources() raises a ValidationError if one of the URIs is invalid.
+        """
+        with self.assertRaises(DRFValidationError):
+            viewsets.NamedModelViewSet.get_resources(["/pulp/api/v2/nonexistent/"],
+                                                     models.Repository)
+
+
 class TestGetSerializerClass(TestCase):
 
     def test_must_define_serializer_class(self):
@@ -0,0 +1,358 @@
+from datetime import timedelta
+import hashlib
+import os
+import tempfile
+import types
+
+import mock
+from django.apps import apps
+from django.conf.urls import include, url
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, models
+from django.test import TestCase, override_settings
+from django.test.utils import isolate_apps
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.validators import UniqueTogetherValidator
+from rest_framework_nested import routers
+
+from pulpcore.app import urls, viewsets
+from pulpcore.app.models import Artifact, Content, ContentArtifact
+from pulpcore.app.serializers import ContentSerializer
+from pulpcore.constants import API_ROOT
+
+
+class TestArtifactBulk(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='admin')
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.tmp = os.path.join(media_root.name, 'tmp')
+        os.mkdir(self.tmp)
+        settings = override_settings(MEDIA_ROOT=media_root.name, FILE_UPLOAD_TEMP_DIR=self.tmp)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def store(self, data):
+        path = os.path.join(self.tmp, 'stored')
+        with open(path, 'wb') as file:
+            file.write(data)
+        artifact = Artifact.init_and_validate(path)
+        artifact.save()
+        return artifact
+
+    def bulk(self, *contents):
+        files = [SimpleUploadedFile('file', data) for data in contents]
+        request = APIRequestFactory().post('/{api_root}artifacts/bulk/'.format(api_root=API_ROOT),
+                                           {'file': files}, format='multipart')
+        force_authenticate(request, user=self.user)
+        return viewsets.ArtifactViewSet.as_view({'post': 'bulk'})(request)
+
+    def test_bulk(self):
+        """
+        Test that an Artifact is created for each file not stored yet, and that the Artifacts are
+        returned in the order of the files.
+        """
+        stored = self.store(b'stored')
+
+        response = self.bulk(b'new', b'other', b'new', b'stored')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([artifact['sha256'] for artifact in response.data],
+                         [hashlib.sha256(data).hexdigest()
+                          for data in (b'new', b'other', b'new', b'stored')])
+        self.assertEqual(response.data[0]['_href'], response.data[2]['_href'])
+        self.assertTrue(response.data[3]['_href'].endswith('/{pk}/'.format(pk=stored.pk)))
+        self.assertEqual(Artifact.objects.count(), 3)
+        for artifact in Artifact.objects.all():
+            with artifact.file.open('rb') as file:
+                self.assertEqual(hashlib.sha256(file.read()).hexdigest(), artifact.sha256)
+
+    def test_touch(self):
+        """
+        Test that the Artifacts already stored are touched, so orphan cleanup does not remove them.
+        """
+        stored = self.store(b'stored')
+        Artifact.objects.filter(pk=stored.pk).update(
+            timestamp_of_interest=timezone.now() - timedelta(days=1))
+        before = timezone.now()
+
+        self.bulk(b'stored')
+
+        stored.refresh_from_db()
+        self.assertGreaterEqual(stored.timestamp_of_interest, before)
+
+    def test_no_file(self):
+        """
+        Test that a request without files is refused.
+        """
+        response = self.bulk()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file', response.data)
+
+    def test_created_meanwhile(self):
+        """
+        Test that Artifacts created by another request since they were looked up are used, and the
+        others are created all the same.
+        """
+        stored = self.store(b'stored')
+        # The first lookup misses the Artifact, as if it was created right after
+        with mock.patch.object(Artifact.objects, 'in_bulk', side_effect=[{}, mock.DEFAULT],
+                               wraps=Artifact.objects.in_bulk) as mock_in_bulk:
+            response = self.bulk(b'new', b'stored')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mock_in_bulk.call_count, 2)
+        self.assertEqual(response.data[1]['sha256'], stored.sha256)
+        self.assertTrue(response.data[1]['_href'].endswith('/{pk}/'.format(pk=stored.pk)))
+        new = Artifact.objects.get(sha256=hashlib.sha256(b'new').hexdigest())
+        with new.file.open('rb') as file:
+            self.assertEqual(file.read(), b'new')
+
+
+class TestArtifactExists(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='admin')
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        path = os.path.join(media_root.name, 'stored')
+        with open(path, 'wb') as file:
+            file.write(b'stored')
+        self.artifact = Artifact.init_and_validate(path)
+        self.artifact.save()
+        Artifact.objects.filter(pk=self.artifact.pk).update(
+            timestamp_of_interest=timezone.now() - timedelta(days=1))
+
+    def exists(self, *artifacts):
+        request = APIRequestFactory().post(
+            '/{api_root}artifacts/exists/'.format(api_root=API_ROOT),
+            {'artifacts': [{'sha256': sha256, 'size': size} for sha256, size in artifacts]},
+            format='json')
+        force_authenticate(request, user=self.user)
+        return viewsets.ArtifactViewSet.as_view({'post': 'exists'})(request)
+
+    def test_existing_and_missing(self):
+        """
+        Test that the stored files are reported with the hrefs of their Artifacts, and the others
+        as missing.
+        """
+        missing = hashlib.sha256(b'missing').hexdigest()
+        response = self.exists((self.artifact.sha256, 6), (missing, 7))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['existing']), [self.artifact.sha256])
+        self.assertTrue(response.data['existing'][self.artifact.sha256].endswith(
+            '/{pk}/'.format(pk=self.artifact.pk)))
+        self.assertEqual(response.data['missing'], [missing])
+
+    def test_size_mismatch(self):
+        """
+        Test that a stored file of another size is reported as missing.
+        """
+        response = self.exists((self.artifact.sha256, 7))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'existing': {}, 'missing': [self.artifact.sha256]})
+
+    def test_touch(self):
+        """
+        Test that the Artifacts found are touched, so orphan cleanup does not remove them.
+        """
+        before = timezone.now()
+        self.exists((self.artifact.sha256, 6))
+
+        self.artifact.refresh_from_db()
+        self.assertGreaterEqual(self.artifact.timestamp_of_interest, before)
+
+    def test_invalid(self):
+        """
+        Test that an empty list or an invalid digest is refused.
+        """
+        self.assertEqual(self.exists().status_code, 400)
+        self.assertEqual(self.exists(('not a digest', 6)).status_code, 400)
+
+
+@isolate_apps('pulpcore.app')
+class TestContentBulk(TestCase):
+    def setUp(self):
+        class BulkTestContent(Content):
+            TYPE = 'bulk-test'
+            name = models.TextField()
+
+            class Meta:
+                app_label = 'pulp_app'
+                unique_together = ('name',)
+
+        class BulkTestContentSerializer(ContentSerializer):
+            name = serializers.CharField()
+
+            class Meta:
+                model = BulkTestContent
+                fields = ContentSerializer.Meta.fields + ('name',)
+
+        class BulkTestContentViewSet(viewsets.ContentViewSet):
+            endpoint_name = 'bulk-test'
+            queryset = BulkTestContent.objects.all()
+            serializer_class = BulkTestContentSerializer
+
+        with connection.schema_editor() as editor:
+            editor.create_model(BulkTestContent)
+        self.model = BulkTestContent
+        self.viewset = BulkTestContentViewSet
+
+        # Register the viewset, so the hrefs of the units can be built
+        router = routers.DefaultRouter()
+        router.register(self.viewset.urlpattern(), self.viewset, self.viewset.view_name())
+        urlconf = types.ModuleType('urls')
+        urlconf.urlpatterns = urls.urlpatterns + [
+            url(r'^{api_root}'.format(api_root=API_ROOT), include(router.urls))]
+        patchers = [
+            mock.patch.object(urls, 'all_routers', urls.all_routers + [router]),
+            mock.patch.dict(apps.get_app_config('pulp_app').named_viewsets,
+                            {self.model: self.viewset}),
+            mock.patch.dict('pulpcore.app.serializers.base._model_viewset_cache'),
+            override_settings(ROOT_URLCONF=urlconf),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create(username='admin')
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        path = os.path.join(media_root.name, 'stored')
+        with open(path, 'wb') as file:
+            file.write(b'stored')
+        self.artifact = Artifact.init_and_validate(path)
+        self.artifact.save()
+        self.artifact_href = '/{api_root}artifacts/{pk}/'.format(
+            api_root=API_ROOT, pk=self.artifact.pk)
+
+    def bulk(self, *names, artifact_href=None, viewset=None):
+        data = [{'name': name, 'artifacts': {name: artifact_href or self.artifact_href}}
+                for name in names]
+        request = APIRequestFactory().post(
+            '/{api_root}content/bulk-test/bulk/'.format(api_root=API_ROOT), data, format='json')
+        force_authenticate(request, user=self.user)
+        return (viewset or self.viewset).as_view({'post': 'bulk'})(request)
+
+    def test_bulk(self):
+        """
+        Test that the units are created with their ContentArtifacts, and returned in order.
+        """
+        response = self.bulk('a', 'b')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([unit['name'] for unit in response.data], ['a', 'b'])
+        self.assertEqual([unit['artifacts'] for unit in response.data],
+                         [{'a': self.artifact_href}, {'b': self.artifact_href}])
+        hrefs = {unit['name']: unit['_href'] for unit in response.data}
+        for unit in self.model.objects.all():
+            self.assertEqual(unit.type, 'bulk-test')
+            self.assertTrue(hrefs[unit.name].endswith(
+                '/content/bulk-test/{pk}/'.format(pk=unit.pk)))
+        self.assertEqual(
+            set(ContentArtifact.objects.values_list('content', 'relative_path', 'artifact')),
+            {(unit.pk, unit.name, self.artifact.pk) for unit in self.model.objects.all()})
+
+    def test_duplicate(self):
+        """
+        Test that a unit with the natural key of another unit of the request is reported, and
+        nothing is created.
+        """
+        response = self.bulk('a', 'b', 'a')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[:2], [{}, {}])
+        self.assertIn('index 0', response.data[2]['non_field_errors'][0])
+        self.assertFalse(self.model.objects.exists())
+
+    def test_stored(self):
+        """
+        Test that a unit with the natural key of a unit already stored is reported, and nothing is
+        created.
+        """
+        self.model.objects.create(name='b')
+
+        response = self.bulk('a', 'b')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('already stored', response.data[1]['non_field_errors'][0])
+        self.assertEqual(list(self.model.objects.values_list('name', flat=True)), ['b'])
+
+    def test_stored_chunks(self):
+        """
+        Test that the natural keys are looked up in chunks, and the units stored are all found.
+        """
+        self.model.objects.create(name='a')
+        self.model.objects.create(name='c')
+
+        with mock.patch('pulpcore.app.viewsets.content.NATURAL_KEY_CHUNK_SIZE', 2):
+            response = self.bulk('a', 'b', 'c', 'd', 'e')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([bool(errors) for errors in response.data],
+                         [True, False, True, False, False])
+
+    def test_no_unique_together_validator(self):
+        """
+        Test that the natural keys are not validated once for each unit.
+        """
+        with mock.patch.object(UniqueTogetherValidator, '__call__') as validate:
+            response = self.bulk('a', 'b')
+
+        self.assertEqual(response.status_code, 201)
+        validate.assert_not_called()
+
+    def test_touch(self):
+        """
+        Test that the Artifacts are touched, so orphan cleanup does not remove them.
+        """
+        Artifact.objects.filter(pk=self.artifact.pk).update(
+            timestamp_of_interest=timezone.now() - timedelta(days=1))
+        before = timezone.now()
+
+        self.bulk('a', 'b')
+
+        self.artifact.refresh_from_db()
+        self.assertGreaterEqual(self.artifact.timestamp_of_interest, before)
+
+    def test_bad_artifact(self):
+        """
+        Test that an href which is not the href of an Artifact is refused.
+        """
+        for href in ('/{api_root}artifacts/0/'.format(api_root=API_ROOT),
+                     '/{api_root}repositories/'.format(api_root=API_ROOT), 'not an href'):
+            response = self.bulk('a', artifact_href=href)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('artifacts', response.data[0])
+        self.assertFalse(self.model.objects.exists())
+
+    def test_custom_create(self):
+        """
+        Test that a content type whose serializer overrides create() is refused.
+        """
+        class CustomSerializer(self.viewset.serializer_class):
+            def create(self, validated_data):
+                return super().create(validated_data)
+
+        class CustomViewSet(self.viewset):
+            serializer_class = CustomSerializer
+
+        response = self.bulk('a', viewset=CustomViewSet)
+
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(self.model.objects.exists())
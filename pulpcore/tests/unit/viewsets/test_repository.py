@@ -0,0 +1,79 @@
+import mock
+from django.test import TestCase
+
+from pulpcore.app.models import Content, Repository, RepositoryContent, RepositoryVersion
+from pulpcore.app.viewsets.repository import RepositoryVersionContentFilter
+
+
+class TestRepositoryVersionContentFilter(TestCase):
+    def setUp(self):
+        self.repository = Repository.objects.create(name='foo')
+        self.versions = {number: RepositoryVersion.objects.create(repository=self.repository,
+                                                                  number=number)
+                         for number in range(5)}
+        self.other_repository = Repository.objects.create(name='bar')
+        self.other_version = RepositoryVersion.objects.create(repository=self.other_repository,
+                                                              number=1)
+        self.content = {name: Content.objects.create(type='test') for name in 'abcd'}
+
+        # a is added by version 1, removed by version 2 and added again by version 3
+        self.add('a', 1, 2)
+        self.add('a', 3)
+        # b is removed by version 3
+        self.add('b', 1, 3)
+        # c is removed by the version which added it
+        self.add('c', 2, 2)
+        # d is only in the other repository
+        RepositoryContent.objects.create(repository=self.other_repository,
+                                         content=self.content['d'],
+                                         version_added=self.other_version)
+
+        patcher = mock.patch('pulpcore.app.viewsets.repository.NamedModelViewSet.get_resources',
+                             side_effect=lambda hrefs, model: [self.content[h] for h in hrefs])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add(self, name, added, removed=None):
+        RepositoryContent.objects.create(
+            repository=self.repository, content=self.content[name],
+            version_added=self.versions[added],
+            version_removed=self.versions[removed] if removed is not None else None)
+
+    def filter(self, value, lookup_expr='exact'):
+        content_filter = RepositoryVersionContentFilter(field_name='content',
+                                                        lookup_expr=lookup_expr)
+        versions = content_filter.filter(RepositoryVersion.objects.all(), value)
+        return sorted((version.repository.name, version.number) for version in versions)
+
+    def test_readded(self):
+        """
+        Test that content removed then added again is found in each range of versions.
+        """
+        self.assertEqual(self.filter('a'), [('foo', 1), ('foo', 3), ('foo', 4)])
+
+    def test_removed(self):
+        """
+        Test that content is not found in the version which removed it.
+        """
+        self.assertEqual(self.filter('b'), [('foo', 1), ('foo', 2)])
+        self.assertEqual(self.filter('c'), [])
+
+    def test_in(self):
+        """
+        Test that the versions containing any of several content units are found once.
+        """
+        self.assertEqual(self.filter('a,b', 'in'), [('foo', 1), ('foo', 2), ('foo', 3), ('foo', 4)])
+        self.assertEqual(self.filter('c,d,', 'in'), [('bar', 1)])
+
+    def test_other_repository(self):
+        """
+        Test that content is only found in the versions of the repositories it was added to.
+        """
+        self.assertEqual(self.filter('d'), [('bar', 1)])
+        self.assertEqual(self.filter('a'), [('foo', 1), ('foo', 3), ('foo', 4)])
+
+    def test_no_value(self):
+        """
+        Test that no value leaves the versions alone.
+        """
+        self.assertEqual(len(self.filter(None)), 6)
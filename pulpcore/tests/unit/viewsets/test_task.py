@@ -0,0 +1,139 @@
+import mock
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from pulpcore.app import viewsets
+from pulpcore.app.models import Repository, Task
+from pulpcore.constants import API_ROOT, TASK_STATES
+from pulpcore.tasking.constants import TASKING_CONSTANTS
+
+
+@mock.patch('pulpcore.tasking.tasks.get_current_job', return_value=None)
+@mock.patch('pulpcore.tasking.tasks.Queue')
+@mock.patch('pulpcore.tasking.tasks.connection')
+class TestBulkTaskDispatch(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='admin')
+        self.repository = Repository.objects.create(name='foo')
+        self.versions_path = '/{api_root}repositories/{pk}/versions/'.format(
+            api_root=API_ROOT, pk=self.repository.pk)
+
+    def bulk(self, operations):
+        request = APIRequestFactory().post('/{api_root}tasks/bulk/'.format(api_root=API_ROOT),
+                                           {'operations': operations}, format='json')
+        force_authenticate(request, user=self.user)
+        return viewsets.TaskViewSet.as_view({'post': 'bulk'})(request)
+
+    def version_operation(self, depends_on=()):
+        return {'path': self.versions_path, 'body': {'add_content_units': []},
+                'depends_on': list(depends_on)}
+
+    def task_href(self, task):
+        return '/{api_root}tasks/{pk}/'.format(api_root=API_ROOT, pk=task.pk)
+
+    def test_all_succeed(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that the tasks of all operations are dispatched, in the order of the operations.
+        """
+        response = self.bulk([self.version_operation(), self.version_operation()])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(response.data['tasks']), 2)
+        self.assertEqual(Task.objects.count(), 2)
+        for href in response.data['tasks']:
+            self.assertTrue(Task.objects.filter(pk=href.rstrip('/').split('/')[-1]).exists())
+
+    def test_one_fails(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that no task is dispatched and no change is kept when an operation does not dispatch
+        a task.
+        """
+        create_repository = {'path': '/{api_root}repositories/'.format(api_root=API_ROOT),
+                             'body': {'name': 'bar'}}
+        response = self.bulk([self.version_operation(), create_repository])
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['operations']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]['status'], 201)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(Repository.objects.filter(name='bar').exists())
+        mock_queue.return_value.enqueue_job.assert_not_called()
+
+    def test_depends_on_index(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that an operation depending on a previous one waits for its task.
+        """
+        response = self.bulk([self.version_operation(), self.version_operation(['0'])])
+
+        self.assertEqual(response.status_code, 202)
+        first, second = [href.rstrip('/').split('/')[-1] for href in response.data['tasks']]
+        prerequisites = Task.objects.get(pk=second).dependencies.values_list('pk', flat=True)
+        self.assertEqual([str(pk) for pk in prerequisites], [first])
+
+    def test_depends_on_href(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that an operation can depend on an existing task, given by its href.
+        """
+        task = Task.objects.create()
+        response = self.bulk([self.version_operation([self.task_href(task)])])
+
+        self.assertEqual(response.status_code, 202)
+        dependent = response.data['tasks'][0].rstrip('/').split('/')[-1]
+        self.assertEqual(list(Task.objects.get(pk=dependent).dependencies.all()), [task])
+
+    def test_depends_on_unknown_task(self, mock_connection, mock_queue, mock_current_job):
+        """
+        Test that an operation depending on a task which does not exist fails.
+        """
+        task = Task(pk='3b8d4e0c-0d2d-4f1d-8d5a-6c1c2b1a7e55')
+        response = self.bulk([self.version_operation([self.task_href(task)])])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.exists())
+
+
+@mock.patch('pulpcore.app.viewsets.task.TaskEventStreamResponse', return_value=HttpResponse())
+class TestListEvents(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='admin')
+        self.waiting = Task.objects.create(state=TASK_STATES.WAITING)
+        self.running = Task.objects.create(state=TASK_STATES.RUNNING)
+        Task.objects.create(state=TASK_STATES.COMPLETED)
+        Task.objects.create(state=TASK_STATES.FAILED)
+
+    def list_events(self, **params):
+        request = APIRequestFactory().get('/{api_root}tasks/events/'.format(api_root=API_ROOT),
+                                          params)
+        force_authenticate(request, user=self.user)
+        return viewsets.TaskViewSet.as_view({'get': 'list_events'})(request)
+
+    def test_unfinished_tasks(self, mock_response):
+        """
+        Test that only the tasks which are not finished yet are followed.
+        """
+        self.assertEqual(self.list_events().status_code, 200)
+
+        tasks = mock_response.call_args[0][0]
+        self.assertEqual(set(tasks), {self.waiting, self.running})
+
+    def test_filters(self, mock_response):
+        """
+        Test that the filters of the task list apply.
+        """
+        self.list_events(state=TASK_STATES.RUNNING)
+
+        tasks = mock_response.call_args[0][0]
+        self.assertEqual(list(tasks), [self.running])
+
+    @mock.patch.object(TASKING_CONSTANTS, 'EVENTS_MAX_TASKS', 1)
+    def test_too_many_tasks(self, mock_response):
+        """
+        Test that following more than the maximum number of tasks is refused.
+        """
+        response = self.list_events()
+
+        self.assertEqual(response.status_code, 400)
+        mock_response.assert_not_called()
@@ -0,0 +1,94 @@
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from pulpcore.app import viewsets
+from pulpcore.app.models import Upload
+from pulpcore.constants import API_ROOT
+
+
+class TestUploadViewSet(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='admin')
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.upload = Upload.create(10)
+
+    def put(self, data, content_range=None):
+        headers = {'HTTP_CONTENT_RANGE': content_range} if content_range is not None else {}
+        request = APIRequestFactory().put(
+            '/{api_root}uploads/{pk}/'.format(api_root=API_ROOT, pk=self.upload.pk), data,
+            content_type='application/octet-stream', **headers)
+        force_authenticate(request, user=self.user)
+        return viewsets.UploadViewSet.as_view({'put': 'update'})(request, pk=self.upload.pk)
+
+    def test_chunks(self):
+        """
+        Test that chunks are written at the offsets of their ranges, with a known or unknown total.
+        """
+        self.assertEqual(self.put(b'6789', 'bytes 6-9/10').status_code, 200)
+        response = self.put(b'012345', 'bytes 0-5/*')
+
+        self.assertEqual(response.status_code, 200)
+        chunks = sorted((chunk['offset'], chunk['size']) for chunk in response.data['chunks'])
+        self.assertEqual(chunks, [(0, 6), (6, 4)])
+        with open(self.upload.file.path, 'rb') as file:
+            self.assertEqual(file.read(), b'0123456789')
+
+    def test_invalid_content_range(self):
+        """
+        Test that a chunk without a valid Content-Range header is refused.
+        """
+        invalid = (None, '', 'bytes 0-3', 'bytes=0-3/10', 'bytes 0-3/ten', 'items 0-3/*')
+        for content_range in invalid:
+            with self.subTest(content_range=content_range):
+                self.assertEqual(self.put(b'0123', content_range).status_code, 400)
+        self.assertFalse(self.upload.chunks.exists())
+
+    def test_total_mismatch(self):
+        """
+        Test that a chunk of a file of another size is refused.
+        """
+        self.assertEqual(self.put(b'0123', 'bytes 0-3/11').status_code, 400)
+        self.assertFalse(self.upload.chunks.exists())
+
+    def test_chunk_out_of_range(self):
+        """
+        Test that a chunk which does not fit in the file, or is shorter than its range, is refused.
+        """
+        self.assertEqual(self.put(b'8901', 'bytes 8-11/*').status_code, 400)
+        self.assertEqual(self.put(b'01', 'bytes 0-3/*').status_code, 400)
+        self.assertFalse(self.upload.chunks.exists())
+
+
+class TestCreateUpload(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='admin')
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name,
+                                     UPLOAD={'MAX_SIZE': 100, 'EXPIRATION': 60})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create(self, size):
+        request = APIRequestFactory().post('/{api_root}uploads/'.format(api_root=API_ROOT),
+                                           {'size': size}, format='json')
+        force_authenticate(request, user=self.user)
+        return viewsets.UploadViewSet.as_view({'post': 'create'})(request)
+
+    def test_max_size(self):
+        """
+        Test that uploads larger than the maximum size are refused.
+        """
+        self.assertEqual(self.create(100).status_code, 201)
+        response = self.create(101)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('size', response.data)
+        self.assertEqual(Upload.objects.count(), 1)